@@ -1,10 +1,15 @@
 from flask import Flask
 from flask_cors import CORS
+from app.core import metrics
 from app.core.config import Config
+from app.utils.logging import setup_logging
+from app.utils.uploads import SpoolingRequest
 
 def create_app():
+    setup_logging()
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.request_class = SpoolingRequest
     
     # Enable CORS with proper configuration
     CORS(app, 
@@ -23,6 +28,10 @@ def create_app():
     from app.api.comment_routes import comment_bp
     from app.api.vote_routes import vote_bp
     from app.api.study_routes import study_bp
+    from app.api.job_routes import job_bp
+    from app.api.stream_routes import stream_bp
+    from app.api.metrics_routes import metrics_bp
+    from app.api.search_routes import search_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(class_bp, url_prefix='/api/classes')
@@ -33,6 +42,13 @@ def create_app():
     app.register_blueprint(comment_bp, url_prefix='/api')
     app.register_blueprint(vote_bp, url_prefix='/api/upvotes')
     app.register_blueprint(study_bp, url_prefix='/api/study')
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
+    app.register_blueprint(stream_bp, url_prefix='/api/stream')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    
+    # Supabase call counts and timings per request: Server-Timing, request log, metrics
+    metrics.init_app(app)
     
     @app.route('/api/health')
     def health():
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
 from app.services.class_service import ClassService
 from app.utils.errors import ValidationError, NotFoundError, UnauthorizedError
+from app.utils.pagination import page_args
 
 class_bp = Blueprint('classes', __name__)
 class_service = ClassService()
@@ -71,8 +72,9 @@ def list_classes():
 def list_all_classes():
     """List all classes in catalog (public listing)."""
     try:
-        classes = class_service.list_all_classes()
-        return jsonify({'classes': classes}), 200
+        limit, cursor = page_args(request.args)
+        classes, next_cursor = class_service.list_all_classes(limit, cursor)
+        return jsonify({'classes': classes, 'next_cursor': next_cursor}), 200
     except ValidationError as e:
         return jsonify({'error': e.message}), e.status_code
     except Exception as e:
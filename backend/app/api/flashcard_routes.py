@@ -1,10 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
+from app.services.event_bus import publish
 from app.services.flashcard_service import FlashcardService
-from app.utils.errors import ValidationError
+from app.services.job_service import get_job_service, public_job
+from app.services.study_service import StudyService
+from app.utils.errors import MountainMergeError, UnauthorizedError, ValidationError
+from app.utils.pagination import page_args
+from app.utils.uploads import take_upload
 
 flashcard_bp = Blueprint('decks', __name__)
 flashcard_service = FlashcardService()
+study_service = StudyService()
 
 @flashcard_bp.route('', methods=['POST'])
 @require_auth
@@ -17,8 +23,17 @@ def create_deck():
 @require_auth
 def generate_flashcards(deck_id):
     """Generate flashcards for a deck from a note."""
-    # TODO: Implement generation
-    return jsonify({'message': 'Generate flashcards endpoint'}), 200
+    try:
+        data = request.get_json() or {}
+        note_id = (data.get('note_id') or '').strip()
+        if not note_id:
+            return jsonify({'error': 'note_id is required'}), 400
+        result = flashcard_service.generate_flashcards(deck_id, note_id, data.get('count'), request.current_user.id)
+        return jsonify(result), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @flashcard_bp.route('/<deck_id>', methods=['GET'])
 @require_auth
@@ -33,24 +48,64 @@ def get_deck(deck_id):
 @flashcard_bp.route('/<deck_id>/cards', methods=['POST'])
 @require_auth
 def create_card(deck_id):
-    """Create a flashcard in a deck."""
-    # TODO: Implement create card
-    return jsonify({'message': 'Create card endpoint'}), 201
+    """Create a flashcard in a deck, or many at once with {"cards": [...]}."""
+    try:
+        data = request.get_json() or {}
+        user_id = request.current_user.id
+        if 'cards' in data:
+            if not isinstance(data['cards'], list):
+                return jsonify({'error': 'cards must be a list'}), 400
+            result = flashcard_service.add_cards(deck_id, data['cards'], user_id)
+            return jsonify(result), 201
+        card = flashcard_service.create_card(deck_id, data.get('question'), data.get('answer'), user_id, data.get('topic'))
+        return jsonify(card), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @flashcard_bp.route('/study/<deck_id>/start', methods=['POST'])
 @require_auth
 def start_study(deck_id):
-    """Start a study session on a deck."""
-    # TODO: Implement study start
-    return jsonify({'message': 'Start study endpoint'}), 200
+    """Start a study session on a deck: the next due cards, earliest first (?limit=)."""
+    try:
+        result = study_service.start(deck_id, request.current_user.id, request.args.get('limit', type=int))
+        return jsonify(result), 200
+    except UnauthorizedError as e:
+        return jsonify({'error': e.message}), 403
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@flashcard_bp.route('/study/<deck_id>/reviews', methods=['POST'])
+@require_auth
+def record_reviews(deck_id):
+    """Record a batch of answers {"reviews": [{card_id, result, elapsed_ms?, reviewed_at?}]}
+    and return the updated due queue."""
+    try:
+        data = request.get_json() or {}
+        result = study_service.record_reviews(deck_id, request.current_user.id, data.get('reviews'), data.get('limit'))
+        return jsonify(result), 200
+    except UnauthorizedError as e:
+        return jsonify({'error': e.message}), 403
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @flashcard_bp.route('/user/<user_id>', methods=['GET'])
 @require_auth
 def list_user_public_decks(user_id):
     try:
         viewer_id = request.current_user.id
-        decks = flashcard_service.list_public_decks_by_user(user_id, viewer_id)
-        return jsonify({'decks': decks}), 200
+        limit, cursor = page_args(request.args)
+        decks, next_cursor = flashcard_service.list_public_decks_by_user(user_id, viewer_id, limit, cursor, request.args.get('fields'))
+        return jsonify({'decks': decks, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,8 +114,11 @@ def list_user_public_decks(user_id):
 def list_my_decks():
     try:
         user_id = request.current_user.id
-        decks = flashcard_service.list_user_decks(user_id)
-        return jsonify({'decks': decks}), 200
+        limit, cursor = page_args(request.args)
+        decks, next_cursor = flashcard_service.list_user_decks(user_id, limit, cursor, request.args.get('fields'))
+        return jsonify({'decks': decks, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -69,8 +127,11 @@ def list_my_decks():
 def list_class_decks(class_id):
     try:
         user_id = request.current_user.id
-        decks = flashcard_service.list_class_decks(class_id, user_id)
-        return jsonify({'decks': decks}), 200
+        limit, cursor = page_args(request.args)
+        decks, next_cursor = flashcard_service.list_class_decks(class_id, user_id, limit, cursor, request.args.get('fields'))
+        return jsonify({'decks': decks, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -84,23 +145,35 @@ def create_deck_from_pdfs():
         class_id = (request.form.get('class_id') or '').strip()
         public = (request.form.get('public') or 'true').lower() in ['true', '1', 'yes']
         title = (request.form.get('title') or '').strip() or None
-        deck = flashcard_service.create_deck_from_pdfs(files, class_id, request.current_user.id, public, title)
-        return jsonify(deck), 201
+        user_id = request.current_user.id
+        flashcard_service.ensure_can_create_deck(class_id, user_id)
+        # The spooled uploads outlive the request and are removed once the job finishes
+        uploads = [take_upload(f) for f in files]
+
+        def cleanup():
+            for upload in uploads:
+                upload.close()
+
+        job = get_job_service().submit(
+            'deck_pdfs', user_id, flashcard_service.create_deck_from_pdfs,
+            uploads, class_id, user_id, public, title,
+            cleanup=cleanup
+        )
+        return jsonify(public_job(job)), 202
     except ValidationError as e:
         return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# --- Votes for decks using upvotes table ---
+# --- Votes for decks (maintained counter, see VoteService) ---
 @flashcard_bp.route('/<deck_id>/votes', methods=['GET'])
 @require_auth
 def deck_votes(deck_id):
     try:
         user_id = request.current_user.id
-        res = flashcard_service.admin.table('upvotes').select('id', count='exact').eq('target_id', deck_id).eq('target_type', 'deck').execute()
-        count = res.count or 0
-        mine = flashcard_service.admin.table('upvotes').select('id').eq('target_id', deck_id).eq('target_type', 'deck').eq('user_id', user_id).execute()
-        return jsonify({'count': count, 'user_has_voted': bool(mine.data)}), 200
+        return jsonify(flashcard_service.votes.get_upvotes(deck_id, 'deck', user_id)), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -109,8 +182,9 @@ def deck_votes(deck_id):
 def add_deck_vote(deck_id):
     try:
         user_id = request.current_user.id
-        flashcard_service.admin.table('upvotes').upsert({'user_id': user_id, 'target_id': deck_id, 'target_type': 'deck'}).execute()
-        return deck_votes(deck_id)
+        return jsonify(flashcard_service.votes.set_vote(deck_id, 'deck', user_id, True)), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -119,8 +193,9 @@ def add_deck_vote(deck_id):
 def remove_deck_vote(deck_id):
     try:
         user_id = request.current_user.id
-        flashcard_service.admin.table('upvotes').delete().eq('user_id', user_id).eq('target_id', deck_id).eq('target_type', 'deck').execute()
-        return deck_votes(deck_id)
+        return jsonify(flashcard_service.votes.set_vote(deck_id, 'deck', user_id, False)), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -129,12 +204,11 @@ def remove_deck_vote(deck_id):
 @require_auth
 def list_deck_comments(deck_id):
     try:
-        rows = flashcard_service.admin.table('comments').select('id, user_id, text, created_at').eq('anchor', f'deck:{deck_id}').order('created_at').execute()
-        comments = rows.data or []
-        for c in comments:
-            u = flashcard_service.admin.table('users').select('first_name, last_name').eq('id', c['user_id']).single().execute()
-            c['author'] = {'first_name': u.data.get('first_name','') if u.data else '', 'last_name': u.data.get('last_name','') if u.data else ''}
-        return jsonify({'comments': comments}), 200
+        limit, cursor = page_args(request.args)
+        comments, next_cursor = flashcard_service.list_deck_comments(deck_id, limit, cursor)
+        return jsonify({'comments': comments, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -149,7 +223,10 @@ def add_deck_comment(deck_id):
         d = flashcard_service.admin.table('flashcard_decks').select('session_id').eq('id', deck_id).single().execute()
         session_id = d.data['session_id'] if d.data else None
         ins = flashcard_service.admin.table('comments').insert({'session_id': session_id, 'note_id': None, 'user_id': request.current_user.id, 'text': txt[:2000], 'anchor': f'deck:{deck_id}'}).execute()
-        return jsonify(ins.data[0] if ins.data else {}), 201
+        comment = ins.data[0] if ins.data else {}
+        if comment:
+            publish('deck', deck_id, 'comment.created', comment)
+        return jsonify(comment), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -164,6 +241,7 @@ def delete_deck_comment(deck_id, comment_id):
         if row.data['user_id'] != user_id:
             return jsonify({'error': 'Forbidden'}), 403
         flashcard_service.admin.table('comments').delete().eq('id', comment_id).execute()
+        publish('deck', deck_id, 'comment.deleted', {'id': comment_id})
         return jsonify({'status': 'deleted'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
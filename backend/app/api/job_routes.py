@@ -0,0 +1,21 @@
+from flask import Blueprint, request, jsonify
+from app.core.security import require_auth
+from app.services.job_service import get_job_service, public_job
+
+job_bp = Blueprint('jobs', __name__)
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    """Report progress of a background upload job and, once finished, its note or deck."""
+    try:
+        job = get_job_service().get(job_id)
+        # Jobs are private to the uploader; don't reveal that other ids exist
+        if not job or job['user_id'] != request.current_user.id:
+            return jsonify({'error': 'Job not found'}), 404
+        body = public_job(job)
+        if job['status'] == 'failed':
+            body['status_code'] = job.get('status_code') or 500
+        return jsonify(body), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
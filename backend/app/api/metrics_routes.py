@@ -0,0 +1,16 @@
+import hmac
+from flask import Blueprint, Response, request, jsonify
+from app.core import metrics
+from app.core.config import Config
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint for this worker process; off unless METRICS_TOKEN is set."""
+    if not Config.METRICS_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied, Config.METRICS_TOKEN):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
 from app.services.note_service import NoteService
+from app.services.job_service import get_job_service, public_job
 from app.utils.errors import ValidationError, NotFoundError, UnauthorizedError
+from app.utils.pagination import page_args
+from app.utils.uploads import take_upload
 import os
 
 note_bp = Blueprint('notes', __name__)
@@ -28,6 +31,8 @@ def get_votes(note_id):
         user_id = request.current_user.id
         data = note_service.get_note_votes_count(note_id, user_id)
         return jsonify(data), 200
+    except NotFoundError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -38,6 +43,8 @@ def add_vote(note_id):
         user_id = request.current_user.id
         data = note_service.upsert_vote(note_id, user_id)
         return jsonify(data), 200
+    except NotFoundError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -48,6 +55,8 @@ def remove_vote(note_id):
         user_id = request.current_user.id
         data = note_service.remove_vote(note_id, user_id)
         return jsonify(data), 200
+    except NotFoundError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -56,8 +65,11 @@ def remove_vote(note_id):
 def list_comments(note_id):
     try:
         user_id = request.current_user.id
-        comments = note_service.list_comments(note_id, user_id)
-        return jsonify({'comments': comments}), 200
+        limit, cursor = page_args(request.args)
+        comments, next_cursor = note_service.list_comments(note_id, user_id, limit, cursor)
+        return jsonify({'comments': comments, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -126,8 +138,15 @@ def create_note_from_pdf():
         title = request.form.get('title', '').strip()
         
         user_id = request.current_user.id
-        note = note_service.create_note_from_pdf(file, class_id, user_id, public_flag, title=title or None)
-        return jsonify(note), 201
+        note_service.ensure_can_add_note(class_id, user_id)
+        # The spooled upload outlives the request and is removed once the job finishes
+        upload = take_upload(file)
+        job = get_job_service().submit(
+            'note_pdf', user_id, note_service.create_note_from_pdf,
+            upload, class_id, user_id, public_flag, title=title or None,
+            cleanup=upload.close
+        )
+        return jsonify(public_job(job)), 202
     except ValidationError as e:
         return jsonify({'error': e.message}), e.status_code
     except NotFoundError as e:
@@ -140,8 +159,11 @@ def create_note_from_pdf():
 def list_my_notes():
     try:
         user_id = request.current_user.id
-        notes = note_service.list_notes_for_user(user_id)
-        return jsonify({'notes': notes}), 200
+        limit, cursor = page_args(request.args)
+        notes, next_cursor = note_service.list_notes_for_user(user_id, limit, cursor, request.args.get('fields'))
+        return jsonify({'notes': notes, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -150,10 +172,15 @@ def list_my_notes():
 def list_class_notes(class_id):
     try:
         user_id = request.current_user.id
-        notes = note_service.list_public_notes_for_class(class_id, user_id)
-        return jsonify({'notes': notes}), 200
+        limit, cursor = page_args(request.args)
+        collapse = request.args.get('collapse', '1').lower() not in ('0', 'false')
+        notes, next_cursor = note_service.list_public_notes_for_class(class_id, user_id, limit, cursor,
+                                                                      request.args.get('fields'), collapse)
+        return jsonify({'notes': notes, 'next_cursor': next_cursor}), 200
     except UnauthorizedError as e:
         return jsonify({'error': e.message}), 403
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -162,8 +189,11 @@ def list_class_notes(class_id):
 def list_user_public_notes(user_id):
     try:
         viewer_id = request.current_user.id
-        notes = note_service.list_public_notes_by_user(user_id, viewer_id)
-        return jsonify({'notes': notes}), 200
+        limit, cursor = page_args(request.args)
+        notes, next_cursor = note_service.list_public_notes_by_user(user_id, viewer_id, limit, cursor, request.args.get('fields'))
+        return jsonify({'notes': notes, 'next_cursor': next_cursor}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
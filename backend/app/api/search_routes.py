@@ -0,0 +1,28 @@
+from flask import Blueprint, request, jsonify
+from app.core.security import require_auth
+from app.services.search_service import SearchService
+from app.utils.errors import MountainMergeError, UnauthorizedError
+from app.utils.pagination import page_args
+
+search_bp = Blueprint('search', __name__)
+search_service = SearchService()
+
+@search_bp.route('', methods=['GET'])
+@require_auth
+def search():
+    """Search a class: ?class_id=&q=&limit=&cursor=. `q` takes web-search syntax (words,
+    "quoted phrases", -excluded). Each result has kind (note, deck or card), id, deck_id,
+    title, rank and a snippet of raw text with <mark> around the matches, so escape it
+    before rendering it as HTML."""
+    try:
+        limit, cursor = page_args(request.args)
+        results, next_cursor = search_service.search(
+            (request.args.get('class_id') or '').strip(), request.current_user.id,
+            request.args.get('q'), limit, cursor)
+        return jsonify({'results': results, 'next_cursor': next_cursor}), 200
+    except UnauthorizedError as e:
+        return jsonify({'error': e.message}), 403
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify
+from app.core.config import Config
+from app.core.security import require_stream_auth
+from app.services.event_bus import channel_for, get_event_bus
+from app.services.vote_service import VoteService
+from app.utils.errors import MountainMergeError
+
+stream_bp = Blueprint('stream', __name__)
+vote_service = VoteService()
+
+# Each open stream holds a worker thread, so cap them per process
+_slots = threading.BoundedSemaphore(Config.STREAM_MAX_CLIENTS)
+
+
+def format_sse(event: dict) -> str:
+    data = json.dumps(event.get('data'), default=str)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+def _open_stream(target_type: str, target_id: str):
+    """SSE response for one note/deck: a snapshot, then every change published to its channel."""
+    try:
+        # Also the visibility check: hidden or missing targets are a 404
+        votes = vote_service.get_upvotes(target_id, target_type, request.current_user.id)
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    if not _slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many open streams, please retry shortly'}), 503
+    sub = get_event_bus().subscribe(channel_for(target_type, target_id))
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            sub.close()
+            _slots.release()
+
+    def generate():
+        try:
+            # Reconnect after 3s; the fresh snapshot covers anything missed in between
+            yield 'retry: 3000\n\n'
+            yield format_sse({'type': 'snapshot', 'data': {'votes': votes}})
+            deadline = time.monotonic() + Config.STREAM_MAX_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = sub.get(timeout=min(Config.STREAM_HEARTBEAT_SECONDS, remaining))
+                yield format_sse(event) if event else ': keepalive\n\n'
+        finally:
+            release()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+    # Runs even if the client leaves before the generator starts
+    response.call_on_close(release)
+    return response
+
+
+@stream_bp.route('/notes/<note_id>', methods=['GET'])
+@require_stream_auth
+def stream_note(note_id):
+    """Live comment and vote events for a note."""
+    return _open_stream('note', note_id)
+
+
+@stream_bp.route('/decks/<deck_id>', methods=['GET'])
+@require_stream_auth
+def stream_deck(deck_id):
+    """Live comment and vote events for a deck."""
+    return _open_stream('deck', deck_id)
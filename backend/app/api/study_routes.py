@@ -1,10 +1,32 @@
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
 from app.services.study_group_service import StudyGroupService
-from app.utils.errors import ValidationError, UnauthorizedError
+from app.services.study_service import StudyService
+from app.utils.errors import MountainMergeError, ValidationError, UnauthorizedError
 
 study_bp = Blueprint('study', __name__)
 sg_service = StudyGroupService()
+study_service = StudyService()
+
+@study_bp.route('/sync', methods=['POST'])
+@require_auth
+def sync_reviews():
+    """Upload answers recorded offline for one deck and get its updated due queue:
+    {"deck_id", "reviews": [{client_event_id, card_id, result, reviewed_at, elapsed_ms?}], "limit"?}.
+    Retrying with the same client_event_ids is safe; `synced` lists every id now stored."""
+    try:
+        data = request.get_json() or {}
+        deck_id = (data.get('deck_id') or '').strip()
+        if not deck_id:
+            return jsonify({'error': 'deck_id is required'}), 400
+        result = study_service.sync(deck_id, request.current_user.id, data.get('reviews'), data.get('limit'))
+        return jsonify(result), 200
+    except UnauthorizedError as e:
+        return jsonify({'error': e.message}), 403
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @study_bp.route('/groups/status', methods=['POST'])
 @require_auth
@@ -49,9 +71,7 @@ def get_status():
             return jsonify({'error': 'class_id is required'}), 400
         user_id = request.current_user.id
         # Ensure membership
-        # Using service admin client directly
-        mem = sg_service.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-        if not mem.data:
+        if not sg_service.members.is_member(user_id, class_id):
             return jsonify({'error': 'Not a member of this class'}), 403
         row = sg_service.admin.table('study_groups').select('looking').eq('user_id', user_id).eq('class_id', class_id).execute()
         looking = bool(row.data and row.data[0].get('looking'))
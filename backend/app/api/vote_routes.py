@@ -1,22 +1,50 @@
 from flask import Blueprint, request, jsonify
 from app.core.security import require_auth
 from app.services.vote_service import VoteService
+from app.utils.errors import MountainMergeError
 
 vote_bp = Blueprint('votes', __name__)
 vote_service = VoteService()
 
+@vote_bp.route('', methods=['GET'])
+@require_auth
+def get_vote_summaries():
+    """Counts plus the caller's votes for many targets: ?target_type=note&ids=a,b,c"""
+    try:
+        target_type = request.args.get('target_type', '')
+        ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+        votes = vote_service.get_summaries(ids, target_type, request.current_user.id)
+        return jsonify({'votes': votes}), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @vote_bp.route('', methods=['POST'])
 @require_auth
 def toggle_upvote():
     """Create or toggle an upvote on a note or deck."""
-    data = request.get_json()
-    # TODO: Implement toggle upvote
-    return jsonify({'message': 'Toggle upvote endpoint'}), 200
+    try:
+        data = request.get_json() or {}
+        voted = data.get('voted')
+        if voted is not None and not isinstance(voted, bool):
+            return jsonify({'error': 'voted must be true, false or omitted'}), 400
+        if not data.get('target_id'):
+            return jsonify({'error': 'target_id required'}), 400
+        summary = vote_service.set_vote(data['target_id'], data.get('target_type', ''), request.current_user.id, voted)
+        return jsonify(summary), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @vote_bp.route('/<target_type>/<target_id>', methods=['GET'])
 @require_auth
 def get_upvotes(target_type, target_id):
     """Get upvote count and whether the current user has upvoted."""
-    # TODO: Implement get upvotes
-    return jsonify({'message': 'Get upvotes endpoint'}), 200
-
+    try:
+        return jsonify(vote_service.get_upvotes(target_id, target_type, request.current_user.id)), 200
+    except MountainMergeError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +13,100 @@ class Config:
     SUPABASE_URL = os.getenv('SUPABASE_URL', '')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
     SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY', '')
+    SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET', '')
+    SUPABASE_JWKS_URL = os.getenv('SUPABASE_JWKS_URL', '')
+    
+    # Shared Supabase client connection pool
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '20'))
+    SUPABASE_POOL_KEEPALIVE = int(os.getenv('SUPABASE_POOL_KEEPALIVE', '10'))
+    SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', '30'))
+    SUPABASE_TIMEOUT = float(os.getenv('SUPABASE_TIMEOUT', '10'))
+    SUPABASE_STORAGE_TIMEOUT = float(os.getenv('SUPABASE_STORAGE_TIMEOUT', '60'))
+    
+    # Auth token verification
+    # local: verify JWTs in-process (falls back to Supabase when no secret/JWKS is set)
+    # remote: always ask Supabase on a cache miss
+    # both: verify locally, then confirm with Supabase on a cache miss
+    AUTH_VERIFY_MODE = os.getenv('AUTH_VERIFY_MODE', 'local')
+    AUTH_JWT_AUDIENCE = os.getenv('AUTH_JWT_AUDIENCE', 'authenticated')
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '300'))
+    AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+    
+    # Cross-request cache of author/class name records used by list hydration
+    HYDRATION_CACHE_TTL = int(os.getenv('HYDRATION_CACHE_TTL', '60'))
+    HYDRATION_CACHE_SIZE = int(os.getenv('HYDRATION_CACHE_SIZE', '5000'))
+    
+    # Background PDF ingestion jobs
+    # JOB_STORE=memory keeps jobs in the worker process; sqlite shares them between
+    # the workers on one host through JOB_STORE_PATH (gunicorn.conf.py makes sqlite the
+    # default when it starts more than one worker).
+    JOB_STORE = os.getenv('JOB_STORE', 'memory')
+    JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', os.path.join(tempfile.gettempdir(), 'mountainmerge_jobs.sqlite3'))
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '32'))
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', '3600'))
+    
+    # Parallel PDF text extraction: PDFs with at least PDF_PARALLEL_MIN_PAGES pages are
+    # split into PDF_PAGES_PER_TASK page ranges across PDF_EXTRACT_WORKERS processes
+    # (fewer than 2 disables the process pool: one worker process only adds pickling
+    # and start-up to serial extraction, so single-CPU hosts default to 0).
+    PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1) if (os.cpu_count() or 1) >= 2 else 0)))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '40'))
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '16'))
+    
+    # Content-addressed cache of extracted text, summaries and generated cards, keyed
+    # by the SHA-256 of the uploaded PDF (CONTENT_CACHE_MAX_BYTES=0 disables it)
+    CONTENT_CACHE_DIR = os.getenv('CONTENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mountainmerge_content'))
+    CONTENT_CACHE_MAX_BYTES = int(os.getenv('CONTENT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+    # Uploaded PDFs no note references are removed by the sweep job (note_pdf_sweep.py)
+    # once they have gone this long without being written
+    NOTE_PDF_GRACE_HOURS = float(os.getenv('NOTE_PDF_GRACE_HOURS', '24'))
+    
+    # Uploaded notes whose text is at least this similar (estimated Jaccard over word
+    # shingles) to a public note in the same class are linked to it and collapsed in
+    # the class feed; 0 turns detection off
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.8'))
+    
+    # Rows per request when bulk-inserting flashcards
+    CARD_INSERT_BATCH_SIZE = int(os.getenv('CARD_INSERT_BATCH_SIZE', '100'))
+    
+    # Uploads are spooled once to a temp file (UPLOAD_SPOOL_DIR, default system temp)
+    # and rejected with 413 as soon as a file passes MAX_UPLOAD_BYTES (0 = no limit)
+    MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(50 * 1024 * 1024)))
+    UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', '')
+    
+    # Server-sent event streams for comments and votes. EVENT_BUS=redis shares events
+    # between worker processes through REDIS_URL; memory only reaches viewers connected
+    # to the worker that handled the write. Streams close after STREAM_MAX_SECONDS (the
+    # browser reconnects) and each worker serves at most STREAM_MAX_CLIENTS at once.
+    # Every open stream holds one of the worker's GUNICORN_THREADS, so by default
+    # streams get half of them and the rest stay free for ordinary requests.
+    EVENT_BUS = os.getenv('EVENT_BUS', 'memory')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+    STREAM_MAX_SECONDS = float(os.getenv('STREAM_MAX_SECONDS', '300'))
+    STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', str(max(1, int(os.getenv('GUNICORN_THREADS', '8')) // 2))))
+    STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '100'))
+    
+    # Spaced-repetition study sessions: cards returned per queue, answers per request,
+    # and the per-process cache of (user, deck) schedules. Answers older than
+    # STUDY_EVENT_RETENTION_DAYS are pruned by the compaction job once card_state has them.
+    STUDY_QUEUE_SIZE = int(os.getenv('STUDY_QUEUE_SIZE', '20'))
+    STUDY_MAX_BATCH = int(os.getenv('STUDY_MAX_BATCH', '500'))
+    STUDY_CACHE_SIZE = int(os.getenv('STUDY_CACHE_SIZE', '500'))
+    STUDY_CACHE_TTL = int(os.getenv('STUDY_CACHE_TTL', '300'))
+    STUDY_EVENT_RETENTION_DAYS = int(os.getenv('STUDY_EVENT_RETENTION_DAYS', '90'))
+    
+    # Observability: one JSON log line per request with its Supabase call counts (a
+    # call repeated REQUEST_LOG_REPEAT_WARN times in one request is logged as a warning),
+    # and Prometheus metrics at /api/metrics, which require `Authorization: Bearer
+    # METRICS_TOKEN` (the endpoint is a 404 while that is unset). Metrics are per
+    # worker process.
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    REQUEST_LOG = os.getenv('REQUEST_LOG', '1') not in ('0', 'false', 'no')
+    REQUEST_LOG_REPEAT_WARN = int(os.getenv('REQUEST_LOG_REPEAT_WARN', '5'))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
     
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -0,0 +1,193 @@
+import json
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+from app.core.config import Config
+
+# Per-request Supabase call accounting plus process-wide Prometheus histograms.
+# Every PostgREST/storage call made through the shared clients is reported by the
+# httpx event hooks below; request hooks turn the calls into a Server-Timing header,
+# one structured log line per request and the series served at /api/metrics.
+
+logger = logging.getLogger('mountainmerge.request')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][n] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for values, (counts, total, count) in series:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", bound)])} {c}')
+            lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, values)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labels, values)} {count}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by route.',
+                            ('method', 'route', 'status'), LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram('http_request_supabase_calls', 'Supabase calls made per request, by route.',
+                            ('method', 'route'), QUERY_COUNT_BUCKETS)
+QUERY_SECONDS = Histogram('supabase_call_duration_seconds', 'Supabase call latency by table and operation.',
+                          ('target', 'op'), LATENCY_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_QUERIES, QUERY_SECONDS)
+
+
+def render() -> str:
+    """All series in the Prometheus text exposition format."""
+    lines = []
+    for h in HISTOGRAMS:
+        lines.extend(h.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for h in HISTOGRAMS:
+        h.clear()
+
+
+def record_query(target: str, op: str, seconds: float):
+    """Count one Supabase round trip against the current request (if any)."""
+    QUERY_SECONDS.observe(seconds, target, op)
+    if has_request_context():
+        calls = g.get('supabase_calls')
+        if calls is None:
+            calls = g.supabase_calls = []
+        calls.append((target, op, seconds))
+
+
+def request_calls() -> list:
+    """(target, op, seconds) for each Supabase call made so far in this request."""
+    return list(g.get('supabase_calls') or ()) if has_request_context() else []
+
+
+# ---------- httpx event hooks for the Supabase clients ----------
+
+_POSTGREST_OPS = {'GET': 'select', 'HEAD': 'count', 'POST': 'insert', 'PATCH': 'update', 'DELETE': 'delete'}
+_STORAGE_OPS = {
+    ('bucket', 'GET'): 'list_buckets', ('bucket', 'POST'): 'create_bucket',
+    ('object', 'POST'): 'upload', ('object', 'PUT'): 'upload',
+    ('object', 'GET'): 'download', ('object', 'DELETE'): 'remove',
+}
+
+
+def describe(method: str, path: str, prefer: str = '') -> tuple:
+    """(target, op) for a PostgREST or storage request, e.g. ('notes', 'select')."""
+    parts = [p for p in path.split('/') if p]
+    if 'rest' in parts:
+        rest = parts[parts.index('rest') + 2:]
+        if rest[:1] == ['rpc'] and len(rest) > 1:
+            return 'rpc', rest[1]
+        op = _POSTGREST_OPS.get(method, method.lower())
+        if op == 'insert' and 'merge-duplicates' in prefer:
+            op = 'upsert'
+        return (rest[0] if rest else '?'), op
+    if 'storage' in parts:
+        rest = parts[parts.index('storage') + 2:]
+        if rest[:2] == ['object', 'list']:
+            return 'storage', 'list'
+        return 'storage', _STORAGE_OPS.get((rest[0] if rest else '', method), method.lower())
+    return 'http', method.lower()
+
+
+def _on_request(req):
+    req.extensions['mm_started'] = time.perf_counter()
+
+
+def _on_response(res):
+    # Runs once the status line and headers arrive, so bodies still streaming are not timed
+    started = res.request.extensions.get('mm_started')
+    if started is None:
+        return
+    target, op = describe(res.request.method, res.request.url.path, res.request.headers.get('prefer', ''))
+    record_query(target, op, time.perf_counter() - started)
+
+
+def httpx_event_hooks() -> dict:
+    return {'request': [_on_request], 'response': [_on_response]}
+
+
+# ---------- Flask request hooks ----------
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.supabase_calls = []
+
+
+def _after_request(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    calls = request_calls()
+    db_seconds = sum(s for _, _, s in calls)
+    route = _route()
+    REQUEST_SECONDS.observe(elapsed, request.method, route, response.status_code)
+    REQUEST_QUERIES.observe(len(calls), request.method, route)
+    response.headers.add('Server-Timing', f'db;dur={db_seconds * 1000:.1f};desc="{len(calls)} calls"')
+    response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+    if Config.REQUEST_LOG:
+        by_call = {}
+        for target, op, _ in calls:
+            key = f'{target}.{op}'
+            by_call[key] = by_call.get(key, 0) + 1
+        # The same call repeated within one request is the usual N+1 signature
+        repeated = {k: n for k, n in by_call.items() if n >= Config.REQUEST_LOG_REPEAT_WARN}
+        line = {
+            'method': request.method, 'route': route, 'path': request.path, 'status': response.status_code,
+            'ms': round(elapsed * 1000, 1), 'db_calls': len(calls), 'db_ms': round(db_seconds * 1000, 1),
+            'calls': by_call,
+        }
+        if repeated:
+            line['repeated'] = repeated
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(line, sort_keys=True))
+    return response
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -1,49 +1,173 @@
+import hashlib
+import time
 from functools import wraps
+import jwt
 from flask import request, jsonify
-from app.core.supabase_client import supabase
+from app.core.config import Config
+from app.utils.cache import TTLCache
+from app.utils.errors import UnauthorizedError
+
+# Verified users keyed by sha256(token) so raw tokens never sit in memory
+_token_cache = TTLCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+_verification_counts = {'local': 0, 'remote': 0}
+_jwks_client = None
+
+
+class LocalKeyUnavailable(UnauthorizedError):
+    """No local secret/JWKS can check this token's algorithm."""
+    pass
+
+
+class VerifiedUser:
+    """Minimal stand-in for gotrue's User, built from verified JWT claims."""
+    def __init__(self, claims: dict):
+        self.id = claims.get('sub')
+        self.email = claims.get('email')
+        self.role = claims.get('role')
+        self.aud = claims.get('aud')
+        self.user_metadata = claims.get('user_metadata') or {}
+        self.app_metadata = claims.get('app_metadata') or {}
+
+
+def _get_jwks_client():
+    global _jwks_client
+    if _jwks_client is None and Config.SUPABASE_JWKS_URL:
+        _jwks_client = jwt.PyJWKClient(Config.SUPABASE_JWKS_URL, cache_keys=True)
+    return _jwks_client
+
+
+def local_verification_available() -> bool:
+    return bool(Config.SUPABASE_JWT_SECRET or Config.SUPABASE_JWKS_URL)
+
+
+def verify_jwt_locally(token: str) -> dict:
+    """Check signature, exp and aud in-process and return the token claims."""
+    try:
+        alg = jwt.get_unverified_header(token).get('alg')
+    except jwt.InvalidTokenError:
+        raise UnauthorizedError("Malformed token")
+
+    if alg == 'HS256' and Config.SUPABASE_JWT_SECRET:
+        key = Config.SUPABASE_JWT_SECRET
+    elif alg in ('RS256', 'ES256') and _get_jwks_client():
+        try:
+            key = _get_jwks_client().get_signing_key_from_jwt(token).key
+        except Exception as e:
+            raise UnauthorizedError(f"Invalid token signature: {str(e)}")
+    else:
+        raise LocalKeyUnavailable(f"No local key configured for alg {alg}")
+
+    audience = Config.AUTH_JWT_AUDIENCE or None
+    try:
+        claims = jwt.decode(token, key, algorithms=[alg], audience=audience,
+                            options={'require': ['exp', 'sub'], 'verify_aud': audience is not None})
+    except jwt.ExpiredSignatureError:
+        raise UnauthorizedError("Token expired")
+    except jwt.InvalidAudienceError:
+        raise UnauthorizedError("Invalid token audience")
+    except jwt.InvalidSignatureError:
+        raise UnauthorizedError("Invalid token signature")
+    except jwt.MissingRequiredClaimError as e:
+        raise UnauthorizedError(f"Token has no {e.claim} claim")
+    except jwt.InvalidTokenError as e:
+        raise UnauthorizedError(f"Invalid token: {str(e)}")
+    if not claims.get('sub'):
+        raise UnauthorizedError("Token has no subject")
+    return claims
+
+
+def _verify_remotely(token: str):
+    from app.core.supabase_client import supabase
+    user_response = supabase.auth.get_user(token)
+    if not user_response or not user_response.user:
+        raise UnauthorizedError("Invalid token")
+    return user_response.user
+
+
+def authenticate_token(token: str):
+    """Resolve a bearer token to a user, hitting Supabase only on a cache miss."""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        return cached
+
+    mode = Config.AUTH_VERIFY_MODE
+    exp = None
+    user = None
+    if mode != 'remote' and local_verification_available():
+        try:
+            claims = verify_jwt_locally(token)
+            exp = claims['exp']
+            user = VerifiedUser(claims)
+            _verification_counts['local'] += 1
+        except LocalKeyUnavailable:
+            pass
+    if user is None or mode == 'both':
+        remote_user = _verify_remotely(token)
+        _verification_counts['remote'] += 1
+        if user is not None and remote_user.id != user.id:
+            raise UnauthorizedError("Invalid token")
+        user = remote_user
+
+    if exp is None:
+        try:
+            exp = jwt.decode(token, options={'verify_signature': False}).get('exp')
+        except jwt.InvalidTokenError:
+            exp = None
+    ttl = Config.AUTH_CACHE_TTL
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    _token_cache.set(key, user, ttl=ttl)
+    return user
+
+
+def auth_cache_stats() -> dict:
+    stats = _token_cache.stats()
+    stats['verified_local'] = _verification_counts['local']
+    stats['verified_remote'] = _verification_counts['remote']
+    return stats
+
+
+def _authenticate_request(token: str | None):
+    """Run the bearer-token check for a route; returns an error response or None."""
+    if not token:
+        return jsonify({'error': 'Missing authorization token'}), 401
+
+    # Remove 'Bearer ' prefix if present
+    if token.startswith('Bearer '):
+        token = token[7:]
+
+    try:
+        user = authenticate_token(token)
+    except UnauthorizedError as e:
+        return jsonify({'error': 'Invalid token', 'message': e.message}), 401
+    except Exception as e:
+        return jsonify({'error': 'Invalid token', 'message': str(e)}), 401
+
+    # Add user to request context
+    request.current_user = user
+    return None
+
 
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'error': 'Missing authorization token'}), 401
-        
-        try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            # Verify token with Supabase using admin API
-            # The service role key allows us to verify any token
-            try:
-                # Use admin API to get user from token
-                user_response = supabase.auth.get_user(token)
-                
-                if not user_response or not user_response.user:
-                    return jsonify({'error': 'Invalid token'}), 401
-                
-                # Add user to request context
-                request.current_user = user_response.user
-                return f(*args, **kwargs)
-            except Exception as auth_error:
-                # If get_user fails, try alternative method
-                # Create a client with the token to verify
-                from supabase import create_client
-                from app.core.config import Config
-                
-                temp_client = create_client(Config.SUPABASE_URL, token)
-                try:
-                    user = temp_client.auth.get_user()
-                    if user and user.user:
-                        request.current_user = user.user
-                        return f(*args, **kwargs)
-                except:
-                    pass
-                
-                return jsonify({'error': 'Invalid token', 'message': str(auth_error)}), 401
-        except Exception as e:
-            return jsonify({'error': 'Authentication failed', 'message': str(e)}), 401
-    
+        error = _authenticate_request(request.headers.get('Authorization'))
+        if error:
+            return error
+        return f(*args, **kwargs)
+
     return decorated_function
 
+
+def require_stream_auth(f):
+    """require_auth for EventSource endpoints: browsers can't set headers on an
+    EventSource, so the token may also come as the `access_token` query parameter."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = _authenticate_request(request.headers.get('Authorization') or request.args.get('access_token'))
+        if error:
+            return error
+        return f(*args, **kwargs)
+
+    return decorated_function
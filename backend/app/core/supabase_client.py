@@ -1,5 +1,184 @@
-from supabase import create_client, Client
+import os
+import threading
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client, SupabaseStorageClient
+from supabase.lib.client_options import ClientOptions
 from app.core.config import Config
+from app.core.metrics import httpx_event_hooks
+from app.utils.errors import ConflictError, NotFoundError, ValidationError
 
-supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+# Process-wide client registry. Every service shares the same clients (and so
+# the same keep-alive connection pools) instead of calling create_client itself.
+_clients: dict = {}
+_created: set = set()
+_lock = threading.Lock()
+_pid = os.getpid()
 
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=Config.SUPABASE_POOL_SIZE,
+        max_keepalive_connections=Config.SUPABASE_POOL_KEEPALIVE,
+        keepalive_expiry=Config.SUPABASE_KEEPALIVE_EXPIRY,
+    )
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    def __init__(self, base_url: str, *, limits: httpx.Limits, **kwargs):
+        self._limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=self._limits,
+                          event_hooks=httpx_event_hooks())
+
+
+class _PooledStorageClient(SupabaseStorageClient):
+    def __init__(self, url: str, headers: dict, timeout, *, limits: httpx.Limits):
+        self._limits = limits
+        super().__init__(url, headers, timeout)
+
+    def _create_session(self, base_url, headers, timeout):
+        return SyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=self._limits,
+                          event_hooks=httpx_event_hooks())
+
+
+class PooledClient(Client):
+    """Supabase client whose PostgREST and storage sessions use a bounded keep-alive pool
+    and report every call to app.core.metrics."""
+
+    def __init__(self, supabase_url: str, supabase_key: str, options: ClientOptions, limits: httpx.Limits):
+        self._limits = limits
+        super().__init__(supabase_url, supabase_key, options)
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout):
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, limits=self._limits)
+
+    def _init_storage_client(self, storage_url, headers, storage_client_timeout):
+        return _PooledStorageClient(storage_url, headers, storage_client_timeout, limits=self._limits)
+
+
+def _create(name: str) -> Client:
+    # A fresh ClientOptions per client: the library default instance is shared
+    # and mutated (auth headers) by every client built from it.
+    options = ClientOptions(
+        postgrest_client_timeout=Config.SUPABASE_TIMEOUT,
+        storage_client_timeout=Config.SUPABASE_STORAGE_TIMEOUT,
+    )
+    if name == 'admin':
+        # Never holds a user session, so sign-ins elsewhere cannot swap its auth header
+        options.auto_refresh_token = False
+        options.persist_session = False
+    return PooledClient(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY, options, _pool_limits())
+
+
+def _after_fork():
+    # A forked worker must not reuse sockets it inherited from the parent: forget the
+    # clients created there (without closing them) so this process builds its own.
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            for name in _created:
+                _clients.pop(name, None)
+            _created.clear()
+            _pid = os.getpid()
+
+
+def get_client(name: str = 'default') -> Client:
+    """Return the shared client registered under `name`, creating it on first use."""
+    if _pid != os.getpid():
+        _after_fork()
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _create(name)
+                _clients[name] = client
+                _created.add(name)
+    return client
+
+
+class ClientProxy:
+    """Stands in for the client registered under `name`, looking it up on every use.
+
+    Services built at import time (the route module singletons) hold one of these
+    rather than a client, so no connection pool is opened before the server forks
+    its workers and each worker resolves to its own client.
+    """
+
+    __slots__ = ('_name',)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_client(self._name), attr)
+
+    def __repr__(self):
+        return f'<ClientProxy {self._name}>'
+
+
+def get_admin_client() -> ClientProxy:
+    """Shared service-role client for server-side queries (bypasses RLS)."""
+    return ClientProxy('admin')
+
+
+def register_client(name: str, client) -> None:
+    """Install a client under `name` (e.g. a test double) in place of the default."""
+    with _lock:
+        _clients[name] = client
+        _created.discard(name)
+
+
+def reset_clients() -> None:
+    """Drop all registered clients and close their connection pools."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _created.clear()
+    for client in clients:
+        for attr in ('_postgrest', '_storage'):
+            sub = getattr(client, attr, None)
+            try:
+                if sub is not None:
+                    sub.session.close()
+            except Exception:
+                pass
+
+
+# SQLSTATEs raised by the functions in scripts/setup_database.sql
+_RPC_ERRORS = {
+    'P0002': NotFoundError,
+    '42501': ValidationError,
+    '40001': ConflictError,
+    # invalid_text_representation: a malformed id passed to a uuid parameter
+    '22P02': ValidationError,
+}
+
+
+def call_rpc(client, fn: str, params: dict, many: bool = False):
+    """Call a Postgres function and return its single result row (every row with
+    `many=True`), mapping the errors our functions raise onto the app's exception types."""
+    try:
+        res = client.rpc(fn, params).execute()
+    except Exception as e:
+        error = _RPC_ERRORS.get(getattr(e, 'code', None))
+        if error:
+            raise error(getattr(e, 'message', None) or str(e)) from e
+        raise
+    data = res.data
+    if many:
+        return data or []
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data
+
+
+def __getattr__(name):
+    # `from app.core.supabase_client import supabase` keeps working, resolved lazily
+    if name == 'supabase':
+        return get_client()
+    raise AttributeError(name)
@@ -1,8 +1,9 @@
 from app import create_app
+from app.core.config import Config
 
+# WSGI entry point: `gunicorn -c gunicorn.conf.py` serves this app
 app = create_app()
 
 if __name__ == '__main__':
     # Use port 5001 to avoid conflict with macOS AirPlay Receiver on port 5000
-    app.run(debug=True, port=5001)
-
+    app.run(debug=Config.FLASK_DEBUG in ('1', 'true', 'True'), port=5001)
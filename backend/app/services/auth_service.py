@@ -1,12 +1,14 @@
-from app.core.supabase_client import supabase
+from app.core.supabase_client import ClientProxy, get_admin_client
 from app.core.config import Config
+from app.services.hydration import invalidate_cached
 from app.utils.errors import ValidationError, UnauthorizedError, NotFoundError
-from supabase import create_client
+from app.utils.uploads import spooled
 import time
 
 class AuthService:
-    def __init__(self):
-        self.supabase = supabase
+    def __init__(self, client=None, admin=None):
+        self.supabase = client or ClientProxy('default')
+        self.admin = admin or get_admin_client()
     
     def signup(self, email: str, password: str, first_name: str, last_name: str):
         """Register a new user and create their profile immediately."""
@@ -17,8 +19,7 @@ class AuthService:
         if not Config.SUPABASE_SERVICE_KEY:
             raise ValidationError("Service role key not configured. Please set SUPABASE_SERVICE_KEY in your .env file.")
         
-        admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
-        print(f"Using service role key (first 10 chars): {Config.SUPABASE_SERVICE_KEY[:10]}...")
+        admin_client = self.admin
         
         try:
             # Step 1: Create user in Supabase Auth
@@ -164,7 +165,7 @@ class AuthService:
             access_token = auth_response.session.access_token
             
             # Get user profile - create if it doesn't exist
-            admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+            admin_client = self.admin
             
             try:
                 user_profile = admin_client.table('users').select('*').eq('id', user_id).execute()
@@ -234,7 +235,7 @@ class AuthService:
     def get_public_user(self, user_id: str):
         """Fetch a user's public profile using service role (bypass RLS)."""
         try:
-            admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+            admin_client = self.admin
             res = admin_client.table('users').select('*').eq('id', user_id).execute()
             rows = res.data or []
             if not rows:
@@ -292,16 +293,14 @@ class AuthService:
                 raise ValidationError("Last name cannot be empty")
             
             # Update user profile
-            from app.core.config import Config
-            from supabase import create_client
-            
-            admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+            admin_client = self.admin
             result = admin_client.table('users').update(update_data).eq('id', user_id).execute()
             
             if not result.data or len(result.data) == 0:
                 raise NotFoundError("User not found")
             
             updated_user = result.data[0]
+            invalidate_cached('users', user_id)
             return {
                 'id': updated_user['id'],
                 'email': updated_user['email'],
@@ -320,12 +319,10 @@ class AuthService:
     def upload_profile_picture(self, user_id: str, file):
         """Upload profile picture to Supabase storage and update user profile."""
         try:
-            from app.core.config import Config
-            from supabase import create_client
             import uuid
             import os
             
-            admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+            admin_client = self.admin
             
             # Check if bucket exists, create if it doesn't
             try:
@@ -351,19 +348,17 @@ class AuthService:
             file_ext = os.path.splitext(file.filename)[1] or '.jpg'
             filename = f"{user_id}/{uuid.uuid4()}{file_ext}"
             
-            # Upload to Supabase storage
-            file_data = file.read()
-            
-            # Upload file (upsert to replace if exists)
+            # Upload file (upsert to replace if exists), streaming from the spooled upload
             try:
-                result = admin_client.storage.from_('profile-pictures').upload(
-                    filename,
-                    file_data,
-                    file_options={
-                        "content-type": file.content_type or "image/jpeg",
-                        "upsert": "true"
-                    }
-                )
+                with spooled(file.stream) as upload, upload.open_reader() as body:
+                    result = admin_client.storage.from_('profile-pictures').upload(
+                        filename,
+                        body,
+                        file_options={
+                            "content-type": file.content_type or "image/jpeg",
+                            "upsert": "true"
+                        }
+                    )
             except Exception as upload_error:
                 error_msg = str(upload_error)
                 if 'bucket' in error_msg.lower() or 'not found' in error_msg.lower():
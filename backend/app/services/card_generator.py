@@ -0,0 +1,147 @@
+"""Flashcard extraction from lecture text.
+
+Cards come from four sources, in order: "term: definition" lines, "X is Y"
+sentences, appositives after the most frequent capitalized terms, and (only when
+nothing else matched) cloze deletions. Patterns are compiled once, the appositive
+lookup for all terms is one scan of the text, and cards are yielded lazily so
+extraction stops as soon as the cap is reached.
+"""
+import heapq
+import re
+from typing import Iterator
+
+MAX_CARDS = 60
+TOP_TERMS = 30
+
+_WHITESPACE = re.compile(r"\s+")
+_DEFINITION_LINE = re.compile(r"^([A-Za-z][A-Za-z0-9\- '()]+)\s*[:\-–]\s*(.+)$")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_IS_SENTENCE = re.compile(r"^([A-Z][A-Za-z0-9\- '()]{2,80})\s+(is|are|was|were)\s+(.{5,300})$")
+_WORD = re.compile(r"[A-Za-z][A-Za-z\-']+")
+_APPOSITIVE_TAIL = r"\s*(?:\-|\—|,|:)\s*([^.;]{5,160})"
+
+
+def _definition_cards(text: str) -> Iterator[dict]:
+    for ln in text.splitlines():
+        ln = ln.strip()
+        if not ln:
+            continue
+        m = _DEFINITION_LINE.match(ln)
+        if m:
+            term, definition = m.group(1).strip(), m.group(2).strip()
+            if 2 < len(term) <= 80 and 5 <= len(definition) <= 300:
+                yield {
+                    'question': f"Define: {term}"[:180],
+                    'answer'  : definition[:300]
+                }
+
+
+def _is_sentence_cards(sentences: list[str]) -> Iterator[dict]:
+    for s in sentences:
+        m = _IS_SENTENCE.match(s.strip())
+        if m:
+            term = m.group(1).strip()
+            definition = m.group(3).strip()
+            # Skip if sentence is too long or clearly not a definition
+            if len(s) <= 240:
+                yield {
+                    'question': f"What is {term}?"[:180],
+                    'answer'  : definition.rstrip('. ')[:300]
+                }
+
+
+def top_capitalized_terms(text: str, n: int = TOP_TERMS) -> list[str]:
+    """Most frequent capitalized words, ties in order of first appearance."""
+    freq: dict[str, int] = {}
+    for t in _WORD.findall(text):
+        if t[0].isupper() and len(t) > 2:
+            freq[t] = freq.get(t, 0) + 1
+    # Same ordering as sorted(..., reverse=True)[:n] without sorting the whole vocabulary
+    return [term for term, _ in heapq.nlargest(n, freq.items(), key=lambda x: x[1])]
+
+
+def first_appositives(norm: str, terms: list[str]) -> dict:
+    """{term: text after its first "Term -/,/: explanation" occurrence} for each term
+    that has one.
+
+    One zero-width lookahead scan finds every term at once, so matches may overlap
+    the way separate per-term searches do. Longer terms are tried first at each
+    position; a term that is a prefix of another (e.g. "Well" and "Well-known") can
+    be shadowed by it there, so those few are looked up individually.
+    """
+    found = {}
+    if not terms:
+        return found
+    shadowed = {t for t in terms if any(u != t and u.startswith(t) for u in terms)}
+    scanned = sorted((t for t in terms if t not in shadowed), key=len, reverse=True)
+    if scanned:
+        alternation = '|'.join(re.escape(t) for t in scanned)
+        pattern = re.compile(rf"(?=\b({alternation})\b{_APPOSITIVE_TAIL})")
+        remaining = len(scanned)
+        for m in pattern.finditer(norm):
+            term = m.group(1)
+            if term not in found:
+                found[term] = m.group(2)
+                remaining -= 1
+                if not remaining:
+                    break
+    for term in shadowed:
+        m = re.search(rf"\b{re.escape(term)}\b{_APPOSITIVE_TAIL}", norm)
+        if m:
+            found[term] = m.group(1)
+    return found
+
+
+def _appositive_cards(text: str, norm: str) -> Iterator[dict]:
+    common = top_capitalized_terms(text)
+    definitions = first_appositives(norm, common)
+    for term in common:
+        if term in definitions:
+            yield {
+                'question': f"Define: {term}"[:180],
+                'answer': definitions[term].strip()[:300]
+            }
+
+
+def _cloze_cards(sentences: list[str]) -> Iterator[dict]:
+    for s in sentences[:20]:
+        words = s.split()
+        if len(words) > 6:
+            mid = max(1, len(words)//3)
+            answer = words[mid]
+            words[mid] = '____'
+            q = ' '.join(words) + '?'
+            yield {'question': q[:180], 'answer': answer[:180]}
+
+
+def iter_cards(text: str, limit: int = MAX_CARDS) -> Iterator[dict]:
+    """Yield up to `limit` cards with distinct questions, in extraction order."""
+    if limit <= 0:
+        return
+    norm = _WHITESPACE.sub(" ", text)
+    sentences = _SENTENCE_BREAK.split(norm)
+    seen = set()
+
+    def sources():
+        yield from _definition_cards(text)
+        yield from _is_sentence_cards(sentences)
+        yield from _appositive_cards(text, norm)
+
+    for card in sources():
+        if card['question'] not in seen:
+            seen.add(card['question'])
+            yield card
+            if len(seen) >= limit:
+                return
+    # Fallback: make a few cloze deletions for practice
+    if not seen:
+        for card in _cloze_cards(sentences):
+            if card['question'] not in seen:
+                seen.add(card['question'])
+                yield card
+                if len(seen) >= limit:
+                    return
+
+
+def generate_cards(text: str, limit: int = MAX_CARDS) -> list[dict]:
+    return list(iter_cards(text, limit))
@@ -1,15 +1,15 @@
-from app.core.supabase_client import supabase
+from app.core.supabase_client import get_admin_client
 from app.core.config import Config
+from app.services.membership_service import MembershipService
 from app.utils.errors import ValidationError, NotFoundError, UnauthorizedError
-from supabase import create_client
+from app.utils.pagination import DEFAULT_LIMIT, keyset, page_of
 
 class ClassService:
-    def __init__(self):
-        self.supabase = supabase
-        if not Config.SUPABASE_SERVICE_KEY:
+    def __init__(self, admin=None):
+        if admin is None and not Config.SUPABASE_SERVICE_KEY:
             raise ValueError("Service role key not configured. Please set SUPABASE_SERVICE_KEY in your .env file.")
-        self.admin_client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
-        print(f"ClassService initialized with service role key (first 10 chars): {Config.SUPABASE_SERVICE_KEY[:10]}...")
+        self.admin_client = admin or get_admin_client()
+        self.members = MembershipService(self.admin_client)
     
     def create_class(self, name: str, creator_user_id: str):
         """Create a new class and add creator as a member."""
@@ -34,16 +34,18 @@ class ClassService:
                 'class_id': class_id,
                 'role': 'member'
             }).execute()
+            self.members.record(creator_user_id, class_id, 'member')
             
             return class_data
         except Exception as e:
             raise ValidationError(f"Failed to create class: {str(e)}")
             
-    def list_all_classes(self):
-        """List all classes (public catalog)."""
+    def list_all_classes(self, limit: int = DEFAULT_LIMIT, cursor=None):
+        """List all classes (public catalog), a page at a time in name order."""
         try:
-            res = self.admin_client.table('classes').select('*').order('name').execute()
-            return res.data or []
+            query = self.admin_client.table('classes').select('*')
+            res = keyset(query, limit, cursor, column='name', desc=False).execute()
+            return page_of(res.data or [], limit, column='name')
         except Exception as e:
             raise ValidationError(f"Failed to list classes: {str(e)}")
     
@@ -60,8 +62,9 @@ class ClassService:
                 raise NotFoundError("Class not found")
             
             # Check if already member
-            existing = self.admin_client.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
+            existing = self.admin_client.table('class_members').select('user_id, role').eq('class_id', class_id).eq('user_id', user_id).execute()
             if existing.data:
+                self.members.record(user_id, class_id, existing.data[0].get('role') or 'member')
                 return cls.data
             
             # Add member
@@ -70,6 +73,7 @@ class ClassService:
                 'class_id': class_id,
                 'role': 'member'
             }).execute()
+            self.members.record(user_id, class_id, 'member')
             return cls.data
         except NotFoundError:
             raise
@@ -105,10 +109,10 @@ class ClassService:
             if not class_result.data:
                 raise NotFoundError("Class not found")
             class_data = class_result.data[0]
-            membership = self.admin_client.table('class_members').select('*').eq('class_id', class_id).eq('user_id', user_id).execute()
-            if not membership.data:
+            role = self.members.role(user_id, class_id)
+            if role is None:
                 raise UnauthorizedError("You are not a member of this class")
-            class_data['user_role'] = membership.data[0].get('role', 'member')
+            class_data['user_role'] = role
             return class_data
         except NotFoundError:
             raise
@@ -131,6 +135,7 @@ class ClassService:
  
             # Remove membership
             self.admin_client.table('class_members').delete().eq('class_id', class_id).eq('user_id', user_id).execute()
+            self.members.forget(user_id, class_id)
             # Do not delete the class even if it becomes empty.
             return {'status': 'left'}
         except NotFoundError:
@@ -0,0 +1,42 @@
+import hashlib
+import threading
+from app.core.config import Config
+from app.utils.cache import DiskLRUCache
+from app.utils.uploads import SpooledUpload
+
+# Bump when extraction, summarization or card generation changes so stale
+# results are not served for the same bytes
+CACHE_VERSION = 2
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_content_cache() -> DiskLRUCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskLRUCache(Config.CONTENT_CACHE_DIR, Config.CONTENT_CACHE_MAX_BYTES)
+    return _cache
+
+
+def file_digest(file) -> str:
+    """SHA-256 of an uploaded file's bytes; leaves the stream at the start."""
+    if isinstance(file, SpooledUpload):
+        return file.digest
+    h = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(1 << 20), b''):
+        h.update(chunk)
+    file.seek(0)
+    return h.hexdigest()
+
+
+def combined_digest(digests) -> str:
+    """Digest of an ordered group of uploads, e.g. the PDFs behind one deck."""
+    return hashlib.sha256('\n'.join(digests).encode()).hexdigest()
+
+
+def content_key(kind: str, digest: str) -> str:
+    return f"{kind}:v{CACHE_VERSION}:{digest}"
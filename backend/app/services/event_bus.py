@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from app.core.config import Config
+
+try:
+    import redis  # type: ignore
+except Exception:
+    redis = None  # EVENT_BUS=redis unavailable; the in-memory bus still works
+
+# Events are small dicts: {'type': 'comment.created', 'data': {...}}. Channels are
+# '<target_type>:<id>', e.g. 'note:<uuid>' or 'deck:<uuid>'.
+
+logger = logging.getLogger(__name__)
+
+# Queued for a subscriber whose queue overflowed; the client should refetch
+RESYNC = {'type': 'resync', 'data': None}
+
+# Seconds the Redis listener waits before reconnecting, doubling up to the maximum
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+def channel_for(target_type: str, target_id: str) -> str:
+    return f'{target_type}:{target_id}'
+
+
+class Subscription:
+    """One viewer's bounded queue of events for a channel."""
+
+    def __init__(self, bus, channel: str, maxsize: int):
+        self.bus = bus
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def put(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A slow reader loses the backlog but is told to catch up, never blocks publishers
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            self._queue.put_nowait(RESYNC)
+
+    def get(self, timeout: float | None = None):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+
+
+class MemoryEventBus:
+    """In-process pub/sub. Only reaches subscribers in the publishing worker process."""
+
+    def __init__(self, queue_size: int | None = None):
+        self.queue_size = queue_size or Config.STREAM_QUEUE_SIZE
+        self._subs = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        sub = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.channel]
+
+    def publish(self, channel: str, event: dict):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.put(event)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def resync_all(self):
+        """Tell every subscriber it may have missed events."""
+        with self._lock:
+            subs = [sub for subs in self._subs.values() for sub in subs]
+        for sub in subs:
+            sub.put(RESYNC)
+
+
+class RedisEventBus:
+    """Pub/sub shared by every worker through Redis. Each process runs one listener
+    thread that fans messages out to its local subscribers."""
+
+    def __init__(self, url: str, prefix: str = 'mm:events:', queue_size: int | None = None):
+        if redis is None:
+            raise RuntimeError("EVENT_BUS=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._local = MemoryEventBus(queue_size)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, name='event-bus', daemon=True)
+                    self._listener.start()
+
+    def _listen(self):
+        # Runs for the life of the process: a dropped connection is retried with backoff,
+        # and once back every viewer is told to refetch what it may have missed
+        delay = RECONNECT_DELAY
+        failed = False
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{self.prefix}*')
+                if failed:
+                    logger.info('event bus: reconnected to Redis')
+                    self._local.resync_all()
+                    failed, delay = False, RECONNECT_DELAY
+                for message in pubsub.listen():
+                    try:
+                        channel = message['channel'].decode()[len(self.prefix):]
+                        self._local.publish(channel, json.loads(message['data']))
+                    except Exception:
+                        continue
+            except Exception:
+                logger.exception('event bus: Redis subscription failed, retrying in %.1fs', delay)
+            else:
+                logger.warning('event bus: Redis subscription ended, retrying in %.1fs', delay)
+            failed = True
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._ensure_listener()
+        return self._local.subscribe(channel)
+
+    def unsubscribe(self, sub: Subscription):
+        self._local.unsubscribe(sub)
+
+    def publish(self, channel: str, event: dict):
+        self._redis.publish(f'{self.prefix}{channel}', json.dumps(event, default=str))
+
+    def subscriber_count(self) -> int:
+        return self._local.subscriber_count()
+
+
+def _build_bus():
+    if Config.EVENT_BUS == 'redis':
+        return RedisEventBus(Config.REDIS_URL)
+    return MemoryEventBus()
+
+
+_bus = None
+_bus_pid = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    # Subscribers, the Redis connection and its listener thread all belong to one process
+    global _bus, _bus_pid
+    if _bus is None or _bus_pid != os.getpid():
+        with _bus_lock:
+            if _bus is None or _bus_pid != os.getpid():
+                _bus = _build_bus()
+                _bus_pid = os.getpid()
+    return _bus
+
+
+def set_event_bus(bus):
+    """Install a bus (e.g. a fresh MemoryEventBus in tests)."""
+    global _bus, _bus_pid
+    with _bus_lock:
+        _bus = bus
+        _bus_pid = os.getpid()
+
+
+def publish(target_type: str, target_id: str, event_type: str, data=None):
+    """Best-effort publish: a failed push never fails the write that triggered it."""
+    try:
+        get_event_bus().publish(channel_for(target_type, target_id), {'type': event_type, 'data': data})
+    except Exception:
+        pass
@@ -1,11 +1,69 @@
-from io import BytesIO
-from typing import Optional
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+from app.core.config import Config
+from app.utils.uploads import spooled
 
 try:
     import PyPDF2  # type: ignore
 except Exception:
     PyPDF2 = None  # Will raise informative error when used
 
+
+def _page_text(page) -> str:
+    try:
+        return page.extract_text() or ''
+    except Exception:
+        return ''
+
+
+# Reader for the PDF a pool worker is currently sharding, reused across its page ranges
+_worker_reader = (None, None)
+
+
+def _extract_page_range(path: str, digest: str, start: int, stop: int) -> list:
+    """Text of pages [start, stop) of the spooled PDF at `path`. Runs inside a pool worker."""
+    global _worker_reader
+    # Temp file names get reused, so the digest identifies the document
+    if _worker_reader[0] != (path, digest):
+        _worker_reader = ((path, digest), PyPDF2.PdfReader(path))
+    reader = _worker_reader[1]
+    return [_page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process pool for page extraction, created lazily once per server process."""
+    global _pool, _pool_pid
+    # A single worker process is serial extraction plus pickling; extract in-process instead
+    if Config.PDF_EXTRACT_WORKERS < 2:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn rather than fork: extraction is started from request/job threads
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_extract_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
 class FileService:
     def __init__(self):
         pass
@@ -14,22 +72,57 @@ class FileService:
         """Extract text from a PDF file-like object (Werkzeug FileStorage) using PyPDF2.
         Returns a single cleaned string.
         """
+        combined = "\n".join(self.iter_pdf_pages(pdf_file))
+        return self._clean_text(combined)
+    
+    def iter_pdf_pages(self, pdf_file) -> Iterator[str]:
+        """Yield the raw text of each page in order. Large PDFs are extracted in parallel
+        page ranges; a page that fails to parse yields ''.
+        """
         if PyPDF2 is None:
             raise RuntimeError("PyPDF2 is not installed. Please add PyPDF2 to requirements and install.")
-        raw = pdf_file.read()
-        if not raw:
-            return ''
-        pdf_file.seek(0)
-        reader = PyPDF2.PdfReader(BytesIO(raw))
-        parts = []
-        for page in reader.pages:
+        # Parse straight from the spooled upload's pages instead of a bytes copy
+        with spooled(pdf_file) as upload:
+            if not upload.size:
+                return
+            with upload.mapped() as data:
+                reader = PyPDF2.PdfReader(data)
+                total = len(reader.pages)
+                pool = _get_pool() if total >= max(Config.PDF_PARALLEL_MIN_PAGES, 1) else None
+                if pool is None:
+                    for page in reader.pages:
+                        yield _page_text(page)
+                    return
+                yield from self._iter_pages_parallel(upload, reader, total, pool)
+    
+    def _iter_pages_parallel(self, upload, reader, total: int, pool) -> Iterator[str]:
+        # Workers open the spooled file themselves instead of each receiving a pickled copy
+        step = max(Config.PDF_PAGES_PER_TASK, 1)
+        futures = []
+        try:
             try:
-                text = page.extract_text() or ''
-            except Exception:
-                text = ''
-            parts.append(text)
-        combined = "\n".join(parts)
-        return self._clean_text(combined)
+                for start in range(0, total, step):
+                    stop = min(start + step, total)
+                    futures.append((start, stop, pool.submit(_extract_page_range, upload.path, upload.digest, start, stop)))
+            except BrokenProcessPool:
+                shutdown_extract_pool()
+            # Ranges finish out of order; yield each as soon as everything before it is done
+            done = 0
+            for start, stop, future in futures:
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    # A crashed worker only costs its own range, which is redone here
+                    if isinstance(e, BrokenProcessPool):
+                        shutdown_extract_pool()
+                    pages = [_page_text(reader.pages[i]) for i in range(start, stop)]
+                yield from pages
+                done = stop
+            for i in range(done, total):
+                yield _page_text(reader.pages[i])
+        finally:
+            for _, _, future in futures:
+                future.cancel()
     
     def _clean_text(self, text: str) -> str:
         # Basic cleanup: normalize whitespace, remove excessive blank lines
@@ -1,14 +1,22 @@
 from app.core.config import Config
-from app.core.supabase_client import supabase
-from supabase import create_client
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services import card_generator
+from app.services.content_cache import combined_digest, content_key, file_digest, get_content_cache
 from app.services.file_service import FileService
+from app.services.hydration import get_loader
+from app.services.membership_service import MembershipService
+from app.services.vote_service import VoteService
+from app.utils.errors import ValidationError
+from app.utils.pagination import DEFAULT_LIMIT, keyset, page_of
+from app.utils.projection import select_columns
 import uuid
 import os
 
 class FlashcardService:
-    def __init__(self):
-        self.supabase = supabase
-        self.admin = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+        self.members = MembershipService(self.admin)
+        self.votes = VoteService(self.admin)
         self.files = FileService()
     
     def create_deck(self, class_id: str, title: str, user_id: str, session_id: str = None, public: bool = True):
@@ -17,9 +25,20 @@ class FlashcardService:
         pass
     
     def generate_flashcards(self, deck_id: str, note_id: str, count: int, user_id: str):
-        """Generate flashcards from a note using AI."""
-        # TODO: Implement AI flashcard generation
-        pass
+        """Generate up to `count` flashcards from a note's text into one of the user's decks."""
+        deck = self._require_own_deck(deck_id, user_id)
+        note_res = self.admin.table('notes').select('id, session_id, content, created_by, public').eq('id', note_id).execute()
+        if not note_res.data:
+            raise ValueError('Note not found')
+        note = note_res.data[0]
+        if note.get('public') is False and note.get('created_by') != user_id:
+            raise ValueError('Forbidden')
+        class_id = get_loader(self.admin).session_classes([note.get('session_id')]).get(note.get('session_id'))
+        if class_id and not self.members.is_member(user_id, class_id):
+            raise ValueError('Forbidden')
+        limit = max(1, min(int(count or card_generator.MAX_CARDS), card_generator.MAX_CARDS))
+        cards = card_generator.generate_cards(note.get('content') or '', limit=limit)
+        return self.insert_cards(deck['id'], cards, user_id)
     
     def get_deck(self, deck_id: str, user_id: str):
         """Get deck with all cards, ensuring viewer membership to class or creator."""
@@ -33,31 +52,91 @@ class FlashcardService:
         # ensure viewer is member of class
         class_id = deck.get('class_id')
         if class_id:
-            mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-            if not mem.data and deck.get('created_by') != user_id:
+            if deck.get('created_by') != user_id and not self.members.is_member(user_id, class_id):
                 raise ValueError('Forbidden')
         cards = self.admin.table('flashcards').select('id, question, answer').eq('deck_id', deck_id).order('created_at').execute()
         deck['cards'] = cards.data or []
+        loader = get_loader(self.admin)
         # attach class
-        cls = None
-        if class_id:
-            c = self.admin.table('classes').select('id, name').eq('id', class_id).single().execute()
-            if c.data:
-                cls = {'id': c.data['id'], 'name': c.data.get('name','')}
-        deck['cls'] = cls
+        deck['cls'] = loader.classes([class_id]).get(class_id) if class_id else None
         # attach author
         try:
-            u = self.admin.table('users').select('id, first_name, last_name').eq('id', deck.get('created_by')).single().execute()
-            if u.data:
-                deck['author'] = {'id': u.data['id'], 'first_name': u.data.get('first_name',''), 'last_name': u.data.get('last_name','')}
+            author = loader.authors([deck.get('created_by')]).get(deck.get('created_by'))
+            if author:
+                deck['author'] = author
         except Exception:
             pass
         return deck
     
     def create_card(self, deck_id: str, question: str, answer: str, user_id: str, topic: str = None):
         """Create a flashcard manually."""
-        # TODO: Implement create card
-        pass
+        result = self.add_cards(deck_id, [{'question': question, 'answer': answer, 'topic': topic}], user_id)
+        if result['failed']:
+            raise ValueError(result['failed'][0]['error'])
+        if not result['cards']:
+            raise ValidationError("The card could not be created")
+        return result['cards'][0]
+
+    def add_cards(self, deck_id: str, cards: list[dict], user_id: str):
+        """Bulk-add cards to one of the user's decks. See insert_cards for the result shape."""
+        self._require_own_deck(deck_id, user_id)
+        return self.insert_cards(deck_id, cards, user_id)
+
+    def insert_cards(self, deck_id: str, cards: list[dict], user_id: str, batch_size: int | None = None):
+        """Insert cards with one request per batch of CARD_INSERT_BATCH_SIZE rows.
+
+        Returns {'cards': [created rows], 'failed': [{'index', 'question', 'error'}]}.
+        Invalid cards are rejected up front; a batch the database refuses is split in
+        half and retried until the offending rows are isolated, so one bad card does
+        not sink the rest.
+        """
+        batch_size = max(1, batch_size or Config.CARD_INSERT_BATCH_SIZE)
+        valid, failed = self._validate_cards(cards)
+        rows = [(i, {'deck_id': deck_id, **card, 'created_by': user_id}) for i, card in valid]
+        created = []
+        for start in range(0, len(rows), batch_size):
+            self._insert_batch(rows[start:start + batch_size], created, failed)
+        failed.sort(key=lambda f: f['index'])
+        return {'cards': created, 'failed': failed}
+
+    def _validate_cards(self, cards: list):
+        """Split cards into ([(index, {question, answer, topic?})], [failure])."""
+        valid, failed = [], []
+        for i, c in enumerate(cards):
+            if not isinstance(c, dict):
+                failed.append({'index': i, 'question': '', 'error': 'card must be an object'})
+                continue
+            question = (c.get('question') or '').strip()
+            answer = (c.get('answer') or '').strip()
+            if not question or not answer:
+                failed.append({'index': i, 'question': question, 'error': 'question and answer are required'})
+                continue
+            card = {'question': question, 'answer': answer}
+            if c.get('topic'):
+                card['topic'] = c['topic']
+            valid.append((i, card))
+        return valid, failed
+
+    def _insert_batch(self, batch: list, created: list, failed: list):
+        try:
+            res = self.admin.table('flashcards').insert([row for _, row in batch]).execute()
+            created.extend(res.data or [])
+        except Exception as e:
+            if len(batch) == 1:
+                i, row = batch[0]
+                failed.append({'index': i, 'question': row['question'], 'error': str(e)})
+                return
+            mid = len(batch) // 2
+            self._insert_batch(batch[:mid], created, failed)
+            self._insert_batch(batch[mid:], created, failed)
+
+    def _require_own_deck(self, deck_id: str, user_id: str):
+        res = self.admin.table('flashcard_decks').select('id, created_by').eq('id', deck_id).execute()
+        if not res.data:
+            raise ValueError('Deck not found')
+        if res.data[0].get('created_by') != user_id:
+            raise ValueError('You can only add cards to your own decks')
+        return res.data[0]
     
     def update_card(self, card_id: str, updates: dict, user_id: str):
         """Update a flashcard."""
@@ -69,188 +148,116 @@ class FlashcardService:
         # TODO: Implement delete card
         pass
 
-    def list_public_decks_by_user(self, target_user_id: str, viewer_user_id: str):
-        res = self.admin.table('flashcard_decks').select('*').eq('created_by', target_user_id).execute()
-        decks = res.data or []
-        if not decks:
-            return []
-        visible = []
-        for d in decks:
-            if 'public' in d and d['public'] is False:
-                continue
-            class_id = d.get('class_id')
-            if not class_id:
-                continue
-            mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', viewer_user_id).execute()
-            if mem.data:
-                visible.append(d)
+    def list_public_decks_by_user(self, target_user_id: str, viewer_user_id: str, limit: int = DEFAULT_LIMIT, cursor=None, fields: str | None = None):
+        member_of = get_loader(self.admin).member_class_ids(viewer_user_id)
+        if not member_of:
+            return [], None
+        query = (self.admin.table('flashcard_decks').select(select_columns('flashcard_decks', fields))
+                 .eq('created_by', target_user_id).eq('public', True).in_('class_id', list(member_of)))
+        res = keyset(query, limit, cursor).execute()
+        decks, next_cursor = page_of(res.data or [], limit)
         # attach class name
-        class_ids = list({d.get('class_id') for d in visible if d.get('class_id')})
-        classes_map = {}
-        if class_ids:
-            c = self.admin.table('classes').select('id, name').in_('id', class_ids).execute()
-            for row in (c.data or []):
-                classes_map[row['id']] = {'id': row['id'], 'name': row.get('name', '')}
-        for d in visible:
+        classes_map = get_loader(self.admin).classes({d.get('class_id') for d in decks})
+        for d in decks:
             d['cls'] = classes_map.get(d.get('class_id'))
-        visible.sort(key=lambda x: x.get('created_at') or '', reverse=True)
-        return visible
+        return decks, next_cursor
 
     # ---------- Deck creation from PDFs ----------
     def _generate_cards_from_text(self, text: str):
-        import re
-        cards: list[dict] = []
-
-        # Normalize whitespace
-        norm = re.sub(r"\s+", " ", text)
-
-        # 1) Capture explicit definition patterns (term : definition) or (term – definition)
-        def_lines = [l.strip() for l in text.splitlines() if l.strip()]
-        for ln in def_lines:
-            m = re.match(r"^([A-Za-z][A-Za-z0-9\- '()]+)\s*[:\-–]\s*(.+)$", ln)
-            if m:
-                term, definition = m.group(1).strip(), m.group(2).strip()
-                if 2 < len(term) <= 80 and 5 <= len(definition) <= 300:
-                    cards.append({
-                        'question': f"Define: {term}"[:180],
-                        'answer'  : definition[:300]
-                    })
-
-        # 2) Sentences with "X is/are Y" shaped definitions
-        sentences = re.split(r"(?<=[.!?])\s+", norm)
-        for s in sentences:
-            m = re.match(r"^([A-Z][A-Za-z0-9\- '()]{2,80})\s+(is|are|was|were)\s+(.{5,300})$", s.strip())
-            if m:
-                term = m.group(1).strip()
-                definition = m.group(3).strip()
-                # Skip if sentence is too long or clearly not a definition
-                if len(s) <= 240:
-                    cards.append({
-                        'question': f"What is {term}?"[:180],
-                        'answer'  : definition.rstrip('. ')[:300]
-                    })
-
-        # 3) Key vocabulary: take frequent capitalized nouns and try to find appositive/short explanation
-        tokens = re.findall(r"[A-Za-z][A-Za-z\-']+", text)
-        freq: dict[str,int] = {}
-        for t in tokens:
-            if t[0].isupper() and len(t) > 2:
-                freq[t] = freq.get(t, 0) + 1
-        common = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:30]
-        for term, _ in common:
-            # Find first short phrase containing the term followed by a comma or dash
-            m = re.search(rf"\b{re.escape(term)}\b\s*(?:\-|\—|,|:)\s*([^.;]{5,160})", norm)
-            if m:
-                definition = m.group(1).strip()
-                cards.append({
-                    'question': f"Define: {term}"[:180],
-                    'answer': definition[:300]
-                })
-
-        # 4) Fallback: make a few cloze deletions for practice
-        if not cards:
-            for s in sentences[:20]:
-                words = s.split()
-                if len(words) > 6:
-                    mid = max(1, len(words)//3)
-                    answer = words[mid]
-                    words[mid] = '____'
-                    q = ' '.join(words) + '?'
-                    cards.append({'question': q[:180], 'answer': answer[:180]})
-
-        # Dedupe by question
-        seen = set()
-        deduped = []
-        for c in cards:
-            q = c['question']
-            if q not in seen:
-                seen.add(q)
-                deduped.append(c)
-        return deduped[:60]
+        return card_generator.generate_cards(text)
 
-    def create_deck_from_pdfs(self, files, class_id: str, user_id: str, public: bool, title: str | None = None):
+    def ensure_can_create_deck(self, class_id: str, user_id: str):
         if not class_id:
             raise ValueError('class_id required')
         # Ensure class exists and membership
-        cls = self.admin.table('classes').select('id').eq('id', class_id).single().execute()
+        cls = self.admin.table('classes').select('id').eq('id', class_id).execute()
         if not cls.data:
             raise ValueError('Class not found')
-        mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-        if not mem.data:
+        if not self.members.is_member(user_id, class_id):
             raise ValueError('Join the class before creating a deck')
 
-        # Create session for deck grouping
-        deck_title = (title or 'Flashcards').strip() or 'Flashcards'
-        session_res = self.admin.table('sessions').insert({
-            'class_id': class_id,
-            'title': deck_title[:120],
-            'created_by': user_id
-        }).execute()
-        if not session_res.data:
-            raise ValueError('Failed to create session')
-        session_id = session_res.data[0]['id']
+    def create_deck_from_pdfs(self, files, class_id: str, user_id: str, public: bool, title: str | None = None, progress=None):
+        progress = progress or (lambda stage, fraction: None)
+        if not class_id:
+            raise ValueError('class_id required')
 
-        # Create deck
-        deck_res = self.admin.table('flashcard_decks').insert({
-            'class_id': class_id,
-            'session_id': session_id,
-            'title': deck_title[:180],
-            'public': public,
-            'created_by': user_id
-        }).execute()
-        if not deck_res.data:
-            raise ValueError('Failed to create deck')
-        deck = deck_res.data[0]
+        # Extract text from all PDFs and generate cards, reusing earlier results for identical uploads
+        cache = get_content_cache()
+        digests = [file_digest(file) for file in files]
+        cards_key = content_key('cards', combined_digest(digests))
+        cards = cache.get(cards_key)
+        if cards is None:
+            collected_text = ''
+            complete = True
+            for i, (file, digest) in enumerate(zip(files, digests)):
+                progress('extracting', 0.1 + 0.5 * i / len(files))
+                text = cache.get(content_key('text', digest))
+                if text is None:
+                    try:
+                        text = self.files.extract_text_from_pdf(file)
+                    except Exception:
+                        complete = False
+                        continue
+                    if text:
+                        cache.set(content_key('text', digest), text)
+                collected_text += '\n' + text
+            progress('generating', 0.6)
+            cards = self._generate_cards_from_text(collected_text)
+            if complete:
+                cache.set(cards_key, cards)
 
-        # Extract text from all PDFs and generate cards
-        collected_text = ''
-        for file in files:
-            try:
-                collected_text += '\n' + self.files.extract_text_from_pdf(file)
-            except Exception:
-                continue
-        cards = self._generate_cards_from_text(collected_text)
-        for c in cards:
-            self.admin.table('flashcards').insert({
-                'deck_id': deck['id'],
-                'question': c['question'],
-                'answer': c['answer'],
-                'created_by': user_id
-            }).execute()
+        progress('saving', 0.8)
+        # Membership check, session, deck and cards in one transaction
+        deck_title = (title or 'Flashcards').strip() or 'Flashcards'
+        valid, failed = self._validate_cards(cards)
+        deck = call_rpc(self.admin, 'create_deck_with_cards', {
+            'p_class_id': class_id,
+            'p_user_id': user_id,
+            'p_title': deck_title,
+            'p_public': public,
+            'p_cards': [card for _, card in valid],
+        })
+        if not deck:
+            raise ValueError('Failed to create deck')
+        deck['failed_cards'] = failed
         return deck
 
-    def list_user_decks(self, user_id: str):
-        res = self.admin.table('flashcard_decks').select('*').eq('created_by', user_id).order('created_at', desc=True).execute()
-        decks = res.data or []
+    def list_user_decks(self, user_id: str, limit: int = DEFAULT_LIMIT, cursor=None, fields: str | None = None):
+        query = self.admin.table('flashcard_decks').select(select_columns('flashcard_decks', fields)).eq('created_by', user_id)
+        res = keyset(query, limit, cursor).execute()
+        decks, next_cursor = page_of(res.data or [], limit)
         # attach class names
-        class_ids = list({d.get('class_id') for d in decks if d.get('class_id')})
-        classes_map = {}
-        if class_ids:
-            c = self.admin.table('classes').select('id, name').in_('id', class_ids).execute()
-            for row in (c.data or []):
-                classes_map[row['id']] = {'id': row['id'], 'name': row.get('name', '')}
+        classes_map = get_loader(self.admin).classes({d.get('class_id') for d in decks})
         for d in decks:
             d['cls'] = classes_map.get(d.get('class_id'))
-        return decks
+        return decks, next_cursor
 
-    def list_class_decks(self, class_id: str, viewer_user_id: str):
+    def list_class_decks(self, class_id: str, viewer_user_id: str, limit: int = DEFAULT_LIMIT, cursor=None, fields: str | None = None):
         # Ensure viewer is member
-        mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', viewer_user_id).execute()
-        if not mem.data:
+        if not self.members.is_member(viewer_user_id, class_id):
             raise ValueError('Not a class member')
-        res = self.admin.table('flashcard_decks').select('*').eq('class_id', class_id).execute()
-        decks = [d for d in (res.data or []) if not ('public' in d and d['public'] is False)]
-        decks.sort(key=lambda x: x.get('created_at') or '', reverse=True)
+        query = self.admin.table('flashcard_decks').select(select_columns('flashcard_decks', fields)).eq('class_id', class_id).eq('public', True)
+        res = keyset(query, limit, cursor).execute()
+        decks, next_cursor = page_of(res.data or [], limit)
         # attach authors
-        user_ids = list({d.get('created_by') for d in decks if d.get('created_by')})
-        users_map = {}
-        if user_ids:
-            u = self.admin.table('users').select('id, first_name, last_name').in_('id', user_ids).execute()
-            for row in (u.data or []):
-                users_map[row['id']] = {'id': row['id'], 'first_name': row.get('first_name',''), 'last_name': row.get('last_name','')}
+        users_map = {
+            uid: {'id': row['id'], 'first_name': row.get('first_name',''), 'last_name': row.get('last_name','')}
+            for uid, row in get_loader(self.admin).load_many('users', {d.get('created_by') for d in decks}).items() if row
+        }
         for d in decks:
             d['author'] = users_map.get(d.get('created_by'))
-        return decks
+        return decks, next_cursor
+
+    def list_deck_comments(self, deck_id: str, limit: int = DEFAULT_LIMIT, cursor=None):
+        # Deck comments live in the generic comments table, anchored to the deck
+        query = self.admin.table('comments').select('id, user_id, text, created_at').eq('anchor', f'deck:{deck_id}')
+        res = keyset(query, limit, cursor, desc=False).execute()
+        comments, next_cursor = page_of(res.data or [], limit)
+        users = get_loader(self.admin).load_many('users', {c['user_id'] for c in comments})
+        for c in comments:
+            u = users.get(c['user_id']) or {}
+            c['author'] = {'first_name': u.get('first_name',''), 'last_name': u.get('last_name','')}
+        return comments, next_cursor
 
     def delete_deck(self, deck_id: str, user_id: str):
         d = self.admin.table('flashcard_decks').select('id, created_by, session_id').eq('id', deck_id).single().execute()
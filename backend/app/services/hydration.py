@@ -0,0 +1,154 @@
+from flask import g, has_request_context
+from app.core.config import Config
+from app.core.supabase_client import get_admin_client
+from app.services.membership_service import MembershipService
+from app.utils.cache import TTLCache
+
+# Columns fetched for each table the loader knows how to batch
+_COLUMNS = {
+    'users': 'id, first_name, last_name',
+    'classes': 'id, name',
+    'sessions': 'id, class_id',
+}
+
+# Cross-request LRU for author and class name records (HYDRATION_CACHE_TTL=0 disables it)
+_shared = {
+    'users': TTLCache(maxsize=Config.HYDRATION_CACHE_SIZE, ttl=Config.HYDRATION_CACHE_TTL),
+    'classes': TTLCache(maxsize=Config.HYDRATION_CACHE_SIZE, ttl=Config.HYDRATION_CACHE_TTL),
+}
+
+# Keep the in_() list well under PostgREST/proxy URL limits
+_MAX_IDS_PER_QUERY = 200
+
+
+def invalidate_cached(table: str, row_id: str):
+    """Drop a row from the cross-request cache after it changes."""
+    cache = _shared.get(table)
+    if cache is not None:
+        cache.pop(row_id)
+
+
+class HydrationLoader:
+    """Request-scoped batching loader for users, classes and sessions rows.
+
+    Ids are collected with `want()` and resolved together on the next load with one
+    in_() query per table. Resolved rows (and misses) are memoized for the loader's
+    lifetime, so repeated lookups inside one request cost nothing.
+    """
+
+    def __init__(self, admin=None, use_shared_cache: bool = True):
+        self.admin = admin or get_admin_client()
+        self.use_shared_cache = use_shared_cache
+        self._rows = {table: {} for table in _COLUMNS}
+        self._pending = {table: set() for table in _COLUMNS}
+        self._member_of = {}
+
+    def want(self, table: str, ids):
+        rows = self._rows[table]
+        self._pending[table].update(i for i in ids if i and i not in rows)
+
+    def dispatch(self, table: str | None = None):
+        tables = [table] if table else list(_COLUMNS)
+        for t in tables:
+            pending = self._pending[t]
+            if not pending:
+                continue
+            ids = list(pending)
+            pending.clear()
+            self._resolve(t, ids)
+
+    def _resolve(self, table: str, ids: list):
+        rows = self._rows[table]
+        cache = _shared.get(table) if self.use_shared_cache else None
+        if cache is not None:
+            remaining = []
+            for i in ids:
+                row = cache.get(i)
+                if row is None:
+                    remaining.append(i)
+                else:
+                    rows[i] = row
+            ids = remaining
+        for start in range(0, len(ids), _MAX_IDS_PER_QUERY):
+            chunk = ids[start:start + _MAX_IDS_PER_QUERY]
+            res = self.admin.table(table).select(_COLUMNS[table]).in_('id', chunk).execute()
+            for row in (res.data or []):
+                rows[row['id']] = row
+                if cache is not None:
+                    cache.set(row['id'], row)
+            for i in chunk:
+                rows.setdefault(i, None)
+
+    def load_many(self, table: str, ids) -> dict:
+        """Return {id: row or None} for `ids`, batching with anything already queued."""
+        ids = [i for i in ids if i]
+        self.want(table, ids)
+        self.dispatch(table)
+        rows = self._rows[table]
+        return {i: rows.get(i) for i in ids}
+
+    def load(self, table: str, row_id):
+        if not row_id:
+            return None
+        return self.load_many(table, [row_id]).get(row_id)
+
+    def member_class_ids(self, user_id: str) -> frozenset:
+        """Set of class ids `user_id` belongs to, loaded with one query per request."""
+        if user_id not in self._member_of:
+            classes = MembershipService(self.admin).classes_for(user_id)
+            self._member_of[user_id] = frozenset(classes)
+        return self._member_of[user_id]
+
+    # ---------- Shaped lookups used by the services ----------
+    def authors(self, user_ids) -> dict:
+        """{user_id: {'id', 'first_name', 'last_name'}}, falling back to auth.users metadata."""
+        rows = self.load_many('users', user_ids)
+        authors = {}
+        for uid, row in rows.items():
+            if row:
+                authors[uid] = {
+                    'id': row['id'],
+                    'first_name': row.get('first_name', ''),
+                    'last_name': row.get('last_name', ''),
+                }
+                continue
+            # Fallback for missing profile rows: pull from auth.users metadata
+            try:
+                au = self.admin.auth.admin.get_user_by_id(uid)
+                if au and au.user:
+                    meta = au.user.user_metadata or {}
+                    row = {
+                        'id': au.user.id,
+                        'first_name': meta.get('first_name', '') or '',
+                        'last_name': meta.get('last_name', '') or ''
+                    }
+                    self._rows['users'][uid] = row
+                    authors[uid] = row
+            except Exception:
+                continue
+        return authors
+
+    def classes(self, class_ids) -> dict:
+        """{class_id: {'id', 'name'}}"""
+        return {
+            cid: {'id': row['id'], 'name': row.get('name', '')}
+            for cid, row in self.load_many('classes', class_ids).items() if row
+        }
+
+    def session_classes(self, session_ids) -> dict:
+        """{session_id: class_id}"""
+        return {
+            sid: row['class_id']
+            for sid, row in self.load_many('sessions', session_ids).items() if row and row.get('class_id')
+        }
+
+
+def get_loader(admin=None) -> HydrationLoader:
+    """Loader for the current request (a fresh one outside a request context)."""
+    if not has_request_context():
+        return HydrationLoader(admin)
+    loader = getattr(g, '_hydration_loader', None)
+    if loader is None:
+        loader = HydrationLoader(admin)
+        g._hydration_loader = loader
+    return loader
@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import Config
+from app.utils.errors import MountainMergeError, ValidationError
+
+# Job lifecycle: queued -> running -> succeeded | failed
+
+
+class MemoryJobStore:
+    """In-process job store. Only visible to the worker process that created the job."""
+
+    def __init__(self, retention: int = 3600):
+        self.retention = retention
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._prune()
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        stale = [jid for jid, j in self._jobs.items() if j['status'] in ('succeeded', 'failed') and j['updated_at'] < cutoff]
+        for jid in stale:
+            del self._jobs[jid]
+
+
+class SQLiteJobStore:
+    """Job store in a local SQLite file, shared by every worker process on the host."""
+
+    _COLUMNS = ('id', 'kind', 'user_id', 'status', 'stage', 'progress', 'result', 'error', 'status_code', 'created_at', 'updated_at')
+
+    def __init__(self, path: str, retention: int = 3600):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, user_id TEXT, status TEXT, stage TEXT, progress REAL, "
+                "result TEXT, error TEXT, status_code INTEGER, created_at REAL, updated_at REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, job: dict):
+        row = dict(job, result=json.dumps(job.get('result')))
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (time.time() - self.retention,))
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+                tuple(row.get(c) for c in self._COLUMNS)
+            )
+
+    def update(self, job_id: str, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        assignments = ', '.join(f"{k} = ?" for k in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(zip(self._COLUMNS, row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+
+def _build_store():
+    if Config.JOB_STORE == 'sqlite':
+        return SQLiteJobStore(Config.JOB_STORE_PATH, retention=Config.JOB_RETENTION)
+    return MemoryJobStore(retention=Config.JOB_RETENTION)
+
+
+class JobService:
+    """Runs slow ingestion work on a bounded worker pool and tracks it in a job store."""
+
+    def __init__(self, store=None, workers: int | None = None, max_pending: int | None = None):
+        self.store = store or _build_store()
+        self.workers = workers or Config.JOB_WORKERS
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending or Config.JOB_MAX_PENDING)
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+        return self._executor
+
+    def submit(self, kind: str, user_id: str, fn, *args, cleanup=None, **kwargs) -> dict:
+        """Queue `fn(*args, progress=..., **kwargs)`; its return value becomes the job result.
+        `cleanup()` runs once the job has finished, or straight away if it can't be queued.
+        """
+        if not self._slots.acquire(blocking=False):
+            if cleanup:
+                cleanup()
+            raise ValidationError("Too many uploads are being processed, please retry shortly", status_code=503)
+        now = time.time()
+        job = {
+            'id': str(uuid.uuid4()),
+            'kind': kind,
+            'user_id': user_id,
+            'status': 'queued',
+            'stage': 'queued',
+            'progress': 0.0,
+            'result': None,
+            'error': None,
+            'status_code': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        try:
+            self.store.create(job)
+            self._get_executor().submit(self._run, job['id'], fn, args, kwargs, cleanup)
+        except Exception:
+            self._slots.release()
+            if cleanup:
+                cleanup()
+            raise
+        return job
+
+    def _run(self, job_id: str, fn, args, kwargs, cleanup=None):
+        def progress(stage: str, fraction: float):
+            self.store.update(job_id, stage=stage, progress=round(fraction, 3), updated_at=time.time())
+
+        try:
+            self.store.update(job_id, status='running', stage='starting', updated_at=time.time())
+            result = fn(*args, progress=progress, **kwargs)
+            self.store.update(job_id, status='succeeded', stage='done', progress=1.0, result=result, updated_at=time.time())
+        except MountainMergeError as e:
+            self.store.update(job_id, status='failed', error=e.message, status_code=e.status_code, updated_at=time.time())
+        except Exception as e:
+            self.store.update(job_id, status='failed', error=str(e), status_code=500, updated_at=time.time())
+        finally:
+            self._slots.release()
+            if cleanup:
+                try:
+                    cleanup()
+                except Exception:
+                    pass
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait: bool = True):
+        """Stop taking work; with `wait`, let queued and running jobs finish first."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_job_service = None
+_job_service_pid = None
+_job_service_lock = threading.Lock()
+
+
+def get_job_service() -> JobService:
+    # Worker threads don't survive a fork, so each process gets its own service
+    global _job_service, _job_service_pid
+    if _job_service is None or _job_service_pid != os.getpid():
+        with _job_service_lock:
+            if _job_service is None or _job_service_pid != os.getpid():
+                _job_service = JobService()
+                _job_service_pid = os.getpid()
+    return _job_service
+
+
+def shutdown_job_service(wait: bool = True):
+    """Drain this process's job pool (called when a server worker exits)."""
+    if _job_service is not None and _job_service_pid == os.getpid():
+        _job_service.shutdown(wait=wait)
+
+
+def public_job(job: dict) -> dict:
+    """Shape a job for API responses."""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'result': job['result'],
+        'error': job['error'],
+        'status_url': f"/api/jobs/{job['id']}",
+    }
@@ -0,0 +1,73 @@
+from flask import g, has_request_context
+from app.core.supabase_client import get_admin_client
+
+# Lookups are cached for the current request only (flask.g), so a guard never trusts
+# what another worker, or an earlier request, saw: a join or leave handled anywhere is
+# visible to the very next request. Outside a request (jobs, scripts) nothing is cached.
+_NOT_MEMBER = ''
+
+
+def _caches() -> tuple[dict, dict]:
+    """({(user_id, class_id): role}, {user_id: {class_id: role}}) for this request."""
+    if not has_request_context():
+        return {}, {}
+    caches = getattr(g, '_membership_caches', None)
+    if caches is None:
+        caches = g._membership_caches = ({}, {})
+    return caches
+
+
+def clear_membership_cache():
+    roles, classes_by_user = _caches()
+    roles.clear()
+    classes_by_user.clear()
+
+
+class MembershipService:
+    """Request-cached (user_id, class_id) -> role lookups used by every class membership guard."""
+
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+
+    def role(self, user_id: str, class_id: str) -> str | None:
+        """The user's role in the class, or None if they are not a member."""
+        if not user_id or not class_id:
+            return None
+        roles, classes_by_user = _caches()
+        classes = classes_by_user.get(user_id)
+        if classes is not None:
+            return classes.get(class_id)
+        key = (user_id, class_id)
+        cached = roles.get(key)
+        if cached is not None:
+            return cached or None
+        res = self.admin.table('class_members').select('role').eq('class_id', class_id).eq('user_id', user_id).execute()
+        role = (res.data[0].get('role') or 'member') if res.data else None
+        roles[key] = role or _NOT_MEMBER
+        return role
+
+    def is_member(self, user_id: str, class_id: str) -> bool:
+        return self.role(user_id, class_id) is not None
+
+    def classes_for(self, user_id: str) -> dict:
+        """{class_id: role} for every class the user belongs to, in one query."""
+        classes_by_user = _caches()[1]
+        classes = classes_by_user.get(user_id)
+        if classes is None:
+            res = self.admin.table('class_members').select('class_id, role').eq('user_id', user_id).execute()
+            classes = {m['class_id']: m.get('role') or 'member' for m in (res.data or [])}
+            classes_by_user[user_id] = classes
+        return classes
+
+    # ---------- Write-through from ClassService, for the rest of the request ----------
+    def record(self, user_id: str, class_id: str, role: str = 'member'):
+        roles, classes_by_user = _caches()
+        roles[(user_id, class_id)] = role
+        if user_id in classes_by_user:
+            classes_by_user[user_id] = {**classes_by_user[user_id], class_id: role}
+
+    def forget(self, user_id: str, class_id: str):
+        roles, classes_by_user = _caches()
+        roles[(user_id, class_id)] = _NOT_MEMBER
+        if user_id in classes_by_user:
+            classes_by_user[user_id] = {cid: r for cid, r in classes_by_user[user_id].items() if cid != class_id}
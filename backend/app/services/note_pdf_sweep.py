@@ -0,0 +1,49 @@
+"""Orphaned PDF sweep: remove uploaded note PDFs that no note references.
+
+PDFs are stored once per content hash and shared by every note made from the same
+file, so deleting a note never removes its PDF inline; a check there would race with
+an upload of the same file. Run this daily (cron or any scheduler); objects are only
+removed once they have gone NOTE_PDF_GRACE_HOURS without being written. From backend/:
+
+    python -m app.services.note_pdf_sweep
+"""
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from app.core.config import Config
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services.note_service import pdf_url_prefix
+
+logger = logging.getLogger(__name__)
+
+# Objects listed and removed per round trip
+SWEEP_BATCH = 1000
+
+
+def sweep(admin=None, grace_hours: float | None = None, now: float | None = None) -> dict:
+    """Remove every unreferenced PDF older than the grace period. Safe to run repeatedly
+    or concurrently with uploads."""
+    admin = admin or get_admin_client()
+    hours = Config.NOTE_PDF_GRACE_HOURS if grace_hours is None else grace_hours
+    before = datetime.fromtimestamp((now if now is not None else time.time()) - hours * 3600, timezone.utc)
+    removed = 0
+    while True:
+        names = [r['name'] for r in call_rpc(admin, 'orphaned_note_pdfs', {
+            'p_url_prefix': pdf_url_prefix(), 'p_before': before.isoformat(), 'p_limit': SWEEP_BATCH}, many=True)]
+        if not names:
+            break
+        done = admin.storage.from_('notes-pdfs').remove(names) or []
+        removed += len(done)
+        # A short page, or objects the storage API would not remove, ends the run
+        if len(names) < SWEEP_BATCH or not done:
+            break
+    result = {'removed': removed}
+    logger.info('note pdf sweep: %s', result)
+    return result
+
+
+if __name__ == '__main__':
+    from app.utils.logging import setup_logging
+    setup_logging()
+    print(json.dumps(sweep()))
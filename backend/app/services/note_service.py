@@ -1,111 +1,41 @@
 from app.core.config import Config
-from app.core.supabase_client import supabase
+from app.core.supabase_client import call_rpc, get_admin_client
 from app.utils.errors import ValidationError, NotFoundError, UnauthorizedError
-from supabase import create_client
+from app.utils.pagination import DEFAULT_LIMIT, keyset, page_of
+from app.utils.projection import select_columns
+from app.utils.uploads import spooled
+import logging
 import os
 import re
+from . import minhash
+from .content_cache import content_key, file_digest, get_content_cache
+from .event_bus import publish
 from .file_service import FileService
-import uuid
+from . import summarizer
+from .hydration import get_loader
+from .membership_service import MembershipService
+from .vote_service import VoteService
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_url_prefix() -> str:
+    """Public URL of the notes-pdfs bucket; a note's pdf_url is this plus the object key."""
+    return f"{Config.SUPABASE_URL}/storage/v1/object/public/notes-pdfs/"
+
 
 class NoteService:
-    def __init__(self):
-        self.supabase = supabase
-        self.admin = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+        self.members = MembershipService(self.admin)
+        self.votes = VoteService(self.admin)
         self.files = FileService()
 
     # ----------------------------
-    # Heuristic summarization
+    # Heuristic summarization (see summarizer.py)
     # ----------------------------
-    def _sentence_split(self, text: str):
-        return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
-
-    def _tokenize(self, text: str):
-        return re.findall(r"[A-Za-z0-9']+", text.lower())
-
-    def _frequency_scores(self, text: str):
-        stop = set([
-            "the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have","but","not","their","his","her","its","they","them","we","you"
-        ])
-        freqs = {}
-        for t in self._tokenize(text):
-            if t in stop or len(t) <= 2:
-                continue
-            freqs[t] = freqs.get(t, 0) + 1
-        return freqs
-
-    def _is_noise_sentence(self, s: str) -> bool:
-        # Filter instructional scaffolding, URLs, and admin/meta lines
-        noise_patterns = [
-            r"http[s]?://",
-            r"www\.",
-            r"@",
-            r"optional",
-            r"teacher",
-            r"students?",
-            r"materials",
-            r"procedure",
-            r"homework",
-            r"database",
-            r"power\s*point",
-            r"attached",
-            r"note:?\s*\d+",
-        ]
-        s_low = s.lower()
-        if any(re.search(p, s_low) for p in noise_patterns):
-            return True
-        # Discard overly long list-like lines
-        if len(s) > 400:
-            return True
-        return False
-
-    def _score_sentences(self, sentences, freqs):
-        scored = []
-        for s in sentences:
-            if self._is_noise_sentence(s):
-                continue
-            score = 0
-            for t in self._tokenize(s):
-                if t in freqs:
-                    score += freqs[t]
-            if s:
-                scored.append((score, s))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [s for _, s in scored]
-
     def _summarize_text(self, text: str) -> str:
-        # Build scores
-        sentences = self._sentence_split(text)
-        freqs = self._frequency_scores(text)
-        ranked = self._score_sentences(sentences, freqs)
-
-        # Construct concise paragraphs (no timeline, no bullets)
-        # Overview: up to 2 sentences stitched
-        overview = " ".join(ranked[:2])
-        overview = re.sub(r"\s+", " ", overview).strip()
-
-        # Additional paragraphs: groups of 2 sentences each, up to 2 paragraphs
-        rest = ranked[2:8]  # up to 6 more
-        paras = []
-        for i in range(0, len(rest), 2):
-            chunk = " ".join(rest[i:i+2]).strip()
-            if chunk:
-                paras.append(re.sub(r"\s+", " ", chunk))
-            if len(paras) >= 2:
-                break
-
-        md = []
-        if overview:
-            md.append("### Overview")
-            md.append(overview)
-            # Add two blank lines for visual separation
-            md.append("")
-            md.append("")
-        if paras:
-            md.append("### Summary")
-            for p in paras:
-                md.append(p)
-                md.append("")
-        return "\n".join(md).strip()
+        return summarizer.summarize(text)
 
     # ----------------------------
     # Existing methods below (unchanged except where we call _summarize_text)
@@ -140,24 +70,7 @@ class NoteService:
         return False
 
     def _top_sentences(self, text: str, k: int = 5):
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        tokens = re.findall(r"[A-Za-z0-9']+", text.lower())
-        stop = set(["the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have"])
-        freqs = {}
-        for t in tokens:
-            if t in stop or len(t) <= 2:
-                continue
-            freqs[t] = freqs.get(t, 0) + 1
-        scored = []
-        for s in sentences:
-            score = 0
-            for t in re.findall(r"[A-Za-z0-9']+", s.lower()):
-                if t in freqs:
-                    score += freqs[t]
-            if s.strip():
-                scored.append((score, s.strip()))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [s for _, s in scored[:k]]
+        return summarizer.top_sentences(text, k, stopwords=summarizer.BASIC_STOPWORDS, skip_noise=False)
 
     def _ensure_notes_bucket(self):
         try:
@@ -171,65 +84,101 @@ class NoteService:
         except Exception:
             pass
 
-    def _upload_pdf(self, file, user_id: str) -> str:
+    def _upload_pdf(self, file, digest: str) -> str:
+        # Objects are keyed by content hash, so every upload of the same PDF shares one copy.
+        # Always written: the rewrite restarts the orphan sweep's grace period (note_pdf_sweep.py)
+        key = f"sha256/{digest}.pdf"
         self._ensure_notes_bucket()
-        filename = getattr(file, 'filename', None) or f'{uuid.uuid4()}.pdf'
-        ext = os.path.splitext(filename)[1] or '.pdf'
-        key = f"{user_id}/{uuid.uuid4()}{ext}"
-        file.seek(0)
-        data = file.read()
-        self.admin.storage.from_('notes-pdfs').upload(key, data, file_options={"content-type": "application/pdf", "upsert": "true"})
-        public_url = f"{Config.SUPABASE_URL}/storage/v1/object/public/notes-pdfs/{key}"
-        return public_url
-
-    def create_note_from_pdf(self, file, class_id: str, user_id: str, public: bool, title: str | None = None):
+        with spooled(file) as upload, upload.open_reader() as body:
+            # httpx streams the open file in chunks rather than holding it in memory
+            self.admin.storage.from_('notes-pdfs').upload(key, body, file_options={"content-type": "application/pdf", "upsert": "true"})
+        return pdf_url_prefix() + key
+
+    def ensure_can_add_note(self, class_id: str, user_id: str):
         if not class_id:
             raise ValidationError("class_id is required")
         if not user_id:
             raise ValidationError("user_id is required")
 
-        cls = self.admin.table('classes').select('id').eq('id', class_id).single().execute()
+        cls = self.admin.table('classes').select('id').eq('id', class_id).execute()
         if not cls.data:
             raise NotFoundError("Class not found")
 
-        membership = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-        if not membership.data:
+        if not self.members.is_member(user_id, class_id):
             raise ValidationError("You must join the class before adding notes")
 
-        text = self.files.extract_text_from_pdf(file)
-        if not text:
-            raise ValidationError("Could not extract text from PDF")
-
-        content = self._summarize_text(text)
+    def create_note_from_pdf(self, file, class_id: str, user_id: str, public: bool, title: str | None = None, progress=None):
+        progress = progress or (lambda stage, fraction: None)
+        if not class_id:
+            raise ValidationError("class_id is required")
+        if not user_id:
+            raise ValidationError("user_id is required")
 
+        digest = file_digest(file)
+        cache = get_content_cache()
+        text = None
+        content = cache.get(content_key('summary', digest))
+        if content is None:
+            progress('extracting', 0.1)
+            text = self._extract_text(file, digest)
+            progress('summarizing', 0.5)
+            content = self._summarize_text(text)
+            cache.set(content_key('summary', digest), content)
+
+        signature = None
+        if Config.NEAR_DUPLICATE_THRESHOLD > 0:
+            signature = cache.get(content_key('minhash', digest))
+            if signature is None:
+                signature = minhash.signature(text if text is not None else self._extract_text(file, digest))
+                if signature:
+                    cache.set(content_key('minhash', digest), signature)
+
+        progress('saving', 0.8)
+        # Content-addressed, so a failure below leaves nothing to clean up
+        pdf_url = self._upload_pdf(file, digest)
+
+        # Membership check, session and note in one transaction
         filename = getattr(file, 'filename', None) or 'PDF Upload'
-        session_title = os.path.splitext(os.path.basename(filename))[0][:120] or 'PDF Upload'
-        session_res = self.admin.table('sessions').insert({
-            'class_id': class_id,
-            'title': session_title,
-            'created_by': user_id
-        }).execute()
-        if not session_res.data:
-            raise ValidationError("Failed to create session for note")
-        session_id = session_res.data[0]['id']
-
-        pdf_url = self._upload_pdf(file, user_id)
-
-        note_payload = {
-            'session_id': session_id,
-            'type': 'slides',
-            'content': content,
-            'created_by': user_id,
-            'public': public,
-            'pdf_url': pdf_url
-        }
-        if title:
-            note_payload['title'] = title[:180]
-
-        note_res = self.admin.table('notes').insert(note_payload).execute()
-        if not note_res.data:
+        note = call_rpc(self.admin, 'create_note_with_session', {
+            'p_class_id': class_id,
+            'p_user_id': user_id,
+            'p_session_title': os.path.splitext(os.path.basename(filename))[0][:120] or 'PDF Upload',
+            'p_content': content,
+            'p_public': public,
+            'p_pdf_url': pdf_url,
+            'p_title': title[:180] if title else None,
+        })
+        if not note:
             raise ValidationError("Failed to create note")
-        return note_res.data[0]
+        if signature:
+            note['duplicate_of'] = self._link_duplicate(note['id'], signature)
+        return note
+
+    def _extract_text(self, file, digest: str) -> str:
+        cache = get_content_cache()
+        text = cache.get(content_key('text', digest))
+        if text is None:
+            text = self.files.extract_text_from_pdf(file)
+            if text:
+                cache.set(content_key('text', digest), text)
+        if not text:
+            raise ValidationError("Could not extract text from PDF")
+        return text
+
+    def _link_duplicate(self, note_id: str, signature: list[int]):
+        """Fingerprint a new note and link it to a near-identical public note in its
+        class (see minhash.py). Returns that note's id, or None. The note is already
+        saved, so a failure here is logged rather than failing the upload."""
+        try:
+            return call_rpc(self.admin, 'index_note_fingerprint', {
+                'p_note_id': note_id,
+                'p_signature': signature,
+                'p_buckets': minhash.buckets(signature),
+                'p_threshold': Config.NEAR_DUPLICATE_THRESHOLD,
+            })
+        except Exception:
+            logger.warning('Could not fingerprint note %s', note_id, exc_info=True)
+            return None
     
     def get_note(self, note_id: str, user_id: str):
         """Get a specific note."""
@@ -252,95 +201,39 @@ class NoteService:
         if not rows:
             raise NotFoundError("Note not found")
         note = rows[0]
-        # author
+        loader = get_loader(self.admin)
+        # Queue author and session together so each table is hit at most once per request
+        loader.want('users', [note.get('created_by')])
+        loader.want('sessions', [note.get('session_id')])
         note['author'] = None
         try:
-            ares = self.admin.table('users').select('id, first_name, last_name').eq('id', note['created_by']).execute()
-            arows = ares.data or []
-            if arows:
-                note['author'] = {
-                    'id': arows[0]['id'],
-                    'first_name': arows[0].get('first_name', ''),
-                    'last_name': arows[0].get('last_name', ''),
-                }
-            else:
-                # Fallback to auth.users metadata if profile row missing
-                try:
-                    au = self.admin.auth.admin.get_user_by_id(note['created_by'])
-                    if au and au.user:
-                        meta = au.user.user_metadata or {}
-                        note['author'] = {
-                            'id': au.user.id,
-                            'first_name': meta.get('first_name', '') or '',
-                            'last_name': meta.get('last_name', '') or ''
-                        }
-                except Exception:
-                    pass
+            self._attach_authors([note])
         except Exception:
             pass
-        # class via session
         note['cls'] = None
         try:
-            sres = self.admin.table('sessions').select('class_id').eq('id', note['session_id']).execute()
-            srows = sres.data or []
-            class_id = srows[0]['class_id'] if srows and srows[0].get('class_id') else None
-            if class_id:
-                cres = self.admin.table('classes').select('id, name').eq('id', class_id).execute()
-                crows = cres.data or []
-                if crows:
-                    note['cls'] = {'id': crows[0]['id'], 'name': crows[0].get('name', '')}
+            self._attach_classes_via_sessions([note])
         except Exception:
             pass
         return note
 
     def delete_note(self, note_id: str, user_id: str):
         # Avoid `.single()` which throws when 0 rows
-        res = self.admin.table('notes').select('id, created_by, pdf_url').eq('id', note_id).execute()
+        res = self.admin.table('notes').select('id, created_by').eq('id', note_id).execute()
         row = (res.data or [])
         if not row:
             raise NotFoundError("Note not found")
         if row[0]['created_by'] != user_id:
             raise UnauthorizedError("You can only delete your own notes")
-        # Optionally delete PDF from storage
-        pdf_url = row[0].get('pdf_url')
-        if pdf_url and '/notes-pdfs/' in pdf_url:
-            try:
-                key = pdf_url.split('/notes-pdfs/')[1]
-                self.admin.storage.from_('notes-pdfs').remove([key])
-            except Exception:
-                pass
+        # The PDF may back other notes, or one being uploaded right now; the orphan sweep
+        # (note_pdf_sweep.py) removes it once nothing references it
         self.admin.table('notes').delete().eq('id', note_id).execute()
         return True
 
     def _attach_authors(self, notes):
         if not notes:
             return []
-        user_ids = list({n.get('created_by') for n in notes if n.get('created_by')})
-        authors_map = {}
-        if user_ids:
-            users_res = self.admin.table('users').select('id, first_name, last_name').in_('id', user_ids).execute()
-            found_ids = set()
-            for u in (users_res.data or []):
-                authors_map[u['id']] = {
-                    'id': u['id'],
-                    'first_name': u.get('first_name', ''),
-                    'last_name': u.get('last_name', ''),
-                }
-                found_ids.add(u['id'])
-            # Fallback for missing: pull from auth.users metadata
-            missing = [uid for uid in user_ids if uid not in found_ids]
-            for uid in missing:
-                try:
-                    au = self.admin.auth.admin.get_user_by_id(uid)
-                    if au and au.user:
-                        meta = au.user.user_metadata or {}
-                        authors_map[uid] = {
-                            'id': au.user.id,
-                            'first_name': meta.get('first_name', '') or '',
-                            'last_name': meta.get('last_name', '') or ''
-                        }
-                except Exception:
-                    continue
+        authors_map = get_loader(self.admin).authors({n.get('created_by') for n in notes})
         for n in notes:
             n['author'] = authors_map.get(n.get('created_by'))
         return notes
@@ -348,105 +241,72 @@ class NoteService:
     def _attach_classes_via_sessions(self, notes):
         if not notes:
             return []
-        sessions_res = None
-        session_ids = list({n.get('session_id') for n in notes if n.get('session_id')})
-        if session_ids:
-            sessions_res = self.admin.table('sessions').select('id, class_id').in_('id', session_ids).execute()
-        sess_map = {s['id']: s['class_id'] for s in (sessions_res.data or [])} if sessions_res else {}
-        class_ids = list({sess_map.get(n.get('session_id')) for n in notes if sess_map.get(n.get('session_id'))})
-        classes_map = {}
-        if class_ids:
-            classes_res = self.admin.table('classes').select('id, name').in_('id', class_ids).execute()
-            for c in (classes_res.data or []):
-                classes_map[c['id']] = {'id': c['id'], 'name': c.get('name', '')}
+        loader = get_loader(self.admin)
+        sess_map = loader.session_classes({n.get('session_id') for n in notes})
+        classes_map = loader.classes(set(sess_map.values()))
         for n in notes:
             cls_id = sess_map.get(n.get('session_id'))
             n['cls'] = classes_map.get(cls_id)
         return notes
 
-    def list_notes_for_user(self, user_id: str):
+    def list_notes_for_user(self, user_id: str, limit: int = DEFAULT_LIMIT, cursor=None, fields: str | None = None):
         try:
-            res = self.admin.table('notes').select('*').eq('created_by', user_id).order('created_at', desc=True).execute()
-            notes = res.data or []
+            query = self.admin.table('notes').select(select_columns('notes', fields)).eq('created_by', user_id)
+            res = keyset(query, limit, cursor).execute()
+            notes, next_cursor = page_of(res.data or [], limit)
             notes = self._attach_authors(notes)
             notes = self._attach_classes_via_sessions(notes)
-            return notes
+            return notes, next_cursor
         except Exception as e:
             raise ValidationError(f"Failed to list notes: {str(e)}")
 
-    def list_public_notes_for_class(self, class_id: str, user_id: str):
-        mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-        if not mem.data:
+    def list_public_notes_for_class(self, class_id: str, user_id: str, limit: int = DEFAULT_LIMIT, cursor=None,
+                                    fields: str | None = None, collapse: bool = True):
+        """A page of the class feed. With `collapse`, near-duplicates of an earlier note
+        are left out; that note's duplicate_count says how many there are."""
+        if not self.members.is_member(user_id, class_id):
             raise UnauthorizedError("You are not a member of this class")
         try:
-            sess = self.admin.table('sessions').select('id').eq('class_id', class_id).execute()
-            session_ids = [s['id'] for s in (sess.data or [])]
-            if not session_ids:
-                return []
-            # Fetch notes without relying on a 'public' column existing in the DB
-            res = self.admin.table('notes').select('*').in_('session_id', session_ids).execute()
-            notes = res.data or []
-            # If a 'public' flag exists on rows, enforce it here; otherwise treat as public by default
-            filtered = []
-            for n in notes:
-                if 'public' in n and n['public'] is False:
-                    continue
-                filtered.append(n)
-            notes = filtered
-            # Sort newest first by created_at if present
-            try:
-                notes.sort(key=lambda n: n.get('created_at') or '', reverse=True)
-            except Exception:
-                pass
-
+            # Inner-join sessions so the class filter, public flag and ordering all run in the database
+            query = (self.admin.table('notes').select(f"{select_columns('notes', fields)}, sessions!inner(class_id)")
+                     .eq('sessions.class_id', class_id).eq('public', True))
+            if collapse:
+                query = query.is_('duplicate_of', 'null')
+            res = keyset(query, limit, cursor).execute()
+            notes, next_cursor = page_of(res.data or [], limit)
             notes = self._attach_authors(notes)
-            # Avoid `.single()` to prevent PGRST116 when class row is missing
-            cls_res = self.admin.table('classes').select('id, name').eq('id', class_id).execute()
-            cls = None
-            rows = cls_res.data or []
-            if rows:
-                cls = {'id': rows[0]['id'], 'name': rows[0].get('name', '')}
+            cls = get_loader(self.admin).classes([class_id]).get(class_id)
             for n in notes:
+                n.pop('sessions', None)
                 n['cls'] = cls
-            return notes
+            return notes, next_cursor
         except Exception as e:
             raise ValidationError(f"Failed to list class notes: {str(e)}")
 
     def get_note_votes_count(self, note_id: str, user_id: str):
-        # Ensure member of the class
-        note = self.get_note_detail(note_id, user_id)
-        res = self.admin.table('note_votes').select('note_id', count='exact').eq('note_id', note_id).execute()
-        count = res.count or 0
-        # Check if user voted
-        mine = self.admin.table('note_votes').select('note_id').eq('note_id', note_id).eq('user_id', user_id).execute()
-        return {'count': count, 'user_has_voted': bool(mine.data)}
+        return self.votes.get_upvotes(note_id, 'note', user_id)
 
     def upsert_vote(self, note_id: str, user_id: str):
-        # Ensure visibility
-        self.get_note_detail(note_id, user_id)
-        # Insert vote; primary key prevents duplicates
-        self.admin.table('note_votes').insert({'note_id': note_id, 'user_id': user_id}).execute()
-        return self.get_note_votes_count(note_id, user_id)
+        return self.votes.set_vote(note_id, 'note', user_id, True)
 
     def remove_vote(self, note_id: str, user_id: str):
-        self.admin.table('note_votes').delete().eq('note_id', note_id).eq('user_id', user_id).execute()
-        return self.get_note_votes_count(note_id, user_id)
+        return self.votes.set_vote(note_id, 'note', user_id, False)
 
-    def list_comments(self, note_id: str, user_id: str):
+    def list_comments(self, note_id: str, user_id: str, limit: int = DEFAULT_LIMIT, cursor=None):
         # Ensure member of the class
         self.get_note_detail(note_id, user_id)
-        res = self.admin.table('note_comments').select('id, note_id, user_id, content, created_at, parent_id').eq('note_id', note_id).order('created_at').execute()
-        comments = res.data or []
+        query = self.admin.table('note_comments').select('id, note_id, user_id, content, created_at, parent_id').eq('note_id', note_id)
+        res = keyset(query, limit, cursor, desc=False).execute()
+        comments, next_cursor = page_of(res.data or [], limit)
         # Attach author names
+        users = get_loader(self.admin).load_many('users', {c['user_id'] for c in comments})
         for c in comments:
-            # Avoid `.single()` which raises PGRST116 when 0 rows; coerce manually
-            ures = self.admin.table('users').select('first_name, last_name').eq('id', c['user_id']).execute()
-            urow = (ures.data or [{}])[0] if (ures.data or []) else {}
+            urow = users.get(c['user_id']) or {}
             c['author'] = {
                 'first_name': urow.get('first_name', '') or '',
                 'last_name': urow.get('last_name', '') or '',
             }
-        return comments
+        return comments, next_cursor
 
     def add_comment(self, note_id: str, user_id: str, content: str, parent_id: str | None = None):
         if not content or not content.strip():
@@ -462,7 +322,14 @@ class NoteService:
                 raise ValidationError('Invalid parent comment')
             payload['parent_id'] = parent_id
         c = self.admin.table('note_comments').insert(payload).execute()
-        return c.data[0] if c.data else None
+        comment = c.data[0] if c.data else None
+        if comment:
+            urow = get_loader(self.admin).load('users', user_id) or {}
+            publish('note', note_id, 'comment.created', dict(comment, author={
+                'first_name': urow.get('first_name', '') or '',
+                'last_name': urow.get('last_name', '') or '',
+            }))
+        return comment
 
     def delete_comment(self, note_id: str, comment_id: str, user_id: str):
         # Ensure visibility and ownership
@@ -473,30 +340,21 @@ class NoteService:
         if res.data['user_id'] != user_id:
             raise UnauthorizedError('You can only delete your own comments')
         self.admin.table('note_comments').delete().eq('id', comment_id).execute()
+        publish('note', note_id, 'comment.deleted', {'id': comment_id})
         return True
 
-    def list_public_notes_by_user(self, target_user_id: str, viewer_user_id: str):
+    def list_public_notes_by_user(self, target_user_id: str, viewer_user_id: str, limit: int = DEFAULT_LIMIT, cursor=None, fields: str | None = None):
         """List notes created by target user that are public and visible to viewer (member of class)."""
-        # Get notes by creator
-        res = self.admin.table('notes').select('*').eq('created_by', target_user_id).execute()
-        notes = res.data or []
-        if not notes:
-            return []
-        # Attach sessions and classes
-        notes = self._attach_classes_via_sessions(notes)
-        # Filter by public flag and viewer membership to the class
-        visible = []
+        loader = get_loader(self.admin)
+        member_of = loader.member_class_ids(viewer_user_id)
+        if not member_of:
+            return [], None
+        query = (self.admin.table('notes').select(f"{select_columns('notes', fields)}, sessions!inner(class_id)")
+                 .eq('created_by', target_user_id).eq('public', True)
+                 .in_('sessions.class_id', list(member_of)))
+        res = keyset(query, limit, cursor).execute()
+        notes, next_cursor = page_of(res.data or [], limit)
+        classes_map = loader.classes({n['sessions']['class_id'] for n in notes})
         for n in notes:
-            # public flag check (treat missing as True)
-            if 'public' in n and n['public'] is False:
-                continue
-            cls = n.get('cls')
-            if not cls or not cls.get('id'):
-                continue
-            mem = self.admin.table('class_members').select('user_id').eq('class_id', cls['id']).eq('user_id', viewer_user_id).execute()
-            if mem.data:
-                visible.append(n)
-        # Sort newest first
-        visible.sort(key=lambda x: x.get('created_at') or '', reverse=True)
-        return self._attach_authors(visible)
-
+            n['cls'] = classes_map.get(n.pop('sessions')['class_id'])
+        return self._attach_authors(notes), next_cursor
@@ -0,0 +1,182 @@
+"""SM-2 spaced-repetition scheduling for one user's pass through one deck.
+
+Card state lives in parallel typed arrays indexed by a slot number (due time, ease,
+interval, repetitions, lapses), about 20 bytes per card instead of a dict each. Due
+cards are served from a binary heap of packed integer keys, `due << SLOT_BITS | slot`,
+so the next card is an O(log n) heap operation and never a scan. A review pushes a
+fresh key rather than searching the heap for the old one; superseded keys are
+recognised when they surface (their due time no longer matches the array) and the heap
+is rebuilt once they outnumber the live ones.
+"""
+import heapq
+import threading
+from array import array
+
+RESULTS = ('again', 'hard', 'good', 'easy')
+
+# SM-2 answer quality for each result; below 3 counts as a lapse
+_QUALITY = {'again': 1, 'hard': 3, 'good': 4, 'easy': 5}
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_SECONDS = 10 * 60   # a failed card comes back in the same sitting
+DAY = 86400
+HARD_FACTOR = 1.2
+EASY_BONUS = 1.3
+MAX_INTERVAL = 36500.0      # days
+
+SLOT_BITS = 22              # up to ~4M cards per schedule; due seconds use the upper bits
+_SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+def next_state(ease: float, interval: float, reps: int, lapses: int, result: str, at: float):
+    """(ease, interval_days, reps, lapses, due) after answering `result` at epoch `at`."""
+    q = _QUALITY[result]
+    ease = max(MIN_EASE, ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    if q < 3:
+        return ease, 0.0, 0, lapses + 1, at + RELEARN_SECONDS
+    reps += 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = max(interval, 1.0) * (HARD_FACTOR if result == 'hard' else ease)
+    if result == 'easy':
+        interval *= EASY_BONUS
+    interval = min(interval, MAX_INTERVAL)
+    return ease, interval, reps, lapses, at + interval * DAY
+
+
+class Schedule:
+    """Review state and due queue for a fixed set of cards. Thread-safe."""
+
+    def __init__(self, card_ids):
+        self.card_ids = list(card_ids)
+        if len(self.card_ids) > _SLOT_MASK:
+            raise ValueError(f'at most {_SLOT_MASK} cards per schedule')
+        self.slots = {cid: n for n, cid in enumerate(self.card_ids)}
+        n = len(self.card_ids)
+        self.due = array('q', bytes(8 * n))          # epoch seconds; 0 = new, due now
+        self.ease = array('f', [DEFAULT_EASE]) * n
+        self.interval = array('f', bytes(4 * n))     # days
+        self.reps = array('H', bytes(2 * n))
+        self.lapses = array('H', bytes(2 * n))
+        # New cards come out in deck order because their keys are just the slot
+        self._heap = list(range(n))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    def __contains__(self, card_id):
+        return card_id in self.slots
+
+    def _live(self, key: int) -> bool:
+        return self.due[key & _SLOT_MASK] == key >> SLOT_BITS
+
+    def _rebuild(self):
+        self._heap = [(d << SLOT_BITS) | s for s, d in enumerate(self.due)]
+        heapq.heapify(self._heap)
+
+    def review(self, card_id: str, result: str, at: float) -> dict:
+        """Apply one answer; returns the card's new state."""
+        with self._lock:
+            return self._review(self.slots[card_id], result, at)
+
+    def review_many(self, reviews) -> list:
+        """Apply (card_id, result, at) answers in order under one lock."""
+        with self._lock:
+            return [self._review(self.slots[cid], result, at) for cid, result, at in reviews]
+
+    def _review(self, slot: int, result: str, at: float) -> dict:
+        ease, interval, reps, lapses, due = next_state(
+            self.ease[slot], self.interval[slot], self.reps[slot], self.lapses[slot], result, at)
+        due = int(due)
+        self.ease[slot] = ease
+        self.interval[slot] = interval
+        self.reps[slot] = min(reps, 0xFFFF)
+        self.lapses[slot] = min(lapses, 0xFFFF)
+        self.due[slot] = due
+        heapq.heappush(self._heap, (due << SLOT_BITS) | slot)
+        if len(self._heap) > 2 * len(self.card_ids) + 64:
+            self._rebuild()
+        return self.state(slot)
+
+    def simulate(self, reviews) -> dict:
+        """{card_id: (ease, interval, reps, lapses, due, last_at)} after applying the
+        (card_id, result, at) answers in order, without changing the schedule."""
+        out = {}
+        with self._lock:
+            for cid, result, at in reviews:
+                slot = self.slots[cid]
+                prev = out.get(cid) or (self.ease[slot], self.interval[slot], self.reps[slot], self.lapses[slot])
+                out[cid] = next_state(*prev[:4], result, at) + (at,)
+        return out
+
+    def restore(self, states, rebuild: bool = False):
+        """Load saved (card_id, ease, interval, reps, lapses, due) states. Unknown cards
+        are skipped. With `rebuild` the heap is rebuilt once at the end, which is cheaper
+        than a push per card when loading a whole deck."""
+        with self._lock:
+            for cid, ease, interval, reps, lapses, due in states:
+                slot = self.slots.get(cid)
+                if slot is None:
+                    continue
+                due = int(due)
+                self.ease[slot] = ease
+                self.interval[slot] = interval
+                self.reps[slot] = min(reps, 0xFFFF)
+                self.lapses[slot] = min(lapses, 0xFFFF)
+                self.due[slot] = due
+                if not rebuild:
+                    heapq.heappush(self._heap, (due << SLOT_BITS) | slot)
+            if rebuild or len(self._heap) > 2 * len(self.card_ids) + 64:
+                self._rebuild()
+
+    def state(self, slot: int) -> dict:
+        return {
+            'card_id': self.card_ids[slot], 'due': self.due[slot], 'ease': round(self.ease[slot], 3),
+            'interval': round(self.interval[slot], 3), 'reps': self.reps[slot], 'lapses': self.lapses[slot],
+        }
+
+    def next_due(self):
+        """(card_id, due) of the earliest card, or None for an empty deck."""
+        with self._lock:
+            while self._heap and not self._live(self._heap[0]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            key = self._heap[0]
+            return self.card_ids[key & _SLOT_MASK], key >> SLOT_BITS
+
+    def due_cards(self, now: float, limit: int) -> tuple[list, int | None]:
+        """Up to `limit` card ids due at `now`, earliest first, plus the due time of the
+        first card left waiting (None if nothing is left). O(limit log n)."""
+        taken, seen, waiting = [], set(), None
+        with self._lock:
+            while self._heap:
+                key = heapq.heappop(self._heap)
+                slot = key & _SLOT_MASK
+                if not self._live(key) or slot in seen:
+                    continue  # superseded by a later review, or a duplicate key
+                if key >> SLOT_BITS > now or len(taken) >= limit:
+                    waiting = key >> SLOT_BITS
+                    heapq.heappush(self._heap, key)
+                    break
+                seen.add(slot)
+                taken.append(key)
+            for key in taken:
+                heapq.heappush(self._heap, key)
+        return [self.card_ids[k & _SLOT_MASK] for k in taken], waiting
+
+    def count_due(self, now: float) -> int:
+        """Cards due at `now` (a linear pass over the due array)."""
+        now = int(now)
+        with self._lock:
+            return sum(1 for d in self.due if d <= now)
+
+    def nbytes(self) -> int:
+        """Approximate size of the array state and heap (ids and index excluded)."""
+        arrays = (self.due, self.ease, self.interval, self.reps, self.lapses)
+        return sum(a.itemsize * len(a) for a in arrays) + 8 * len(self._heap)
@@ -0,0 +1,40 @@
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services.membership_service import MembershipService
+from app.utils.errors import UnauthorizedError, ValidationError
+from app.utils.pagination import DEFAULT_LIMIT, page_of
+
+MAX_QUERY_LENGTH = 200
+
+
+class SearchService:
+    """Ranked full-text search over a class's notes, decks and flashcards.
+
+    Matching, ranking, visibility and snippets all happen in the search_class function
+    over the trigger-maintained search_documents index (setup_database.sql, section 14),
+    so a page of results is one round trip however large the class is.
+    """
+
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+        self.members = MembershipService(self.admin)
+
+    def search(self, class_id: str, user_id: str, q: str, limit: int = DEFAULT_LIMIT, cursor=None):
+        """(results, next_cursor), best match first. Pages continue from the (rank, id)
+        of the previous page's last result."""
+        q = (q or '').strip()
+        if not q:
+            raise ValidationError('q is required')
+        if len(q) > MAX_QUERY_LENGTH:
+            raise ValidationError(f'q must be at most {MAX_QUERY_LENGTH} characters')
+        if not class_id:
+            raise ValidationError('class_id is required')
+        if not self.members.is_member(user_id, class_id):
+            raise UnauthorizedError('You are not a member of this class')
+        params = {'p_user_id': user_id, 'p_class_id': class_id, 'p_query': q, 'p_limit': limit + 1}
+        if cursor:
+            rank, row_id = cursor
+            if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+                raise ValidationError('Invalid cursor')
+            params.update(p_after_rank=rank, p_after_id=row_id)
+        rows = call_rpc(self.admin, 'search_class', params, many=True)
+        return page_of(rows, limit, 'rank')
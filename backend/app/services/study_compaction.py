@@ -0,0 +1,54 @@
+"""Study history compaction: fold answers into card_state and prune old ones.
+
+Answers are normally written together with the card states they produce, so folding
+only has work to do for history recorded before card_state existed; run the job once
+after migrating, then daily (cron or any scheduler) to prune answers older than
+STUDY_EVENT_RETENTION_DAYS. From backend/:
+
+    python -m app.services.study_compaction
+"""
+import json
+import logging
+import time
+from app.core.config import Config
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services.scheduler import DAY
+from app.services.study_service import StudyService, to_iso
+from app.utils.errors import ConflictError
+
+logger = logging.getLogger(__name__)
+
+# Answers deleted per prune_study_events call, keeping each delete's transaction short
+PRUNE_BATCH = 10000
+
+
+def compact(admin=None, retention_days: int | None = None, now: float | None = None) -> dict:
+    """Fold every unfolded (user, deck) history, then prune covered answers older than
+    the retention window. Safe to run repeatedly or concurrently with reviews."""
+    admin = admin or get_admin_client()
+    study = StudyService(admin)
+    pairs = call_rpc(admin, 'unfolded_study_pairs', {}, many=True)
+    folded = 0
+    for pair in pairs:
+        try:
+            folded += study.fold(pair['user_id'], pair['deck_id'])
+        except ConflictError:
+            logger.info('study compaction: %s answered during the fold, left for the next run', pair)
+
+    days = Config.STUDY_EVENT_RETENTION_DAYS if retention_days is None else retention_days
+    before = to_iso((now if now is not None else time.time()) - days * DAY)
+    deleted = 0
+    while True:
+        n = call_rpc(admin, 'prune_study_events', {'p_before': before, 'p_limit': PRUNE_BATCH}) or 0
+        deleted += n
+        if n < PRUNE_BATCH:
+            break
+    result = {'pairs': len(pairs), 'folded': folded, 'deleted': deleted}
+    logger.info('study compaction: %s', result)
+    return result
+
+
+if __name__ == '__main__':
+    from app.utils.logging import setup_logging
+    setup_logging()
+    print(json.dumps(compact()))
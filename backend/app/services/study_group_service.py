@@ -1,19 +1,19 @@
 from app.core.config import Config
-from app.core.supabase_client import supabase
-from supabase import create_client
+from app.core.supabase_client import get_admin_client
+from app.services.hydration import get_loader
+from app.services.membership_service import MembershipService
 from app.utils.errors import ValidationError, UnauthorizedError
 
 class StudyGroupService:
-    def __init__(self):
-        self.supabase = supabase
-        self.admin = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+        self.members = MembershipService(self.admin)
 
     def set_status(self, user_id: str, class_id: str, looking: bool):
         if not user_id or not class_id:
             raise ValidationError('user_id and class_id are required')
         # Ensure membership
-        mem = self.admin.table('class_members').select('user_id').eq('class_id', class_id).eq('user_id', user_id).execute()
-        if not mem.data:
+        if not self.members.is_member(user_id, class_id):
             raise UnauthorizedError('Not a member of this class')
         # Upsert status into study_groups (create if missing)
         # We assume a unique constraint on (user_id, class_id); if not, this still inserts a duplicate-free-ish latest row.
@@ -29,8 +29,7 @@ class StudyGroupService:
         if not user_id:
             raise ValidationError('user_id is required')
         # Get user's classes
-        mems = self.admin.table('class_members').select('class_id').eq('user_id', user_id).execute()
-        class_ids = [m['class_id'] for m in (mems.data or [])]
+        class_ids = list(self.members.classes_for(user_id))
         if not class_ids:
             return []
         # Fetch classmates with looking=true in those classes, excluding current user
@@ -38,13 +37,11 @@ class StudyGroupService:
         rows = sres.data or []
         if not rows:
             return []
-        # Map users
-        user_ids = list({r['user_id'] for r in rows})
-        ures = self.admin.table('users').select('id, first_name, last_name').in_('id', user_ids).execute()
-        users_map = {u['id']: {'id': u['id'], 'first_name': u.get('first_name',''), 'last_name': u.get('last_name','')} for u in (ures.data or [])}
-        # Classes map
-        cres = self.admin.table('classes').select('id, name').in_('id', class_ids).execute()
-        classes_map = {c['id']: {'id': c['id'], 'name': c.get('name','')} for c in (cres.data or [])}
+        # Map users and classes through the request's batching loader
+        loader = get_loader(self.admin)
+        urows = loader.load_many('users', {r['user_id'] for r in rows})
+        users_map = {uid: {'id': u['id'], 'first_name': u.get('first_name',''), 'last_name': u.get('last_name','')} for uid, u in urows.items() if u}
+        classes_map = loader.classes(class_ids)
         # Group by class
         grouped = {}
         for r in rows:
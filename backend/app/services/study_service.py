@@ -0,0 +1,284 @@
+import time
+from datetime import datetime, timezone
+from app.core.config import Config
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services.membership_service import MembershipService
+from app.services.scheduler import RESULTS, Schedule
+from app.utils.cache import TTLCache
+from app.utils.errors import ConflictError, NotFoundError, UnauthorizedError, ValidationError
+from app.utils.pagination import keyset
+
+# Process-wide (schedule, mark) pairs keyed by (user_id, deck_id), built from the
+# card_state snapshots. Every state write bumps its row's version by one, so the sum of
+# a deck's versions (the mark) moves whenever anyone writes. Reviews handled by this
+# worker update the schedule and its mark in place; a cached schedule is only used
+# while the stored mark still matches, so writes from other workers are never missed.
+_schedules = TTLCache(maxsize=Config.STUDY_CACHE_SIZE, ttl=Config.STUDY_CACHE_TTL)
+
+# Rows per request when loading a deck's cards or a user's states or history for it
+LOAD_PAGE = 1000
+
+# Longest client_event_id accepted from a device (a UUID is 36)
+MAX_EVENT_ID = 64
+
+STATE_COLUMNS = 'card_id, due_at, ease, interval_days, reps, lapses, last_reviewed_at, version'
+
+# Times a batch is recomputed and resent when another worker wrote one of its cards first
+STATE_WRITE_ATTEMPTS = 3
+
+
+def clear_schedule_cache():
+    _schedules.clear()
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def parse_time(value) -> float:
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+def _state_row(card_id: str, state: tuple, base_version: int) -> dict:
+    # `state` as returned by Schedule.simulate; base_version is the stored row's version
+    # it was computed from (0 for none)
+    ease, interval, reps, lapses, due, last_at = state
+    return {'card_id': card_id, 'due_at': to_iso(int(due)), 'ease': ease, 'interval_days': interval,
+            'reps': reps, 'lapses': lapses, 'last_reviewed_at': to_iso(last_at), 'base_version': base_version}
+
+
+def _state_tuple(row: dict) -> tuple:
+    # A card_state row as Schedule.restore takes it
+    return row['card_id'], row['ease'], row['interval_days'], row['reps'], row['lapses'], parse_time(row['due_at'])
+
+
+class StudyService:
+    """Spaced-repetition study sessions over a deck's flashcards (see scheduler.py)."""
+
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+        self.members = MembershipService(self.admin)
+
+    def _require_visible_deck(self, deck_id: str, user_id: str) -> dict:
+        res = self.admin.table('flashcard_decks').select('id, class_id, created_by, public').eq('id', deck_id).execute()
+        if not res.data:
+            raise NotFoundError('Deck not found')
+        deck = res.data[0]
+        if deck.get('created_by') != user_id:
+            if deck.get('public') is False:
+                raise NotFoundError('Deck not found')
+            if deck.get('class_id') and not self.members.is_member(user_id, deck['class_id']):
+                raise UnauthorizedError('Join the class to study this deck')
+        return deck
+
+    def _fetch_all(self, build_query) -> list:
+        """Every row of a query, LOAD_PAGE at a time in (created_at, id) order."""
+        rows, cursor = [], None
+        while True:
+            page = keyset(build_query(), LOAD_PAGE - 1, cursor, desc=False).execute().data or []
+            rows.extend(page)
+            if len(page) < LOAD_PAGE:
+                return rows
+            cursor = (page[-1]['created_at'], page[-1]['id'])
+
+    def _fetch_states(self, user_id: str, deck_id: str) -> list:
+        """The user's card_state rows for a deck, LOAD_PAGE at a time in card_id order."""
+        rows, after = [], None
+        while True:
+            query = self.admin.table('card_state').select(STATE_COLUMNS).eq('user_id', user_id).eq('deck_id', deck_id)
+            if after is not None:
+                query = query.gt('card_id', after)
+            page = query.order('card_id').limit(LOAD_PAGE).execute().data or []
+            rows.extend(page)
+            if len(page) < LOAD_PAGE:
+                return rows
+            after = page[-1]['card_id']
+
+    def _load(self, user_id: str, deck_id: str) -> tuple[Schedule, list]:
+        """The deck's schedule from its cards and the user's saved states, plus those
+        state rows. Costs one request per LOAD_PAGE cards, however long the history."""
+        cards = self._fetch_all(lambda: self.admin.table('flashcards').select('id, created_at').eq('deck_id', deck_id))
+        schedule = Schedule([c['id'] for c in cards])
+        states = self._fetch_states(user_id, deck_id)
+        schedule.restore((_state_tuple(r) for r in states), rebuild=True)
+        return schedule, states
+
+    def schedule_for(self, user_id: str, deck_id: str) -> Schedule:
+        """The user's schedule for a deck: the cached one if no state was written since
+        (one small call), otherwise reloaded."""
+        key = (user_id, deck_id)
+        cached = _schedules.get(key)
+        if cached is not None:
+            mark = call_rpc(self.admin, 'study_state_mark', {'p_user_id': user_id, 'p_deck_id': deck_id})
+            if mark == cached[1]:
+                return cached[0]
+        schedule, states = self._load(user_id, deck_id)
+        _schedules.set(key, (schedule, sum(r['version'] for r in states)))
+        return schedule
+
+    def _queue(self, schedule: Schedule, deck_id: str, now: float, limit: int) -> dict:
+        card_ids, waiting = schedule.due_cards(now, limit)
+        cards = {}
+        if card_ids:
+            res = self.admin.table('flashcards').select('id, question, answer, topic').in_('id', card_ids).execute()
+            cards = {c['id']: c for c in res.data or []}
+        due = []
+        for cid in card_ids:
+            card = cards.get(cid)
+            if card:
+                state = schedule.state(schedule.slots[cid])
+                due.append(dict(card, reps=state['reps'], lapses=state['lapses'],
+                                due_at=to_iso(state['due']) if state['due'] else None))
+        return {
+            'deck_id': deck_id,
+            'due': due,
+            'due_count': schedule.count_due(now),
+            'total_cards': len(schedule),
+            'next_due_at': to_iso(waiting) if waiting is not None else None,
+        }
+
+    def start(self, deck_id: str, user_id: str, limit: int | None = None) -> dict:
+        """The next `limit` due cards (earliest first) and counts for the deck."""
+        self._require_visible_deck(deck_id, user_id)
+        limit = max(1, min(int(limit or Config.STUDY_QUEUE_SIZE), Config.STUDY_MAX_BATCH))
+        return self._queue(self.schedule_for(user_id, deck_id), deck_id, time.time(), limit)
+
+    def _validate_reviews(self, reviews, schedule: Schedule, now: float, synced: bool = False) -> list:
+        """(card_id, result, at, elapsed_ms, client_event_id) tuples in the order the
+        answers happened. With `synced`, each answer needs an event id and a timestamp."""
+        if not isinstance(reviews, list) or not reviews:
+            raise ValidationError('reviews must be a non-empty list')
+        if len(reviews) > Config.STUDY_MAX_BATCH:
+            raise ValidationError(f'At most {Config.STUDY_MAX_BATCH} reviews per request')
+        out = []
+        for i, r in enumerate(reviews):
+            if not isinstance(r, dict):
+                raise ValidationError(f'reviews[{i}] must be an object')
+            if r.get('card_id') not in schedule:
+                raise ValidationError(f'reviews[{i}]: card is not in this deck')
+            if r.get('result') not in RESULTS:
+                raise ValidationError(f"reviews[{i}]: result must be one of: {', '.join(RESULTS)}")
+            event_id = r.get('client_event_id')
+            if synced and (not isinstance(event_id, str) or not 0 < len(event_id) <= MAX_EVENT_ID):
+                raise ValidationError(f'reviews[{i}]: client_event_id must be a string of 1-{MAX_EVENT_ID} characters')
+            if synced and not r.get('reviewed_at'):
+                raise ValidationError(f'reviews[{i}]: reviewed_at is required')
+            at = now
+            if r.get('reviewed_at'):
+                try:
+                    at = min(parse_time(r['reviewed_at']), now)
+                except ValueError:
+                    raise ValidationError(f'reviews[{i}]: reviewed_at must be an ISO timestamp')
+            elapsed = r.get('elapsed_ms')
+            if elapsed is not None and (not isinstance(elapsed, int) or elapsed < 0):
+                raise ValidationError(f'reviews[{i}]: elapsed_ms must be a non-negative integer')
+            out.append((r['card_id'], r['result'], at, elapsed, event_id if synced else None))
+        # Applied in the order they happened, whatever order the client sent them in
+        out.sort(key=lambda r: r[2])
+        return out
+
+    def _apply(self, schedule: Schedule, deck_id: str, user_id: str, batch: list):
+        """Store answers and the card states they produce in one call, then update the
+        schedule. The cached schedule may predate writes made by other workers, so the
+        batch's cards are re-read first; if one is written again before this call lands,
+        it raises ConflictError and stores nothing."""
+        rows = call_rpc(self.admin, 'current_card_states', {
+            'p_user_id': user_id, 'p_card_ids': sorted({r[0] for r in batch}),
+        }, many=True)
+        schedule.restore(_state_tuple(r) for r in rows)
+        versions = {r['card_id']: r['version'] for r in rows}
+        last = {r['card_id']: parse_time(r['last_reviewed_at']) for r in rows}
+        # An answer older than the card's stored state (recorded offline while the card
+        # was reviewed elsewhere) is applied as of that state's review time: SM-2 only
+        # moves forward, and the stored state may already fold in pruned history. The
+        # event keeps its real time; compaction counts it as covered, which it is.
+        # Worked out first and applied only once stored, so a failed write leaves the
+        # cached schedule as it was
+        states = schedule.simulate((cid, result, max(at, last.get(cid, at))) for cid, result, at, _, _ in batch)
+        call_rpc(self.admin, 'record_study_reviews', {
+            'p_user_id': user_id,
+            'p_deck_id': deck_id,
+            'p_events': [{'card_id': cid, 'result': result, 'elapsed_ms': elapsed, 'created_at': to_iso(at),
+                          'client_event_id': event_id}
+                         for cid, result, at, elapsed, event_id in batch],
+            'p_states': [_state_row(cid, state, versions.get(cid, 0)) for cid, state in states.items()],
+        })
+        schedule.restore((cid,) + state[:5] for cid, state in states.items())
+        # Each stored state went up one version; any other write leaves the mark behind
+        cached = _schedules.get((user_id, deck_id))
+        if cached is not None and cached[0] is schedule:
+            _schedules.set((user_id, deck_id), (schedule, cached[1] + len(states)))
+
+    def record_reviews(self, deck_id: str, user_id: str, reviews: list, limit: int | None = None) -> dict:
+        """Store a batch of answers with one write, update the schedule and return the new queue."""
+        self._require_visible_deck(deck_id, user_id)
+        schedule = self.schedule_for(user_id, deck_id)
+        now = time.time()
+        batch = self._validate_reviews(reviews, schedule, now)
+        for attempt in range(STATE_WRITE_ATTEMPTS):
+            try:
+                self._apply(schedule, deck_id, user_id, batch)
+                break
+            except ConflictError:
+                if attempt == STATE_WRITE_ATTEMPTS - 1:
+                    raise
+        limit = max(1, min(int(limit or Config.STUDY_QUEUE_SIZE), Config.STUDY_MAX_BATCH))
+        return dict(self._queue(schedule, deck_id, now, limit), recorded=len(batch))
+
+    def sync(self, deck_id: str, user_id: str, reviews: list, limit: int | None = None) -> dict:
+        """Apply answers recorded offline, each tagged with a device-generated
+        client_event_id. Ids already synced (a retried request, or repeats within the
+        batch) are skipped, so sending the same batch twice changes nothing."""
+        self._require_visible_deck(deck_id, user_id)
+        schedule = self.schedule_for(user_id, deck_id)
+        now = time.time()
+        batch, seen = [], set()
+        for review in self._validate_reviews(reviews, schedule, now, synced=True):
+            if review[4] not in seen:
+                seen.add(review[4])
+                batch.append(review)
+        unique, new = batch, []
+        # An overlapping retry can store some of these ids between the check and the
+        # write; the write then fails as a whole (ConflictError) and the check reruns
+        for attempt in range(STATE_WRITE_ATTEMPTS):
+            stored = {r['client_event_id'] for r in call_rpc(
+                self.admin, 'synced_study_events', {'p_user_id': user_id, 'p_client_event_ids': sorted(seen)},
+                many=True)}
+            new = [r for r in unique if r[4] not in stored]
+            if not new:
+                break
+            try:
+                self._apply(schedule, deck_id, user_id, new)
+                break
+            except ConflictError:
+                if attempt == STATE_WRITE_ATTEMPTS - 1:
+                    raise
+        limit = max(1, min(int(limit or Config.STUDY_QUEUE_SIZE), Config.STUDY_MAX_BATCH))
+        return dict(self._queue(schedule, deck_id, now, limit), recorded=len(new),
+                    duplicates=len(reviews) - len(new), synced=sorted(seen))
+
+    def fold(self, user_id: str, deck_id: str) -> int:
+        """Replay answers that the user's card_state rows for a deck don't reflect yet
+        (history from before snapshots existed) and store the result. Returns the
+        number of cards updated. Raises ConflictError if the user answers one of the
+        cards meanwhile; the next run picks the deck up again."""
+        schedule, states = self._load(user_id, deck_id)
+        covered = {r['card_id']: parse_time(r['last_reviewed_at']) for r in states}
+        events = self._fetch_all(lambda: self.admin.table('study_events').select('id, card_id, result, created_at')
+                                 .eq('user_id', user_id).eq('deck_id', deck_id))
+        pending = []
+        for e in events:
+            at = parse_time(e['created_at'])
+            if e['card_id'] in schedule and e['result'] in RESULTS and at > covered.get(e['card_id'], float('-inf')):
+                pending.append((e['card_id'], e['result'], at))
+        if not pending:
+            return 0
+        versions = {r['card_id']: r['version'] for r in states}
+        rows = [_state_row(cid, state, versions.get(cid, 0)) for cid, state in schedule.simulate(pending).items()]
+        for i in range(0, len(rows), Config.STUDY_MAX_BATCH):
+            call_rpc(self.admin, 'record_study_reviews', {
+                'p_user_id': user_id, 'p_deck_id': deck_id, 'p_events': [],
+                'p_states': rows[i:i + Config.STUDY_MAX_BATCH],
+            })
+        _schedules.pop((user_id, deck_id))
+        return len(rows)
@@ -0,0 +1,92 @@
+"""Extractive summarization used for PDF notes.
+
+Sentences are scored by the summed corpus frequency of their tokens. Patterns are
+compiled once, each sentence is tokenized once, and sentences are taken best-first
+from a heap, so the noise filter only runs on candidates that could be selected.
+"""
+import heapq
+import re
+from collections import Counter
+from itertools import chain, repeat
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_TOKEN = re.compile(r"[A-Za-z0-9']+")
+_WHITESPACE = re.compile(r"\s+")
+# Instructional scaffolding, URLs, and admin/meta lines
+_NOISE = re.compile(
+    r"http[s]?://|www\.|@|optional|teacher|students?|materials|procedure|homework"
+    r"|database|power\s*point|attached|note:?\s*\d+"
+)
+# Overly long lines are usually lists or tables rather than prose
+_MAX_SENTENCE_CHARS = 400
+
+SUMMARY_STOPWORDS = frozenset([
+    "the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have","but","not","their","his","her","its","they","them","we","you"
+])
+BASIC_STOPWORDS = frozenset([
+    "the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have"
+])
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s for s in (part.strip() for part in _SENTENCE_BREAK.split(text)) if s]
+
+
+def is_noise_sentence(sentence: str) -> bool:
+    return len(sentence) > _MAX_SENTENCE_CHARS or _NOISE.search(sentence.lower()) is not None
+
+
+def top_sentences(text: str, k: int, stopwords=SUMMARY_STOPWORDS, skip_noise: bool = True) -> list[str]:
+    """The k highest-scoring sentences, ties broken by position in the text."""
+    sentences = split_sentences(text)
+    # Whitespace between sentences holds no tokens, so per-sentence token lists
+    # cover exactly the tokens of the whole text
+    findall = _TOKEN.findall
+    token_lists = [findall(s.lower()) for s in sentences]
+    # Count every token, then filter the (much smaller) vocabulary
+    counts = Counter(chain.from_iterable(token_lists))
+    freqs = {t: n for t, n in counts.items() if len(t) > 2 and t not in stopwords}
+    get = freqs.get
+    zeros = repeat(0)
+    heap = [(-sum(map(get, tokens, zeros)), i) for i, tokens in enumerate(token_lists)]
+    heapq.heapify(heap)
+    # Pop best-first and only run the noise filter on sentences that could be picked
+    top = []
+    while heap and len(top) < k:
+        _, i = heapq.heappop(heap)
+        if skip_noise and is_noise_sentence(sentences[i]):
+            continue
+        top.append(sentences[i])
+    return top
+
+
+def summarize(text: str) -> str:
+    """Markdown summary: an overview of the top 2 sentences and up to 2 more paragraphs."""
+    ranked = top_sentences(text, 8)
+
+    # Overview: up to 2 sentences stitched
+    overview = _WHITESPACE.sub(" ", " ".join(ranked[:2])).strip()
+
+    # Additional paragraphs: groups of 2 sentences each, up to 2 paragraphs
+    rest = ranked[2:8]
+    paras = []
+    for i in range(0, len(rest), 2):
+        chunk = " ".join(rest[i:i+2]).strip()
+        if chunk:
+            paras.append(_WHITESPACE.sub(" ", chunk))
+        if len(paras) >= 2:
+            break
+
+    md = []
+    if overview:
+        md.append("### Overview")
+        md.append(overview)
+        # Add two blank lines for visual separation
+        md.append("")
+        md.append("")
+    if paras:
+        md.append("### Summary")
+        for p in paras:
+            md.append(p)
+            md.append("")
+    return "\n".join(md).strip()
@@ -1,14 +1,64 @@
+from app.core.supabase_client import call_rpc, get_admin_client
+from app.services.event_bus import publish
+from app.utils.errors import NotFoundError, ValidationError
+
+TARGET_TYPES = ('note', 'deck')
+# Matches the largest list page, so a feed can fetch vote state for a whole page at once
+MAX_TARGETS = 100
+
+
 class VoteService:
-    def __init__(self):
-        pass
-    
-    def toggle_upvote(self, target_id: str, target_type: str, user_id: str):
-        """Toggle an upvote on a note or deck."""
-        # TODO: Implement toggle upvote
-        pass
-    
+    """Vote counts and the caller's own votes on notes and decks.
+
+    Counts come from the vote_count columns that triggers keep in step with note_votes
+    and upvotes; reads and writes are one RPC each (see setup_database.sql, section 10).
+    """
+
+    def __init__(self, admin=None):
+        self.admin = admin or get_admin_client()
+
+    def _check_type(self, target_type: str):
+        if target_type not in TARGET_TYPES:
+            raise ValidationError(f"target_type must be one of: {', '.join(TARGET_TYPES)}")
+
+    def get_summaries(self, target_ids: list[str], target_type: str, user_id: str) -> dict:
+        """{target_id: {'count', 'user_has_voted'}} for each visible target, in one round trip."""
+        self._check_type(target_type)
+        target_ids = list(dict.fromkeys(t for t in target_ids if t))
+        if len(target_ids) > MAX_TARGETS:
+            raise ValidationError(f"At most {MAX_TARGETS} ids per request")
+        if not target_ids:
+            return {}
+        rows = call_rpc(self.admin, 'vote_summaries', {
+            'p_user_id': user_id,
+            'p_target_type': target_type,
+            'p_target_ids': target_ids,
+        }, many=True)
+        return {
+            r['target_id']: {'count': r['vote_count'], 'user_has_voted': r['user_has_voted']}
+            for r in rows
+        }
+
     def get_upvotes(self, target_id: str, target_type: str, user_id: str):
         """Get upvote count and user's upvote status."""
-        # TODO: Implement get upvotes
-        pass
+        summary = self.get_summaries([target_id], target_type, user_id).get(target_id)
+        if summary is None:
+            raise NotFoundError(f"{target_type.capitalize()} not found")
+        return summary
 
+    def set_vote(self, target_id: str, target_type: str, user_id: str, voted: bool | None):
+        """Cast (True), retract (False) or toggle (None) the user's vote; returns the new summary."""
+        self._check_type(target_type)
+        summary = call_rpc(self.admin, 'set_vote', {
+            'p_user_id': user_id,
+            'p_target_type': target_type,
+            'p_target_id': target_id,
+            'p_voted': voted,
+        })
+        # user_has_voted is per viewer, so only the count goes out to the stream
+        publish(target_type, target_id, 'votes', {'count': summary['count']})
+        return summary
+
+    def toggle_upvote(self, target_id: str, target_type: str, user_id: str):
+        """Toggle an upvote on a note or deck."""
+        return self.set_vote(target_id, target_type, user_id, None)
@@ -0,0 +1,902 @@
+"""In-memory stand-in for the Supabase client: PostgREST tables and RPCs, storage
+buckets and the auth API, with an optional simulated round trip per call."""
+import copy
+import re
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from app.core.metrics import record_query
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = 'select'
+        self.columns = '*'
+        self.filters = []
+        self.orders = []
+        self.limit_n = None
+        self.payload = None
+        self.want_single = False
+        self.count = None
+        self.offset_n = 0
+        self.on_conflict = None
+
+    # ---------- operations ----------
+    def select(self, columns='*', count=None):
+        self.op = 'select'
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload):
+        self.op = 'insert'
+        self.payload = payload
+        return self
+
+    def update(self, payload):
+        self.op = 'update'
+        self.payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, ignore_duplicates=False):
+        self.op = 'upsert'
+        self.payload = payload
+        self.on_conflict = on_conflict or 'id'
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    # ---------- filters / modifiers ----------
+    # Columns may name an embedded relation ("sessions.class_id"); such filters drop the
+    # parent row, i.e. they behave like PostgREST filters on a !inner embed.
+    def eq(self, column, value):
+        self.filters.append(lambda r: _get(r, column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda r: _get(r, column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: _get(r, column) in values)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: _compare(_get(r, column), 'lt', value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: _compare(_get(r, column), 'lte', value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: _compare(_get(r, column), 'gt', value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: _compare(_get(r, column), 'gte', value))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda r: _compare(_get(r, column), 'is', value))
+        return self
+
+    def or_(self, filters):
+        """PostgREST logic tree, e.g. 'a.lt.1,and(a.eq.1,id.lt."x")'."""
+        tree = _parse_logic(filters)
+        self.filters.append(lambda r: _eval_logic(r, 'or', tree))
+        return self
+
+    def order(self, column, desc=False):
+        # Accepts a comma-separated list ("created_at.desc,id"); `desc` applies to the last column
+        parts = [p.strip() for p in column.split(',') if p.strip()]
+        for n, part in enumerate(parts):
+            name, _, modifier = part.partition('.')
+            self.orders.append((name, modifier == 'desc' or (n == len(parts) - 1 and desc)))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def range(self, start, end):
+        # Inclusive on both ends, like the Range header PostgREST reads
+        self.offset_n = start
+        self.limit_n = end - start + 1
+        return self
+
+    def single(self):
+        self.want_single = True
+        return self
+
+    # ---------- execution ----------
+    def _embeds(self):
+        """{relation: (columns, inner)} for embeds named in the select list."""
+        embeds = {}
+        for item in _split_top(self.columns):
+            if '(' in item:
+                name, _, cols = item.partition('(')
+                name, _, hint = name.partition('!')
+                embeds[name.strip()] = (cols.rstrip(')'), hint == 'inner')
+        return embeds
+
+    def _embed(self, row, embeds):
+        row = dict(row)
+        for rel, (cols, inner) in embeds.items():
+            fk = next((c for c in (f'{rel[:-2]}_id', f'{rel[:-1]}_id') if c in row), None)
+            target = next((t for t in self.db.rows(rel) if fk and t.get('id') == row.get(fk)), None)
+            if target is None and inner:
+                return None
+            row[rel] = _project(target, cols) if target is not None else None
+        return row
+
+    def _matches(self):
+        embeds = self._embeds() if self.op == 'select' else {}
+        rows = []
+        for r in self.db.rows(self.table):
+            e = self._embed(r, embeds) if embeds else r
+            if e is not None and all(f(e) for f in self.filters):
+                rows.append((r, e))
+        return rows
+
+    def _project(self, row):
+        computed = self.db.computed.get(self.table, {})
+        wanted = [c for c in _split_top(self.columns) if c in computed]
+        if wanted:
+            row = dict(row, **{c: computed[c](row) for c in wanted})
+        return _project(row, self.columns)
+
+    def execute(self):
+        self.db.round_trip(self.table, self.op)
+        rows = self.db.rows(self.table)
+        if self.op in ('insert', 'upsert'):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = [c.strip() for c in (self.on_conflict or '').split(',') if c.strip()]
+            written = []
+            for item in payload:
+                existing = keys and all(k in item for k in keys) and next(
+                    (r for r in rows if all(r.get(k) == item[k] for k in keys)), None)
+                if existing:
+                    existing.update(item)
+                    written.append(dict(existing))
+                    continue
+                row = dict(item)
+                row.setdefault('id', str(uuid.uuid4()))
+                row.setdefault('created_at', self.db.tick())
+                rows.append(row)
+                written.append(dict(row))
+            return FakeResponse(written)
+        matched = self._matches()
+        if self.op == 'update':
+            for r, _ in matched:
+                r.update(self.payload)
+            return FakeResponse([dict(r) for r, _ in matched])
+        if self.op == 'delete':
+            doomed = [r for r, _ in matched]
+            self.db.tables[self.table] = [r for r in rows if not any(r is d for d in doomed)]
+            return FakeResponse([dict(r) for r in doomed])
+        matched = [e for _, e in matched]
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column) or ''), reverse=desc)
+        if self.limit_n is not None:
+            matched = matched[self.offset_n:self.offset_n + self.limit_n]
+        elif self.offset_n:
+            matched = matched[self.offset_n:]
+        data = [self._project(r) for r in matched]
+        count = len(data) if self.count else None
+        if self.want_single:
+            if len(data) != 1:
+                raise Exception('PGRST116: JSON object requested, multiple (or no) rows returned')
+            return FakeResponse(data[0], count)
+        return FakeResponse(data, count)
+
+
+def _split_top(text):
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for n, ch in enumerate(text):
+        if ch == '"' and text[n - 1:n] != '\\':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        elif not quoted and ch == ',' and depth == 0:
+            parts.append(text[start:n].strip())
+            start = n + 1
+    parts.append(text[start:].strip())
+    return [p for p in parts if p]
+
+
+def _project(row, columns):
+    items = _split_top(columns)
+    out = dict(row) if '*' in items else {}
+    for item in items:
+        if item == '*':
+            continue
+        if '(' in item:
+            name = item.partition('(')[0].partition('!')[0].strip()
+            out[name] = row.get(name)
+        else:
+            out[item] = row.get(item)
+    if '*' in items:
+        # Embedded relations only appear when selected
+        for key in list(out):
+            if isinstance(out[key], dict) and not any(i.startswith(key) for i in items if '(' in i):
+                del out[key]
+    return out
+
+
+def _get(row, column):
+    if '.' in column:
+        rel, _, col = column.partition('.')
+        nested = row.get(rel)
+        return nested.get(col) if isinstance(nested, dict) else None
+    return row.get(column)
+
+
+def _coerce(current, value):
+    if isinstance(value, str):
+        if isinstance(current, bool):
+            return value == 'true'
+        if isinstance(current, (int, float)):
+            return float(value)
+    return value
+
+
+def _compare(current, op, value):
+    if op == 'is':
+        return current is None if value in (None, 'null') else current == _coerce(current, value)
+    if current is None:
+        return False
+    value = _coerce(current, value)
+    if op == 'eq':
+        return current == value
+    if op == 'neq':
+        return current != value
+    if op == 'lt':
+        return current < value
+    if op == 'lte':
+        return current <= value
+    if op == 'gt':
+        return current > value
+    if op == 'gte':
+        return current >= value
+    raise ValueError(f'unsupported operator {op}')
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+
+def _parse_logic(text):
+    nodes = []
+    if text.startswith('(') and text.endswith(')'):
+        text = text[1:-1]
+    for part in _split_top(text):
+        if part.startswith(('and(', 'or(')):
+            kind, _, inner = part.partition('(')
+            nodes.append((kind, _parse_logic(inner[:-1])))
+        else:
+            column, op, value = part.split('.', 2)
+            nodes.append(('cond', (column, op, _unquote(value))))
+    return nodes
+
+
+def _eval_logic(row, kind, nodes):
+    results = (
+        _compare(_get(row, n[1][0]), n[1][1], n[1][2]) if n[0] == 'cond' else _eval_logic(row, n[0], n[1])
+        for n in nodes
+    )
+    return any(results) if kind == 'or' else all(results)
+
+
+class FakeAPIError(Exception):
+    """Shaped like postgrest.exceptions.APIError."""
+
+    def __init__(self, message, code=None):
+        self.message = message
+        self.code = code
+        super().__init__(message)
+
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.db.round_trip('rpc', self.name)
+        fn = self.db.functions.get(self.name)
+        if fn is None:
+            raise FakeAPIError(f'function {self.name} does not exist', code='PGRST202')
+        return FakeResponse(fn(self.db, self.params))
+
+
+def _require_member(db, class_id, user_id, message):
+    if not any(c['id'] == class_id for c in db.rows('classes')):
+        raise FakeAPIError('Class not found', code='P0002')
+    if not any(m['class_id'] == class_id and m['user_id'] == user_id for m in db.rows('class_members')):
+        raise FakeAPIError(message, code='42501')
+
+
+def _insert(db, table, row):
+    # Writes made inside a function are part of its one round trip, so they aren't logged
+    row = dict(row)
+    row.setdefault('id', str(uuid.uuid4()))
+    row.setdefault('created_at', db.tick())
+    db.rows(table).append(row)
+    return dict(row)
+
+
+def _create_note_with_session(db, p):
+    _require_member(db, p['p_class_id'], p['p_user_id'], 'You must join the class before adding notes')
+    session = _insert(db, 'sessions', {
+        'class_id': p['p_class_id'], 'title': (p.get('p_session_title') or 'PDF Upload')[:120], 'created_by': p['p_user_id']
+    })
+    return _insert(db, 'notes', {
+        'session_id': session['id'], 'type': p.get('p_type', 'slides'), 'content': p['p_content'],
+        'created_by': p['p_user_id'], 'public': p.get('p_public', True), 'pdf_url': p.get('p_pdf_url'),
+        'title': p.get('p_title'),
+    })
+
+
+def _create_deck_with_cards(db, p):
+    _require_member(db, p['p_class_id'], p['p_user_id'], 'Join the class before creating a deck')
+    session = _insert(db, 'sessions', {'class_id': p['p_class_id'], 'title': p['p_title'][:120], 'created_by': p['p_user_id']})
+    deck = _insert(db, 'flashcard_decks', {
+        'class_id': p['p_class_id'], 'session_id': session['id'], 'title': p['p_title'][:180],
+        'public': p.get('p_public', True), 'created_by': p['p_user_id'],
+    })
+    cards = p.get('p_cards') or []
+    for c in cards:
+        _insert(db, 'flashcards', dict(c, deck_id=deck['id'], created_by=p['p_user_id']))
+    return dict(deck, card_count=len(cards))
+
+
+def _visible_target(db, p, target_id):
+    """The note/deck row if p_user_id may see it (own, or public in one of their classes)."""
+    user_id = p['p_user_id']
+    if p['p_target_type'] == 'note':
+        row = next((n for n in db.rows('notes') if n['id'] == target_id), None)
+        session = row and next((s for s in db.rows('sessions') if s['id'] == row.get('session_id')), None)
+        class_id = session and session.get('class_id')
+    else:
+        row = next((d for d in db.rows('flashcard_decks') if d['id'] == target_id), None)
+        class_id = row and row.get('class_id')
+    if row is None or (row.get('created_by') != user_id and not (
+            row.get('public', True) and class_id and
+            any(m['class_id'] == class_id and m['user_id'] == user_id for m in db.rows('class_members')))):
+        return None
+    return row
+
+
+def _has_vote(db, target_type, target_id, user_id):
+    if target_type == 'note':
+        return any(v['note_id'] == target_id and v['user_id'] == user_id for v in db.rows('note_votes'))
+    return any(u['target_id'] == target_id and u['target_type'] == 'deck' and u['user_id'] == user_id
+               for u in db.rows('upvotes'))
+
+
+def _vote_summaries(db, p):
+    out = []
+    for target_id in p['p_target_ids']:
+        row = _visible_target(db, p, target_id)
+        if row is not None:
+            out.append({'target_id': target_id, 'vote_count': row.get('vote_count', 0),
+                        'user_has_voted': _has_vote(db, p['p_target_type'], target_id, p['p_user_id'])})
+    return out
+
+
+def _set_vote(db, p):
+    kind, target_id, user_id = p['p_target_type'], p['p_target_id'], p['p_user_id']
+    row = _visible_target(db, p, target_id)
+    if row is None:
+        raise FakeAPIError(f'{kind.capitalize()} not found', code='P0002')
+    had = _has_vote(db, kind, target_id, user_id)
+    voted = (not had) if p.get('p_voted') is None else p['p_voted']
+    # The vote_count updates stand in for the bump_*_vote_count triggers
+    if voted and not had:
+        if kind == 'note':
+            _insert(db, 'note_votes', {'note_id': target_id, 'user_id': user_id})
+        else:
+            _insert(db, 'upvotes', {'target_id': target_id, 'target_type': 'deck', 'user_id': user_id})
+        row['vote_count'] = row.get('vote_count', 0) + 1
+    elif had and not voted:
+        if kind == 'note':
+            db.tables['note_votes'] = [v for v in db.rows('note_votes')
+                                       if not (v['note_id'] == target_id and v['user_id'] == user_id)]
+        else:
+            db.tables['upvotes'] = [u for u in db.rows('upvotes')
+                                    if not (u['target_id'] == target_id and u['user_id'] == user_id)]
+        row['vote_count'] = max(row.get('vote_count', 0) - 1, 0)
+    return {'count': row.get('vote_count', 0), 'user_has_voted': voted}
+
+
+def _when(value):
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def _covered(db, event):
+    """The event's effect is already in a card_state row."""
+    return any(s['user_id'] == event['user_id'] and s['card_id'] == event['card_id']
+               and _when(s['last_reviewed_at']) >= _when(event['created_at']) for s in db.rows('card_state'))
+
+
+def _record_study_reviews(db, p):
+    user_id, deck_id = p['p_user_id'], p['p_deck_id']
+    states = db.rows('card_state')
+    current = {c['card_id']: n for n, c in enumerate(states) if c['user_id'] == user_id}
+    # The version check runs before anything is written, standing in for the rollback
+    for s in p.get('p_states') or []:
+        stored = states[current[s['card_id']]]['version'] if s['card_id'] in current else 0
+        if stored != s['base_version']:
+            raise FakeAPIError('Card state changed since it was read', code='40001')
+    known = {e.get('client_event_id') for e in db.rows('study_events') if e['user_id'] == user_id} - {None}
+    sent = [e['client_event_id'] for e in p.get('p_events') or [] if e.get('client_event_id') is not None]
+    if known.intersection(sent) or len(set(sent)) < len(sent):
+        raise FakeAPIError('Some of these answers were already recorded', code='40001')
+    for e in p.get('p_events') or []:
+        _insert(db, 'study_events', dict(e, user_id=user_id, deck_id=deck_id))
+    for s in p.get('p_states') or []:
+        row = {k: v for k, v in s.items() if k != 'base_version'}
+        row.update(user_id=user_id, deck_id=deck_id, version=s['base_version'] + 1)
+        if s['card_id'] in current:
+            states[current[s['card_id']]] = row
+        else:
+            states.append(row)
+    return len(p.get('p_events') or [])
+
+
+def _current_card_states(db, p):
+    wanted = set(p['p_card_ids'])
+    return [dict(c) for c in db.rows('card_state') if c['user_id'] == p['p_user_id'] and c['card_id'] in wanted]
+
+
+def _study_state_mark(db, p):
+    return sum(c['version'] for c in db.rows('card_state')
+               if c['user_id'] == p['p_user_id'] and c['deck_id'] == p['p_deck_id'])
+
+
+def _synced_study_events(db, p):
+    wanted = set(p['p_client_event_ids'])
+    return [{'client_event_id': e['client_event_id']} for e in db.rows('study_events')
+            if e['user_id'] == p['p_user_id'] and e.get('client_event_id') in wanted]
+
+
+def _unfolded_study_pairs(db, p):
+    pairs = {(e['user_id'], e['deck_id']) for e in db.rows('study_events') if not _covered(db, e)}
+    return [{'user_id': u, 'deck_id': d} for u, d in sorted(pairs)]
+
+
+def _prune_study_events(db, p):
+    before, limit = _when(p['p_before']), p.get('p_limit', 10000)
+    old = [e['id'] for e in db.rows('study_events') if _when(e['created_at']) < before and _covered(db, e)]
+    doomed = set(old[:limit])
+    db.tables['study_events'] = [e for e in db.rows('study_events') if e['id'] not in doomed]
+    return len(doomed)
+
+
+def _orphaned_note_pdfs(db, p):
+    bucket = db.storage.buckets.get('notes-pdfs', {'objects': {}, 'updated': {}})
+    before = _when(p['p_before']).timestamp()
+    referenced = {n.get('pdf_url') for n in db.rows('notes')}
+    names = [k for k in sorted(bucket['objects'])
+             if bucket['updated'].get(k, 0) < before and p['p_url_prefix'] + k not in referenced]
+    return [{'name': k} for k in names[:p.get('p_limit', 1000)]]
+
+
+# Full-text search: an in-process inverted index in place of search_documents and
+# its GIN index. Tokens are lowercased words minus a few stop words with plural and
+# -ing/-ed endings trimmed, a rough stand-in for the 'english' configuration.
+_WORD = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset('a an and are as at be by for from in is it of on or that the this to was with'.split())
+_SEARCH_WEIGHTS = {'A': 1.0, 'B': 0.4}  # ts_rank_cd's defaults for the two weights used
+
+
+def _stem(word):
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def search_terms(text):
+    return [_stem(w) for w in _WORD.findall((text or '').lower()) if w not in _STOP_WORDS]
+
+
+class FakeSearchIndex:
+    """term -> {(kind, id): score}. Brought up to date before each search by reindexing
+    only rows whose searchable text changed, as the search triggers would have."""
+
+    def __init__(self, db):
+        self.db = db
+        self.postings = defaultdict(dict)
+        self.docs = {}  # (kind, id) -> (class_id, indexed text, terms)
+
+    def _documents(self):
+        sessions = {r['id']: r.get('class_id') for r in self.db.rows('sessions')}
+        decks = {r['id']: r for r in self.db.rows('flashcard_decks')}
+        for n in self.db.rows('notes'):
+            yield ('note', n['id']), sessions.get(n.get('session_id')), (n.get('title'), n.get('content'))
+        for d in decks.values():
+            yield ('deck', d['id']), d.get('class_id'), (d.get('title'), None)
+        for c in self.db.rows('flashcards'):
+            deck = decks.get(c.get('deck_id')) or {}
+            yield ('card', c['id']), deck.get('class_id'), (c.get('question'), c.get('answer'))
+
+    def refresh(self):
+        current = set()
+        for key, class_id, text in self._documents():
+            current.add(key)
+            known = self.docs.get(key)
+            if known and known[1] == text:
+                if known[0] != class_id:
+                    self.docs[key] = (class_id,) + known[1:]
+                continue
+            self._drop(key)
+            scores = defaultdict(float)
+            for field, weight in zip(text, 'AB'):
+                for term in search_terms(field):
+                    scores[term] += _SEARCH_WEIGHTS[weight]
+            for term, score in scores.items():
+                self.postings[term][key] = score
+            self.docs[key] = (class_id, text, tuple(scores))
+        for key in set(self.docs) - current:
+            self._drop(key)
+
+    def _drop(self, key):
+        known = self.docs.pop(key, None)
+        for term in known[2] if known else ():
+            self.postings[term].pop(key, None)
+
+    def search(self, class_id, query):
+        """[((kind, id), rank)] for rows in the class matching every word of `query`
+        and none of its -excluded words. Quotes are ignored (no phrase matching)."""
+        self.refresh()
+        words = query.replace('"', ' ').split()
+        wanted = search_terms(' '.join(w for w in words if not w.startswith('-')))
+        unwanted = search_terms(' '.join(w[1:] for w in words if w.startswith('-')))
+        if not wanted:
+            return []
+        keys = set.intersection(*(set(self.postings.get(t, ())) for t in wanted))
+        for term in unwanted:
+            keys -= set(self.postings.get(term, ()))
+        return [(k, sum(self.postings[t][k] for t in wanted)) for k in keys if self.docs[k][0] == class_id]
+
+
+def _snippet(text, terms, words=24):
+    tokens = (text or '').split()
+    hits = [i for i, t in enumerate(tokens) if set(search_terms(t)) & terms]
+    start = max(0, hits[0] - 8) if hits else 0
+    return ' '.join(f'<mark>{t}</mark>' if i in hits else t
+                    for i, t in enumerate(tokens[start:start + words], start))
+
+
+def _search_class(db, p):
+    user_id, class_id = p['p_user_id'], p['p_class_id']
+    if not any(m['class_id'] == class_id and m['user_id'] == user_id for m in db.rows('class_members')):
+        raise FakeAPIError('You are not a member of this class', code='42501')
+    sessions = {r['id']: r for r in db.rows('sessions')}
+    rows = {kind: {r['id']: r for r in db.rows(table)}
+            for kind, table in (('note', 'notes'), ('deck', 'flashcard_decks'), ('card', 'flashcards'))}
+    hits = []
+    for (kind, row_id), rank in db.search_index.search(class_id, p['p_query']):
+        row = rows[kind][row_id]
+        deck = row if kind == 'deck' else rows['deck'].get(row.get('deck_id'), {})
+        owner_row = row if kind == 'note' else deck
+        if not (owner_row.get('public', True) or owner_row.get('created_by') == user_id):
+            continue
+        if kind == 'note':
+            title = row.get('title') or sessions.get(row.get('session_id'), {}).get('title')
+            hit = {'deck_id': None, 'title': title, 'body': row.get('content')}
+        elif kind == 'deck':
+            hit = {'deck_id': row_id, 'title': row.get('title'), 'body': None}
+        else:
+            hit = {'deck_id': row.get('deck_id'), 'title': row.get('question'), 'body': row.get('answer')}
+        hits.append(dict(hit, kind=kind, id=row_id, rank=rank, created_at=row.get('created_at')))
+    hits.sort(key=lambda h: (h['rank'], h['id']), reverse=True)
+    if p.get('p_after_rank') is not None:
+        after = (p['p_after_rank'], p['p_after_id'])
+        hits = [h for h in hits if (h['rank'], h['id']) < after]
+    terms = set(search_terms(' '.join(w for w in p['p_query'].split() if not w.startswith('-'))))
+    return [{'kind': h['kind'], 'id': h['id'], 'deck_id': h['deck_id'], 'title': h['title'],
+             'snippet': _snippet(h['body'] or h['title'], terms), 'rank': h['rank'], 'created_at': h['created_at']}
+            for h in hits[:p.get('p_limit', 20)]]
+
+
+def _index_note_fingerprint(db, p):
+    note_id, signature, buckets = p['p_note_id'], p['p_signature'], p['p_buckets']
+    notes = {n['id']: n for n in db.rows('notes')}
+    note = notes.get(note_id)
+    session = note and next((s for s in db.rows('sessions') if s['id'] == note.get('session_id')), None)
+    if not session:
+        raise FakeAPIError('Note not found', code='P0002')
+    class_id = session['class_id']
+    keys = {(band, bucket) for band, bucket in enumerate(buckets)}
+    candidates = {b['note_id'] for b in db.rows('note_lsh_buckets')
+                  if b['class_id'] == class_id and (b['band'], b['bucket']) in keys and b['note_id'] != note_id}
+    fingerprints = {f['note_id']: f['signature'] for f in db.rows('note_fingerprints')}
+    scored = []
+    for cid in candidates:
+        other = notes.get(cid)
+        if other and other.get('public', True) and cid in fingerprints:
+            share = sum(x == y for x, y in zip(fingerprints[cid], signature)) / len(signature)
+            if share >= p.get('p_threshold', 0.8):
+                scored.append((-share, other.get('created_at') or '', other.get('duplicate_of') or cid))
+    match = min(scored)[2] if scored else None
+
+    db.tables['note_fingerprints'] = [f for f in db.rows('note_fingerprints') if f['note_id'] != note_id]
+    db.rows('note_fingerprints').append({'note_id': note_id, 'class_id': class_id, 'signature': list(signature)})
+    db.tables['note_lsh_buckets'] = [b for b in db.rows('note_lsh_buckets') if b['note_id'] != note_id]
+    db.rows('note_lsh_buckets').extend({'class_id': class_id, 'band': band, 'bucket': bucket, 'note_id': note_id}
+                                       for band, bucket in sorted(keys))
+    if match:
+        note['duplicate_of'] = match
+        if note.get('public', True):
+            notes[match]['duplicate_count'] = notes[match].get('duplicate_count', 0) + 1
+    return match
+
+
+# Python stand-ins for the functions in scripts/setup_database.sql
+def _content_preview(row):
+    # Mirrors public.content_preview(notes)
+    text = re.sub(r'[#*_`>\s]+', ' ', (row.get('content') or '')[:600])
+    return text.strip()[:200]
+
+
+# Computed columns, selectable by name like PostgREST functions over a row type
+DEFAULT_COMPUTED = {
+    'notes': {'content_preview': _content_preview},
+}
+
+
+DEFAULT_FUNCTIONS = {
+    'create_note_with_session': _create_note_with_session,
+    'create_deck_with_cards': _create_deck_with_cards,
+    'vote_summaries': _vote_summaries,
+    'set_vote': _set_vote,
+    'record_study_reviews': _record_study_reviews,
+    'current_card_states': _current_card_states,
+    'study_state_mark': _study_state_mark,
+    'unfolded_study_pairs': _unfolded_study_pairs,
+    'prune_study_events': _prune_study_events,
+    'synced_study_events': _synced_study_events,
+    'search_class': _search_class,
+    'index_note_fingerprint': _index_note_fingerprint,
+    'orphaned_note_pdfs': _orphaned_note_pdfs,
+}
+
+
+class FakeBucket:
+    """One storage bucket; objects are bytes keyed by path."""
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    def _objects(self):
+        bucket = self.storage.buckets.get(self.name)
+        if bucket is None:
+            raise FakeAPIError('Bucket not found', code='404')
+        return bucket['objects']
+
+    def upload(self, path, file, file_options=None):
+        self.storage.db.round_trip('storage', 'upload')
+        objects = self._objects()
+        if path in objects and str((file_options or {}).get('upsert', 'false')).lower() != 'true':
+            raise FakeAPIError('The resource already exists', code='409')
+        data = file.read() if hasattr(file, 'read') else bytes(file)
+        objects[path] = data
+        self.storage.buckets[self.name]['updated'][path] = time.time()
+        return SimpleNamespace(path=path, full_path=f'{self.name}/{path}')
+
+    def download(self, path):
+        self.storage.db.round_trip('storage', 'download')
+        objects = self._objects()
+        if path not in objects:
+            raise FakeAPIError('Object not found', code='404')
+        return objects[path]
+
+    def remove(self, paths):
+        self.storage.db.round_trip('storage', 'remove')
+        objects = self._objects()
+        for p in paths:
+            self.storage.buckets[self.name]['updated'].pop(p, None)
+        return [{'name': p} for p in paths if objects.pop(p, None) is not None]
+
+    def list(self, path=None, options=None):
+        self.storage.db.round_trip('storage', 'list')
+        prefix = f"{path.rstrip('/')}/" if path else ''
+        return [{'name': k[len(prefix):]} for k in sorted(self._objects()) if k.startswith(prefix)]
+
+    def get_public_url(self, path):
+        # Built locally by the real client too, so not a round trip
+        return f'{self.storage.db.url}/storage/v1/object/public/{self.name}/{path}'
+
+
+class FakeStorage:
+    def __init__(self, db):
+        self.db = db
+        self.buckets = {}
+
+    def list_buckets(self):
+        self.db.round_trip('storage', 'list_buckets')
+        return [SimpleNamespace(id=name, name=name, public=b['public']) for name, b in self.buckets.items()]
+
+    def create_bucket(self, id, name=None, options=None):
+        self.db.round_trip('storage', 'create_bucket')
+        if id in self.buckets:
+            raise FakeAPIError('The resource already exists', code='409')
+        self.buckets[id] = {'public': bool((options or {}).get('public')), 'objects': {}, 'updated': {}}
+        return {'name': id}
+
+    def from_(self, id):
+        return FakeBucket(self, id)
+
+
+class FakeAuthAdmin:
+    def __init__(self, auth):
+        self.auth = auth
+
+    def create_user(self, attributes):
+        self.auth.db.round_trip('auth', 'create_user')
+        return SimpleNamespace(user=self.auth._create(attributes))
+
+    def get_user_by_id(self, uid):
+        self.auth.db.round_trip('auth', 'get_user_by_id')
+        user = self.auth.users.get(uid)
+        if user is None:
+            raise FakeAPIError('User not found', code='404')
+        return SimpleNamespace(user=user)
+
+    def update_user_by_id(self, uid, attributes):
+        self.auth.db.round_trip('auth', 'update_user_by_id')
+        user = self.auth.users.get(uid)
+        if user is None:
+            raise FakeAPIError('User not found', code='404')
+        user.user_metadata.update(attributes.get('user_metadata') or {})
+        if attributes.get('email'):
+            user.email = attributes['email']
+        if attributes.get('email_confirm'):
+            user.email_confirmed_at = self.auth.db.tick()
+        return SimpleNamespace(user=user)
+
+
+class FakeAuth:
+    """GoTrue stand-in. Access tokens are opaque strings that get_user() resolves."""
+
+    def __init__(self, db):
+        self.db = db
+        self.users = {}
+        self._passwords = {}
+        self._tokens = {}
+        self.admin = FakeAuthAdmin(self)
+
+    def _create(self, attributes):
+        email = attributes['email']
+        if any(u.email == email for u in self.users.values()):
+            raise FakeAPIError('User already registered', code='422')
+        user = SimpleNamespace(id=attributes.get('id') or str(uuid.uuid4()), email=email,
+                               user_metadata=dict(attributes.get('user_metadata') or {}),
+                               email_confirmed_at=self.db.tick() if attributes.get('email_confirm') else None)
+        self.users[user.id] = user
+        self._passwords[user.id] = attributes.get('password')
+        return user
+
+    def _session(self, user):
+        token = f'fake-{uuid.uuid4().hex}'
+        self._tokens[token] = user.id
+        return SimpleNamespace(access_token=token, token_type='bearer', user=user)
+
+    def sign_up(self, credentials):
+        self.db.round_trip('auth', 'sign_up')
+        user = self._create({'email': credentials['email'], 'password': credentials['password'],
+                             'user_metadata': (credentials.get('options') or {}).get('data')})
+        return SimpleNamespace(user=user, session=None)
+
+    def sign_in_with_password(self, credentials):
+        self.db.round_trip('auth', 'sign_in_with_password')
+        user = next((u for u in self.users.values() if u.email == credentials['email']), None)
+        if user is None or self._passwords.get(user.id) != credentials['password']:
+            raise FakeAPIError('Invalid login credentials', code='400')
+        return SimpleNamespace(user=user, session=self._session(user))
+
+    def get_user(self, jwt=None):
+        self.db.round_trip('auth', 'get_user')
+        user = self.users.get(self._tokens.get(jwt))
+        return SimpleNamespace(user=user) if user else None
+
+
+class FakeSupabase:
+    """Tables are lists of dict rows; every executed query, RPC, storage or auth call is
+    logged in `calls`. `latency` seconds are slept per call to stand in for the network."""
+
+    def __init__(self, tables=None, latency=0.0, url='http://supabase.local'):
+        self.tables = copy.deepcopy(tables or {})
+        self.calls = []
+        self.latency = latency
+        self.url = url
+        self.functions = dict(DEFAULT_FUNCTIONS)
+        self.computed = dict(DEFAULT_COMPUTED)
+        self.storage = FakeStorage(self)
+        self.auth = FakeAuth(self)
+        self.search_index = FakeSearchIndex(self)
+        self._clock = 0
+
+    def round_trip(self, target, op):
+        # Reported like the real clients' httpx hooks report, so Server-Timing and
+        # /api/metrics work against the fake too
+        self.calls.append((target, op))
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        record_query(target, op, time.perf_counter() - started)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params or {})
+
+    def rows(self, table):
+        return self.tables.setdefault(table, [])
+
+    def tick(self):
+        self._clock += 1
+        return f'2025-01-01T00:00:00.{self._clock:06d}+00:00'
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def reset_calls(self):
+        self.calls = []
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, padding: int = 0) -> bytes:
+    """Minimal multi-page text PDF; page N's first line reads 'Page N'. `padding` adds an
+    unreferenced binary stream of that many bytes, standing in for embedded images."""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    if padding:
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (padding, b'\xa5' * padding))
+    kids = []
+    for p in range(pages):
+        lines = [f'Page {p + 1}'] + [
+            f'Lecture {p + 1} line {i}: mitochondria produce ATP through oxidative phosphorylation'
+            for i in range(lines_per_page - 1)
+        ]
+        body = ' T* '.join(f'({line}) Tj' for line in lines)
+        stream = f'BT /F1 10 Tf 12 TL 40 780 Td {body} ET'.encode()
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % k for k in kids), pages
+    )
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for n, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (n, obj)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % off for off in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
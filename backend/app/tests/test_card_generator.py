@@ -0,0 +1,31 @@
+import pytest
+
+from app.services import card_generator
+from benchmarks.bench_card_generator import legacy_generate_cards, make_corpus
+
+CASES = [
+    '',
+    'just some lowercase words without any definitions at all here today',
+    'Osmosis: movement of water across a membrane\nDiffusion - spreading of particles\nCell is the unit of life.',
+    'Well-known, famous across the field. Well - a source of water. Well, Well, Well - deep hole here.',
+    make_corpus(3, seed=1),
+    make_corpus(30, seed=2),
+]
+
+
+@pytest.mark.parametrize('text', CASES)
+def test_cards_match_reference_order_and_cap(text):
+    assert card_generator.generate_cards(text) == legacy_generate_cards(text)
+
+
+def test_prefix_terms_find_their_own_first_match():
+    norm = 'Well-known: widely recognised fact; Well - a source of water'
+    found = card_generator.first_appositives(norm, ['Well-known', 'Well'])
+    assert found == {'Well-known': 'widely recognised fact', 'Well': 'known: widely recognised fact'}
+
+
+def test_iter_cards_stops_at_limit():
+    text = '\n'.join(f'Term{i}: definition number {i}' for i in range(100))
+    cards = card_generator.iter_cards(text, limit=5)
+    assert next(cards) == {'question': 'Define: Term0', 'answer': 'definition number 0'}
+    assert len(list(cards)) == 4
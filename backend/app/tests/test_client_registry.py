@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from app.core import supabase_client
+from app.core.supabase_client import ClientProxy, get_admin_client, get_client, register_client, reset_clients
+from app.services import job_service
+from app.tests.fakes import FakeSupabase
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    reset_clients()
+    monkeypatch.setattr(supabase_client, '_create', lambda name: FakeSupabase())
+    yield
+    reset_clients()
+
+
+def test_services_resolve_the_client_on_use():
+    proxy = get_admin_client()
+    assert isinstance(proxy, ClientProxy)
+    # Building the proxy opens nothing; the first attribute access creates the client
+    assert supabase_client._clients == {}
+    proxy.table('notes')
+    assert 'admin' in supabase_client._clients
+    fake = FakeSupabase({'notes': [{'id': 'n1'}]})
+    register_client('admin', fake)
+    assert proxy.table('notes').select('id').execute().data == [{'id': 'n1'}]
+
+
+def test_forked_process_builds_its_own_clients(monkeypatch):
+    inherited = get_client('admin')
+    registered = FakeSupabase()
+    register_client('test', registered)
+    # Pretend this is a worker forked from the process that built `inherited`
+    monkeypatch.setattr(supabase_client, '_pid', os.getpid() + 1)
+    assert get_client('admin') is not inherited
+    assert get_client('test') is registered
+
+
+def test_job_service_is_rebuilt_after_fork(monkeypatch):
+    parent = job_service.get_job_service()
+    assert job_service.get_job_service() is parent
+    monkeypatch.setattr(job_service, '_job_service_pid', os.getpid() + 1)
+    child = job_service.get_job_service()
+    assert child is not parent
+    job_service.shutdown_job_service()
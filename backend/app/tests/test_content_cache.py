@@ -0,0 +1,51 @@
+import os
+from io import BytesIO
+
+import pytest
+
+from app.services import content_cache
+from app.services.flashcard_service import FlashcardService
+from app.tests.fakes import FakeSupabase
+from app.utils.cache import DiskLRUCache
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=300)
+    for i in range(3):
+        cache.set(f'k{i}', 'x' * 80)
+        # mtime resolution varies by filesystem; space the writes out explicitly
+        os.utime(cache._path(f'k{i}'), (i, i))
+    assert cache.get('k0') == 'x' * 80  # bumps k0 to most recent
+    cache.set('k3', 'y' * 80)
+    assert cache.get('k1') is None
+    assert cache.get('k0') == 'x' * 80
+    assert cache.get('k3') == 'y' * 80
+    assert cache.stats()['bytes'] <= 300
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1 << 20)
+    monkeypatch.setattr(content_cache, '_cache', cache)
+    return cache
+
+
+def test_repeat_deck_upload_skips_extraction(disk_cache):
+    db = FakeSupabase({
+        'classes': [{'id': 'cls1', 'name': 'Biology'}],
+        'class_members': [{'class_id': 'cls1', 'user_id': 'u1', 'role': 'member'}],
+    })
+    service = FlashcardService(admin=db)
+    calls = []
+
+    def extract(file):
+        calls.append(file)
+        return 'Mitochondria: the powerhouse of the cell.\nRibosome: site of protein synthesis.'
+
+    service.files.extract_text_from_pdf = extract
+    first = service.create_deck_from_pdfs([BytesIO(b'%PDF same bytes')], 'cls1', 'u1', True, 'A')
+    second = service.create_deck_from_pdfs([BytesIO(b'%PDF same bytes')], 'cls1', 'u1', True, 'B')
+    assert len(calls) == 1
+    cards = [r for r in db.rows('flashcards')]
+    assert {c['deck_id'] for c in cards} == {first['id'], second['id']}
+    assert len(cards) == 4
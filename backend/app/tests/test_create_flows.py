@@ -0,0 +1,45 @@
+from io import BytesIO
+
+import pytest
+
+from app.services import content_cache
+from app.services.flashcard_service import FlashcardService
+from app.services.membership_service import clear_membership_cache
+from app.tests.fakes import FakeSupabase
+from app.utils.cache import DiskLRUCache
+from app.utils.errors import NotFoundError, ValidationError
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_cache, '_cache', DiskLRUCache(str(tmp_path), max_bytes=0))
+    clear_membership_cache()
+    yield FakeSupabase({
+        'classes': [{'id': 'cls1', 'name': 'Biology'}],
+        'class_members': [{'class_id': 'cls1', 'user_id': 'u1', 'role': 'member'}],
+    })
+    clear_membership_cache()
+
+
+@pytest.fixture
+def service(db):
+    service = FlashcardService(admin=db)
+    service.files.extract_text_from_pdf = lambda f: 'Osmosis: water crossing a membrane\nDiffusion: particles spreading out'
+    return service
+
+
+def test_deck_session_and_cards_are_created_in_one_round_trip(db, service):
+    deck = service.create_deck_from_pdfs([BytesIO(b'%PDF')], 'cls1', 'u1', True, 'Cells')
+    assert db.calls == [('rpc', 'create_deck_with_cards')]
+    assert deck['card_count'] == 2 and deck['failed_cards'] == []
+    assert len(db.rows('sessions')) == 1 and len(db.rows('flashcards')) == 2
+
+
+@pytest.mark.parametrize('class_id, user_id, error', [
+    ('missing', 'u1', NotFoundError),
+    ('cls1', 'outsider', ValidationError),
+])
+def test_rejected_create_leaves_no_orphan_session(db, service, class_id, user_id, error):
+    with pytest.raises(error):
+        service.create_deck_from_pdfs([BytesIO(b'%PDF')], class_id, user_id, True, 'Cells')
+    assert db.rows('sessions') == [] and db.rows('flashcard_decks') == []
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from flask import Flask
+
+from app.core import security
+from app.core.config import Config
+from app.core.supabase_client import register_client, reset_clients
+from app.services import event_bus
+from app.services.event_bus import RESYNC, MemoryEventBus
+from app.services.vote_service import VoteService
+from app.tests.fakes import FakeSupabase
+
+
+class _User:
+    id = 'u1'
+
+
+@pytest.fixture
+def bus():
+    bus = MemoryEventBus(queue_size=3)
+    event_bus.set_event_bus(bus)
+    yield bus
+    event_bus.set_event_bus(None)
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase({
+        'sessions': [{'id': 's1', 'class_id': 'c1'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'notes': [{'id': 'n1', 'session_id': 's1', 'created_by': 'author', 'public': True, 'vote_count': 0},
+                  {'id': 'hidden', 'session_id': 's1', 'created_by': 'author', 'public': False, 'vote_count': 0}],
+    })
+
+
+@pytest.fixture
+def client(db, bus, monkeypatch):
+    register_client('admin', db)
+    from app.api import stream_routes
+    monkeypatch.setattr(stream_routes, 'vote_service', VoteService(db))
+    monkeypatch.setattr(security, 'authenticate_token', lambda token: _User() if token == 'good' else None)
+    monkeypatch.setattr(Config, 'STREAM_MAX_SECONDS', 0.2)
+    monkeypatch.setattr(Config, 'STREAM_HEARTBEAT_SECONDS', 0.05)
+    app = Flask(__name__)
+    app.register_blueprint(stream_routes.stream_bp, url_prefix='/api/stream')
+    yield app.test_client()
+    reset_clients()
+
+
+def _events(body: str):
+    events = []
+    for block in body.split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if line.startswith(('event', 'data')))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_bus_fans_out_and_flags_slow_readers(bus):
+    fast, slow = bus.subscribe('note:n1'), bus.subscribe('note:n1')
+    other = bus.subscribe('note:n2')
+    for i in range(4):
+        bus.publish('note:n1', {'type': 'votes', 'data': {'count': i}})
+        assert fast.get(timeout=0)['data'] == {'count': i}
+    # slow overflowed its queue of 3: the backlog is replaced by a resync marker
+    assert slow.get(timeout=0) == RESYNC and slow.get(timeout=0) is None
+    assert other.get(timeout=0) is None
+    for sub in (fast, slow, other):
+        sub.close()
+    assert bus.subscriber_count() == 0
+
+
+def test_stream_sends_snapshot_then_published_changes(client, db, bus):
+    res = client.get('/api/stream/notes/n1?access_token=good', buffered=False)
+    assert res.status_code == 200 and res.mimetype == 'text/event-stream'
+    VoteService(db).set_vote('n1', 'note', 'author', True)
+    events = _events(res.get_data(as_text=True))
+    assert events == [
+        ('snapshot', {'votes': {'count': 0, 'user_has_voted': False}}),
+        ('votes', {'count': 1}),
+    ]
+    # The subscription and the client slot are released once the stream ends
+    assert bus.subscriber_count() == 0
+
+
+def test_stream_rejects_hidden_targets_and_bad_tokens(client):
+    assert client.get('/api/stream/notes/hidden?access_token=good').status_code == 404
+    assert client.get('/api/stream/notes/n1').status_code == 401
+
+
+def test_access_log_leaves_out_query_strings():
+    import os
+    import runpy
+    conf = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py'))
+    # %(r)s and %(q)s would log ?access_token= from EventSource clients
+    assert '%(U)s' in conf['access_log_format']
+    assert '%(r)s' not in conf['access_log_format'] and '%(q)s' not in conf['access_log_format']
+
+
+def test_redis_listener_reconnects_and_resyncs_viewers(monkeypatch):
+    import threading
+    from types import SimpleNamespace
+
+    delivered = threading.Event()
+    message = {'channel': b'mm:events:note:n1', 'data': json.dumps({'type': 'votes', 'data': {'count': 1}})}
+
+    class PubSub:
+        def __init__(self, attempt):
+            self.attempt = attempt
+
+        def psubscribe(self, pattern):
+            if self.attempt == 0:
+                raise ConnectionError('Redis went away')
+
+        def listen(self):
+            yield message
+            delivered.set()
+            threading.Event().wait()  # stay connected
+
+    attempts = []
+
+    def pubsub(**kwargs):
+        attempts.append(True)
+        return PubSub(len(attempts) - 1)
+
+    fake = SimpleNamespace(Redis=SimpleNamespace(from_url=lambda url: SimpleNamespace(pubsub=pubsub)))
+    monkeypatch.setattr(event_bus, 'redis', fake)
+    monkeypatch.setattr(event_bus, 'RECONNECT_DELAY', 0.01)
+    bus = event_bus.RedisEventBus('redis://test')
+    sub = bus.subscribe('note:n1')
+    assert delivered.wait(2)
+    # The first subscribe failed: the retry told the viewer to refetch, then carried on
+    assert len(attempts) == 2
+    assert sub.get(1) == RESYNC and sub.get(1) == {'type': 'votes', 'data': {'count': 1}}
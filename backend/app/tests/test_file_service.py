@@ -0,0 +1,55 @@
+from io import BytesIO
+
+import pytest
+
+from app.core.config import Config
+from app.services import file_service
+from app.services.file_service import FileService
+from app.tests.fakes import make_pdf
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(Config, 'PDF_EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(Config, 'PDF_PARALLEL_MIN_PAGES', 4)
+    monkeypatch.setattr(Config, 'PDF_PAGES_PER_TASK', 3)
+    yield
+    file_service.shutdown_extract_pool()
+
+
+def test_parallel_extraction_matches_serial(parallel, monkeypatch):
+    raw = make_pdf(11, lines_per_page=3)
+    text = FileService().extract_text_from_pdf(BytesIO(raw))
+    monkeypatch.setattr(Config, 'PDF_EXTRACT_WORKERS', 0)
+    assert FileService().extract_text_from_pdf(BytesIO(raw)) == text
+
+
+def test_pages_stream_in_order(parallel):
+    pages = list(FileService().iter_pdf_pages(BytesIO(make_pdf(10, lines_per_page=2))))
+    assert [p.splitlines()[0] for p in pages] == [f'Page {n}' for n in range(1, 11)]
+
+
+def test_failed_range_is_redone_in_process(parallel, monkeypatch):
+    class FailingPool:
+        def submit(self, fn, *args):
+            raise_on = args[2] == 3
+
+            class Future:
+                def result(self):
+                    if raise_on:
+                        raise RuntimeError('worker died')
+                    return fn(*args)
+
+                def cancel(self):
+                    pass
+            return Future()
+
+    monkeypatch.setattr(file_service, '_get_pool', lambda: FailingPool())
+    pages = list(FileService().iter_pdf_pages(BytesIO(make_pdf(8, lines_per_page=2))))
+    assert [p.splitlines()[0] for p in pages] == [f'Page {n}' for n in range(1, 9)]
+
+
+def test_single_worker_extracts_without_a_pool(parallel, monkeypatch):
+    monkeypatch.setattr(Config, 'PDF_EXTRACT_WORKERS', 1)
+    text = FileService().extract_text_from_pdf(BytesIO(make_pdf(11, lines_per_page=3)))
+    assert 'Page 11' in text and file_service._pool is None
@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.flashcard_service import FlashcardService
+from app.services.membership_service import clear_membership_cache
+from app.tests.fakes import FakeSupabase
+from app.utils.errors import ValidationError
+
+
+@pytest.fixture
+def db():
+    clear_membership_cache()
+    yield FakeSupabase({
+        'classes': [{'id': 'cls1', 'name': 'Biology'}],
+        'class_members': [{'class_id': 'cls1', 'user_id': 'u1', 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': 'cls1'}],
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'cls1', 'created_by': 'u1'}],
+        'notes': [{'id': 'n1', 'session_id': 's1', 'created_by': 'u2', 'public': True,
+                   'content': '\n'.join(f'Term{i}: meaning number {i}' for i in range(30))}],
+    })
+    clear_membership_cache()
+
+
+def _inserts(db):
+    return [c for c in db.calls if c == ('flashcards', 'insert')]
+
+
+def test_cards_are_inserted_in_batches(db):
+    cards = [{'question': f'Q{i}', 'answer': f'A{i}'} for i in range(25)]
+    result = FlashcardService(admin=db).insert_cards('d1', cards, 'u1', batch_size=10)
+    assert len(result['cards']) == 25 and result['failed'] == []
+    assert len(_inserts(db)) == 3
+
+
+def test_failed_rows_are_isolated_and_reported(db, monkeypatch):
+    service = FlashcardService(admin=db)
+    real_table = db.table
+
+    def table(name):
+        query = real_table(name)
+        execute = query.execute
+
+        def checked():
+            if query.op == 'insert' and any(r['question'] == 'bad' for r in query.payload):
+                raise Exception('value too long')
+            return execute()
+        query.execute = checked
+        return query
+
+    monkeypatch.setattr(db, 'table', table)
+    cards = [{'question': f'Q{i}', 'answer': 'A'} for i in range(7)]
+    cards[4] = {'question': 'bad', 'answer': 'A'}
+    cards.append({'question': '', 'answer': 'A'})
+    result = service.insert_cards('d1', cards, 'u1', batch_size=8)
+    assert [c['question'] for c in result['cards']] == ['Q0', 'Q1', 'Q2', 'Q3', 'Q5', 'Q6']
+    assert [(f['index'], f['error']) for f in result['failed']] == [
+        (4, 'value too long'), (7, 'question and answer are required')
+    ]
+
+
+def test_create_card_requires_deck_owner(db):
+    service = FlashcardService(admin=db)
+    assert service.create_card('d1', 'Q', 'A', 'u1')['question'] == 'Q'
+    with pytest.raises(ValueError):
+        service.create_card('d1', 'Q', 'A', 'u2')
+
+
+def test_create_card_without_a_returned_row_is_an_error(db, monkeypatch):
+    service = FlashcardService(admin=db)
+    monkeypatch.setattr(service, 'insert_cards', lambda *a, **k: {'cards': [], 'failed': []})
+    with pytest.raises(ValidationError):
+        service.create_card('d1', 'Q', 'A', 'u1')
+
+
+def test_generate_flashcards_from_note_uses_one_insert(db):
+    result = FlashcardService(admin=db).generate_flashcards('d1', 'n1', 20, 'u1')
+    assert len(result['cards']) == 20
+    assert result['cards'][0]['question'] == 'Define: Term0'
+    assert len(_inserts(db)) == 1
@@ -0,0 +1,88 @@
+import pytest
+from flask import Flask
+
+from app.services import hydration
+from app.services.membership_service import clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+
+
+@pytest.fixture
+def db():
+    users = [{'id': f'u{i}', 'first_name': f'First{i}', 'last_name': f'Last{i}'} for i in range(20)]
+    comments = [
+        {'id': f'c{i}', 'note_id': 'n1', 'user_id': f'u{i % 20}', 'content': 'hi', 'created_at': f'2025-01-01T00:00:{i:02d}', 'parent_id': None}
+        for i in range(50)
+    ]
+    return FakeSupabase({
+        'users': users,
+        'classes': [{'id': 'cls1', 'name': 'Biology'}],
+        'sessions': [{'id': 's1', 'class_id': 'cls1'}],
+        'notes': [{'id': 'n1', 'session_id': 's1', 'created_by': 'u1', 'content': 'x'}],
+        'note_comments': comments,
+    })
+
+
+@pytest.fixture(autouse=True)
+def no_shared_cache():
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+    yield
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+
+
+def _queries(db, table):
+    return [c for c in db.calls if c[0] == table]
+
+
+def test_list_comments_users_queries_do_not_grow_with_comments(db):
+    service = NoteService(admin=db)
+    with Flask(__name__).test_request_context():
+        comments, _ = service.list_comments('n1', 'u1', limit=50)
+    assert len(comments) == 50
+    assert comments[3]['author'] == {'first_name': 'First3', 'last_name': 'Last3'}
+    # One lookup for the note's author, one for every commenter that is not already loaded
+    assert len(_queries(db, 'users')) == 2
+
+
+def test_repeated_detail_lookups_are_memoized_per_request(db):
+    service = NoteService(admin=db)
+    with Flask(__name__).test_request_context():
+        note = service.get_note_detail('n1', 'u1')
+        service.get_note_detail('n1', 'u1')
+    assert note['author']['first_name'] == 'First1'
+    assert note['cls'] == {'id': 'cls1', 'name': 'Biology'}
+    for table in ('users', 'sessions', 'classes'):
+        assert len(_queries(db, table)) == 1
+
+
+def test_shared_cache_spans_requests(db):
+    service = NoteService(admin=db)
+    app = Flask(__name__)
+    with app.test_request_context():
+        service.get_note_detail('n1', 'u1')
+    db.reset_calls()
+    with app.test_request_context():
+        service.get_note_detail('n1', 'u1')
+    assert _queries(db, 'users') == []
+    assert _queries(db, 'classes') == []
+    assert len(_queries(db, 'sessions')) == 1
+
+
+def test_membership_set_is_invalidated_on_join(db):
+    from app.services.class_service import ClassService
+    from app.services.flashcard_service import FlashcardService
+
+    db.tables['flashcard_decks'] = [{'id': 'd1', 'class_id': 'cls1', 'created_by': 'u1', 'public': True, 'created_at': '2025-01-01T00:00:00'}]
+    decks = FlashcardService(admin=db)
+    app = Flask(__name__)
+    with app.test_request_context():
+        assert decks.list_public_decks_by_user('u1', 'u2') == ([], None)
+    with app.test_request_context():
+        ClassService(admin=db).join_class_by_id('cls1', 'u2')
+    with app.test_request_context():
+        decks_page, _ = decks.list_public_decks_by_user('u1', 'u2')
+        assert [d['id'] for d in decks_page] == ['d1']
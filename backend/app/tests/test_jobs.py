@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from app.services.job_service import JobService, MemoryJobStore, SQLiteJobStore, public_job
+from app.utils.errors import NotFoundError, ValidationError
+
+
+def _wait(service, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = service.get(job_id)
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteJobStore(str(tmp_path / 'jobs.sqlite3'))
+    return MemoryJobStore()
+
+
+def test_job_reports_progress_and_result(store):
+    def work(x, progress=None):
+        progress('halfway', 0.5)
+        return {'value': x * 2}
+
+    service = JobService(store=store, workers=1, max_pending=4)
+    job = service.submit('test', 'u1', work, 21)
+    assert public_job(job)['status_url'] == f"/api/jobs/{job['id']}"
+    done = _wait(service, job['id'])
+    assert done['status'] == 'succeeded'
+    assert done['progress'] == 1.0
+    assert done['result'] == {'value': 42}
+
+
+def test_job_failure_keeps_status_code(store):
+    def work(progress=None):
+        raise NotFoundError('Class not found')
+
+    service = JobService(store=store, workers=1, max_pending=4)
+    done = _wait(service, service.submit('test', 'u1', work)['id'])
+    assert done['status'] == 'failed'
+    assert done['error'] == 'Class not found'
+    assert done['status_code'] == 404
+
+
+def test_submit_rejects_when_queue_is_full():
+    release = []
+
+    def block(progress=None):
+        while not release:
+            time.sleep(0.01)
+
+    service = JobService(store=MemoryJobStore(), workers=1, max_pending=1)
+    job = service.submit('test', 'u1', block)
+    with pytest.raises(ValidationError) as exc:
+        service.submit('test', 'u1', block)
+    assert exc.value.status_code == 503
+    release.append(True)
+    _wait(service, job['id'])
+
+
+@pytest.mark.parametrize('workers, store', [('3', 'sqlite'), ('1', None)])
+def test_gunicorn_shares_jobs_between_workers(monkeypatch, workers, store):
+    import os
+    import runpy
+    monkeypatch.setenv('WEB_CONCURRENCY', workers)
+    # Set first so the teardown puts back whatever the config file writes
+    monkeypatch.setenv('JOB_STORE', '')
+    monkeypatch.delenv('JOB_STORE')
+    runpy.run_path(os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py'))
+    # A poll may reach any worker, not just the one that accepted the upload
+    assert os.environ.get('JOB_STORE') == store
@@ -0,0 +1,66 @@
+import pytest
+from flask import Flask
+
+from app.services.class_service import ClassService
+from app.services.membership_service import MembershipService, clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+from app.utils.errors import UnauthorizedError
+
+
+@pytest.fixture
+def db():
+    clear_membership_cache()
+    yield FakeSupabase({
+        'classes': [{'id': 'c1', 'name': 'Chem'}, {'id': 'c2', 'name': 'Bio'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'ta'}],
+        'sessions': [],
+        'notes': [],
+    })
+    clear_membership_cache()
+
+
+def _member_queries(db):
+    return sum(1 for table, _ in db.calls if table == 'class_members')
+
+
+app = Flask(__name__)
+
+
+def test_role_lookups_are_cached_for_the_request(db):
+    members = MembershipService(db)
+    with app.test_request_context():
+        assert members.role('u1', 'c1') == 'ta'
+        assert members.role('u1', 'c1') == 'ta'
+        assert members.role('u1', 'c2') is None
+        assert members.role('u1', 'c2') is None
+    assert _member_queries(db) == 2
+
+    # The next request, maybe on another worker, sees a join made elsewhere
+    db.rows('class_members').append({'user_id': 'u1', 'class_id': 'c2', 'role': 'member'})
+    with app.test_request_context():
+        assert members.role('u1', 'c2') == 'member'
+    db.tables['class_members'] = [m for m in db.rows('class_members') if m['class_id'] != 'c1']
+    with app.test_request_context():
+        assert members.role('u1', 'c1') is None
+
+
+def test_classes_for_answers_pair_lookups(db):
+    members = MembershipService(db)
+    with app.test_request_context():
+        assert members.classes_for('u1') == {'c1': 'ta'}
+        assert members.is_member('u1', 'c1')
+        assert not members.is_member('u1', 'c2')
+    assert _member_queries(db) == 1
+
+
+def test_guards_see_join_and_leave_immediately(db):
+    notes = NoteService(admin=db)
+    classes = ClassService(admin=db)
+    with pytest.raises(UnauthorizedError):
+        notes.list_public_notes_for_class('c2', 'u1')
+    classes.join_class_by_id('c2', 'u1')
+    assert notes.list_public_notes_for_class('c2', 'u1') == ([], None)
+    classes.leave_class('c2', 'u1')
+    with pytest.raises(UnauthorizedError):
+        notes.list_public_notes_for_class('c2', 'u1')
@@ -0,0 +1,77 @@
+import json
+import logging
+
+import httpx
+import pytest
+from flask import Flask
+
+from app.api.metrics_routes import metrics_bp
+from app.core import metrics
+from app.core.config import Config
+from app.tests.fakes import FakeSupabase
+
+
+@pytest.fixture
+def app():
+    metrics.reset()
+    db = FakeSupabase({'notes': [{'id': f'n{i}', 'created_by': 'u1'} for i in range(3)], 'users': [{'id': 'u1'}]})
+    app = Flask(__name__)
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    metrics.init_app(app)
+
+    @app.route('/notes/<note_id>')
+    def notes(note_id):
+        rows = db.table('notes').select('id, created_by').execute().data
+        for row in rows:  # deliberately one lookup per row
+            db.table('users').select('id').eq('id', row['created_by']).execute()
+        return {'notes': rows}
+
+    yield app
+    metrics.reset()
+
+
+def test_describe_maps_requests_to_table_and_operation():
+    assert metrics.describe('GET', '/rest/v1/notes') == ('notes', 'select')
+    assert metrics.describe('POST', '/rest/v1/note_votes', 'resolution=merge-duplicates') == ('note_votes', 'upsert')
+    assert metrics.describe('POST', '/rest/v1/rpc/set_vote') == ('rpc', 'set_vote')
+    assert metrics.describe('POST', '/storage/v1/object/notes-pdfs/sha256/x.pdf') == ('storage', 'upload')
+    assert metrics.describe('GET', '/storage/v1/bucket') == ('storage', 'list_buckets')
+
+
+def test_httpx_hooks_record_calls_against_the_request():
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, json=[]))
+    client = httpx.Client(base_url='http://supabase.local/rest/v1', transport=transport,
+                          event_hooks=metrics.httpx_event_hooks())
+    with Flask(__name__).test_request_context():
+        client.get('/notes', params={'select': 'id'})
+        client.patch('/notes', json={'title': 'x'})
+        assert [c[:2] for c in metrics.request_calls()] == [('notes', 'select'), ('notes', 'update')]
+
+
+def test_requests_get_server_timing_logs_and_histograms(app, caplog, monkeypatch):
+    monkeypatch.setattr(Config, 'REQUEST_LOG_REPEAT_WARN', 3)
+    client = app.test_client()
+    with caplog.at_level(logging.INFO, logger='mountainmerge.request'):
+        res = client.get('/notes/n1')
+    timing = res.headers.getlist('Server-Timing')
+    assert timing[0].startswith('db;dur=') and timing[0].endswith('desc="4 calls"')
+    assert timing[1].startswith('app;dur=')
+    line = json.loads(caplog.records[-1].getMessage())
+    assert caplog.records[-1].levelno == logging.WARNING
+    assert line['route'] == '/notes/<note_id>' and line['repeated'] == {'users.select': 3}
+
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape')
+    body = client.get('/api/metrics', headers={'Authorization': 'Bearer scrape'}).get_data(as_text=True)
+    assert 'http_request_supabase_calls_bucket{method="GET",route="/notes/<note_id>",le="3"} 0' in body
+    assert 'http_request_supabase_calls_bucket{method="GET",route="/notes/<note_id>",le="5"} 1' in body
+    assert 'supabase_call_duration_seconds_count{target="users",op="select"} 3' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/notes/<note_id>",status="200"} 1' in body
+
+
+def test_metrics_need_a_token(app, monkeypatch):
+    client = app.test_client()
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', '')
+    assert client.get('/api/metrics').status_code == 404
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape')
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer scrape'}).status_code == 200
@@ -0,0 +1,82 @@
+import random
+import time
+from io import BytesIO
+
+import pytest
+
+from app.services import content_cache, minhash
+from app.services.membership_service import clear_membership_cache
+from app.services.note_pdf_sweep import sweep
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+from app.utils.cache import DiskLRUCache
+
+rng = random.Random(3)
+VOCAB = [f'term{i}' for i in range(3000)]
+LECTURE = ' '.join(rng.choice(VOCAB) for _ in range(600))
+# The same lecture with a few words changed, and an unrelated one
+RETYPED = ' '.join(w if n % 60 else 'changed' for n, w in enumerate(LECTURE.split()))
+OTHER = ' '.join(rng.choice(VOCAB) for _ in range(600))
+
+
+def test_signatures_estimate_similarity_and_bucket_near_duplicates():
+    a, b, c = minhash.signature(LECTURE), minhash.signature(RETYPED), minhash.signature(OTHER)
+    assert minhash.similarity(a, b) > 0.8 and minhash.similarity(a, c) < 0.1
+    assert set(minhash.buckets(a)) & set(minhash.buckets(b))
+    assert not set(minhash.buckets(a)) & set(minhash.buckets(c))
+    assert minhash.signature('') is None
+    assert len(minhash.signature('too short')) == minhash.SIGNATURE_SIZE
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_cache, '_cache', DiskLRUCache(str(tmp_path), max_bytes=0))
+    clear_membership_cache()
+    yield FakeSupabase({
+        'classes': [{'id': 'cls1', 'name': 'Biology'}],
+        'class_members': [{'class_id': 'cls1', 'user_id': u, 'role': 'member'} for u in ('u1', 'u2', 'u3')],
+    })
+    clear_membership_cache()
+
+
+def _upload(db, user_id, text, public=True):
+    service = NoteService(admin=db)
+    service.files.extract_text_from_pdf = lambda f: text
+    return service.create_note_from_pdf(BytesIO(text.encode()), 'cls1', user_id, public)
+
+
+def test_near_duplicate_uploads_are_linked_and_collapsed_in_the_feed(db):
+    first = _upload(db, 'u1', LECTURE)
+    copy = _upload(db, 'u2', RETYPED)
+    other = _upload(db, 'u3', OTHER)
+    assert first['duplicate_of'] is None and other['duplicate_of'] is None
+    assert copy['duplicate_of'] == first['id']
+    # One extra call per upload, however many notes the class holds
+    assert db.calls.count(('rpc', 'index_note_fingerprint')) == 3
+
+    service = NoteService(admin=db)
+    feed, _ = service.list_public_notes_for_class('cls1', 'u1')
+    assert {n['id'] for n in feed} == {first['id'], other['id']}
+    assert next(n for n in feed if n['id'] == first['id'])['duplicate_count'] == 1
+    full, _ = service.list_public_notes_for_class('cls1', 'u1', collapse=False)
+    assert len(full) == 3
+
+
+def test_shared_pdfs_outlive_their_notes_until_swept(db):
+    first = _upload(db, 'u1', LECTURE)
+    copy = _upload(db, 'u2', LECTURE)
+    objects = db.storage.buckets['notes-pdfs']['objects']
+    assert first['pdf_url'] == copy['pdf_url'] and len(objects) == 1
+    assert db.calls.count(('storage', 'upload')) == 2
+
+    service = NoteService(admin=db)
+    service.delete_note(first['id'], 'u1')
+    service.delete_note(copy['id'], 'u2')
+    # Still inside the grace period, e.g. while a third upload of the file is in flight
+    assert sweep(admin=db, grace_hours=1) == {'removed': 0} and len(objects) == 1
+    again = _upload(db, 'u3', LECTURE)
+    assert sweep(admin=db, grace_hours=1, now=time.time() + 7200) == {'removed': 0}
+
+    service.delete_note(again['id'], 'u3')
+    assert sweep(admin=db, grace_hours=1, now=time.time() + 7200) == {'removed': 1}
+    assert objects == {}
@@ -0,0 +1,73 @@
+import pytest
+from flask import Flask
+
+from app.services import hydration
+from app.services.class_service import ClassService
+from app.services.membership_service import clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+from app.utils.errors import ValidationError
+from app.utils.pagination import decode_cursor, encode_cursor, page_args
+
+
+@pytest.fixture
+def db():
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+    sessions = [{'id': 's1', 'class_id': 'c1'}, {'id': 's2', 'class_id': 'c2'}]
+    # Three notes share every timestamp so pages must break ties on id
+    notes = [
+        {'id': f'n{i:02d}', 'session_id': 's1' if i % 5 else 's2', 'created_by': 'u1', 'public': i % 4 != 0,
+         'content': 'x', 'created_at': f'2025-01-01T00:00:{i // 3:02d}'}
+        for i in range(30)
+    ]
+    return FakeSupabase({
+        'users': [{'id': 'u1', 'first_name': 'Ada', 'last_name': 'Lovelace'}],
+        'classes': [{'id': f'c{i}', 'name': f'Class {i % 3}'} for i in range(1, 8)],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'sessions': sessions,
+        'notes': notes,
+    })
+
+
+def _all_pages(fetch, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch(limit, cursor and decode_cursor(cursor))
+        seen.extend(rows)
+        pages += 1
+        if cursor is None:
+            return seen, pages
+
+
+def test_pages_chain_without_gaps_or_duplicates(db):
+    service = NoteService(admin=db)
+    with Flask(__name__).test_request_context():
+        notes, pages = _all_pages(lambda limit, cursor: service.list_notes_for_user('u1', limit, cursor), 4)
+    ids = [n['id'] for n in notes]
+    assert pages == 8
+    assert ids == [f'n{i:02d}' for i in reversed(range(30))]
+
+
+def test_class_notes_filter_public_and_class_in_the_query(db):
+    service = NoteService(admin=db)
+    with Flask(__name__).test_request_context():
+        notes, _ = _all_pages(lambda limit, cursor: service.list_public_notes_for_class('c1', 'u1', limit, cursor), 3)
+    expected = [f'n{i:02d}' for i in reversed(range(30)) if i % 5 and i % 4]
+    assert [n['id'] for n in notes] == expected
+    assert all(n['cls'] == {'id': 'c1', 'name': 'Class 1'} and 'sessions' not in n for n in notes)
+
+
+def test_catalog_pages_by_name(db):
+    classes, _ = _all_pages(lambda limit, cursor: ClassService(admin=db).list_all_classes(limit, cursor), 2)
+    assert [(c['name'], c['id']) for c in classes] == sorted((c['name'], c['id']) for c in db.tables['classes'])
+
+
+def test_page_args_validation():
+    assert page_args({}) == (20, None)
+    cursor = encode_cursor({'created_at': '2025-01-01T00:00:00+00:00', 'id': 'n1'})
+    assert page_args({'limit': '5', 'cursor': cursor}) == (5, ('2025-01-01T00:00:00+00:00', 'n1'))
+    for args in ({'limit': '0'}, {'limit': '101'}, {'limit': 'ten'}, {'cursor': 'not-a-cursor'}):
+        with pytest.raises(ValidationError):
+            page_args(args)
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+
+from app.services import hydration
+from app.services.flashcard_service import FlashcardService
+from app.services.membership_service import clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+from app.utils.errors import ValidationError
+from app.utils.projection import select_columns
+
+
+@pytest.fixture
+def db():
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+    return FakeSupabase({
+        'users': [{'id': 'u1', 'first_name': 'Ada', 'last_name': 'Lovelace'}],
+        'classes': [{'id': 'c1', 'name': 'Biology'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': 'c1'}],
+        'notes': [{
+            'id': 'n1', 'session_id': 's1', 'created_by': 'u1', 'public': True, 'title': 'Cells',
+            'type': 'summary', 'pdf_url': None, 'created_at': '2025-01-01T00:00:00',
+            'content': '## Summary\n\n**Mitochondria** make ATP.\n\n' + 'Filler sentence. ' * 5000,
+        }],
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'c1', 'created_by': 'u1', 'public': True,
+                             'title': 'Cells', 'created_at': '2025-01-01T00:00:00'}],
+    })
+
+
+def test_select_columns():
+    assert select_columns('flashcard_decks') == 'id, created_at, created_by, class_id, title, public, vote_count'
+    assert select_columns('notes', 'full') == '*, content_preview'
+    assert select_columns('notes', 'summary,content').endswith('content_preview, content')
+    with pytest.raises(ValidationError):
+        select_columns('notes', 'summary,password')
+
+
+def test_class_feed_ships_a_preview_not_the_content(db):
+    service = NoteService(admin=db)
+    with Flask(__name__).test_request_context():
+        notes, _ = service.list_public_notes_for_class('c1', 'u1')
+        full, _ = service.list_public_notes_for_class('c1', 'u1', fields='full')
+    assert 'content' not in notes[0]
+    assert notes[0]['content_preview'].startswith('Summary Mitochondria make ATP. Filler')
+    assert len(notes[0]['content_preview']) <= 200
+    assert notes[0]['title'] == 'Cells' and notes[0]['cls']['name'] == 'Biology'
+    assert full[0]['content'] == db.tables['notes'][0]['content']
+
+
+def test_deck_lists_use_the_summary_set(db):
+    with Flask(__name__).test_request_context():
+        decks, _ = FlashcardService(admin=db).list_class_decks('c1', 'u1')
+    assert set(decks[0]) == {'id', 'created_at', 'created_by', 'class_id', 'title', 'public', 'vote_count', 'author'}
@@ -0,0 +1,22 @@
+import time
+
+from benchmarks import bench_endpoints
+from app.tests.fakes import FakeSupabase
+
+
+def test_every_endpoint_stays_within_its_round_trip_budget():
+    results = bench_endpoints.run_suite(runs=1)
+    assert {r['name'] for r in results} == set(bench_endpoints.BUDGETS)
+    assert bench_endpoints.failures(results) == []
+
+
+def test_fake_counts_and_delays_every_round_trip():
+    db = FakeSupabase({'notes': [{'id': 'n1', 'title': 'a'}]}, latency=0.01)
+    db.storage.create_bucket('notes-pdfs', options={'public': True})
+    start = time.perf_counter()
+    db.table('notes').upsert({'id': 'n1', 'title': 'b'}).execute()
+    db.storage.from_('notes-pdfs').upload('a.pdf', b'%PDF', file_options={'upsert': 'true'})
+    assert time.perf_counter() - start >= 0.02
+    assert db.calls == [('storage', 'create_bucket'), ('notes', 'upsert'), ('storage', 'upload')]
+    assert db.rows('notes') == [{'id': 'n1', 'title': 'b'}]
+    assert db.storage.from_('notes-pdfs').download('a.pdf') == b'%PDF'
@@ -0,0 +1,69 @@
+import pytest
+
+from app.services.membership_service import clear_membership_cache
+from app.services.search_service import SearchService
+from app.tests.fakes import FakeSupabase
+from app.utils.errors import UnauthorizedError, ValidationError
+from app.utils.pagination import decode_cursor
+
+
+@pytest.fixture
+def db():
+    clear_membership_cache()
+    return FakeSupabase({
+        'classes': [{'id': 'c1'}, {'id': 'c2'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': 'c1', 'title': 'Week 3'}, {'id': 's2', 'class_id': 'c2', 'title': 'Other'}],
+        'notes': [
+            {'id': 'n1', 'session_id': 's1', 'title': 'Photosynthesis', 'content': 'Light reactions in the chloroplast.',
+             'public': True, 'created_by': 'u2'},
+            {'id': 'n2', 'session_id': 's1', 'title': 'Cell respiration', 'content': 'Unlike photosynthesis, this uses oxygen.',
+             'public': True, 'created_by': 'u2'},
+            {'id': 'n3', 'session_id': 's1', 'title': 'Draft', 'content': 'photosynthesis notes', 'public': False,
+             'created_by': 'u2'},
+            {'id': 'n4', 'session_id': 's1', 'title': 'Mine', 'content': 'photosynthesis summary', 'public': False,
+             'created_by': 'u1'},
+            {'id': 'n5', 'session_id': 's2', 'title': 'Photosynthesis', 'content': 'another class', 'public': True,
+             'created_by': 'u2'},
+        ],
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'c1', 'title': 'Plant biology', 'public': True, 'created_by': 'u2'}],
+        'flashcards': [{'id': 'k1', 'deck_id': 'd1', 'question': 'Where does photosynthesis happen?',
+                        'answer': 'In chloroplasts'}],
+    })
+
+
+def test_search_ranks_visible_matches_in_one_call(db):
+    results, cursor = SearchService(admin=db).search('c1', 'u1', 'photosynthesis')
+    assert db.calls == [('class_members', 'select'), ('rpc', 'search_class')]
+    # Title and question matches outrank body matches; private notes of others and other classes never show
+    assert {(r['kind'], r['id']) for r in results[:2]} == {('note', 'n1'), ('card', 'k1')}
+    assert {r['id'] for r in results} == {'n1', 'k1', 'n2', 'n4'}
+    assert cursor is None
+    assert '<mark>photosynthesis' in next(r['snippet'] for r in results if r['id'] == 'n2')
+    assert next(r for r in results if r['id'] == 'k1')['deck_id'] == 'd1'
+
+    only = SearchService(admin=db).search('c1', 'u1', 'photosynthesis -oxygen')[0]
+    assert 'n2' not in {r['id'] for r in only}
+
+
+def test_search_pages_and_follows_edits(db):
+    svc = SearchService(admin=db)
+    first, cursor = svc.search('c1', 'u1', 'photosynthesis', limit=3)
+    rest, end = svc.search('c1', 'u1', 'photosynthesis', limit=3, cursor=decode_cursor(cursor))
+    assert len(first) == 3 and end is None
+    assert {r['id'] for r in first + rest} == {'n1', 'k1', 'n2', 'n4'}
+
+    db.rows('notes')[1]['content'] = 'Glycolysis and the Krebs cycle'
+    db.rows('flashcard_decks')[0]['title'] = 'Krebs cycle drills'
+    assert {r['id'] for r in svc.search('c1', 'u1', 'krebs cycle')[0]} == {'n2', 'd1'}
+    assert 'n2' not in {r['id'] for r in svc.search('c1', 'u1', 'photosynthesis')[0]}
+
+
+def test_search_requires_membership_and_a_query(db):
+    svc = SearchService(admin=db)
+    with pytest.raises(UnauthorizedError):
+        svc.search('c2', 'u1', 'photosynthesis')
+    with pytest.raises(ValidationError):
+        svc.search('c1', 'u1', '   ')
+    with pytest.raises(ValidationError):
+        svc.search('c1', 'u1', 'x', cursor=('not-a-rank', 'n1'))
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from flask import Flask, request
+
+from app.core import security
+from app.core.config import Config
+from app.utils.errors import UnauthorizedError
+
+SECRET = 'test-jwt-secret'
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def make_token(sub='user-1', exp_in=3600, aud='authenticated', secret=SECRET):
+    header = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = _b64(json.dumps({'sub': sub, 'aud': aud, 'exp': int(time.time()) + exp_in, 'email': 'a@b.c'}).encode())
+    sig = hmac.new(secret.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+    return f'{header}.{payload}.{_b64(sig)}'
+
+
+@pytest.fixture(autouse=True)
+def local_auth(monkeypatch):
+    monkeypatch.setattr(Config, 'SUPABASE_JWT_SECRET', SECRET)
+    monkeypatch.setattr(Config, 'AUTH_VERIFY_MODE', 'local')
+
+    def no_remote(token):
+        raise AssertionError('remote verification should not be called')
+
+    monkeypatch.setattr(security, '_verify_remotely', no_remote)
+    security._token_cache.clear()
+
+
+def test_local_verification_and_cache():
+    token = make_token()
+    user = security.authenticate_token(token)
+    assert user.id == 'user-1'
+    assert user.email == 'a@b.c'
+    assert security.authenticate_token(token) is user
+    stats = security.auth_cache_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+@pytest.mark.parametrize('token', [
+    make_token(exp_in=-10),
+    make_token(aud='anon'),
+    make_token(secret='wrong-secret'),
+    make_token(sub=''),
+    'not-a-jwt',
+])
+def test_rejects_invalid_tokens(token):
+    with pytest.raises(UnauthorizedError):
+        security.authenticate_token(token)
+
+
+def test_require_auth_sets_current_user():
+    app = Flask(__name__)
+
+    @app.route('/me')
+    @security.require_auth
+    def me():
+        return {'id': request.current_user.id}
+
+    client = app.test_client()
+    res = client.get('/me', headers={'Authorization': f'Bearer {make_token(sub="abc")}'})
+    assert res.status_code == 200
+    assert res.get_json() == {'id': 'abc'}
+    assert client.get('/me').status_code == 401
+    assert client.get('/me', headers={'Authorization': 'Bearer nope'}).status_code == 401
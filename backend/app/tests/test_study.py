@@ -0,0 +1,217 @@
+import pytest
+
+from app.services import study_service as study_module
+from app.services.membership_service import clear_membership_cache
+from app.services.scheduler import DAY, RELEARN_SECONDS, Schedule, next_state
+from app.services.study_compaction import compact
+from app.services.study_service import StudyService, to_iso
+from app.tests.fakes import FakeSupabase
+from app.utils.cache import TTLCache
+from app.utils.errors import UnauthorizedError, ValidationError
+
+NOW = 1_750_000_000
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    study_module.clear_schedule_cache()
+    clear_membership_cache()
+    yield
+    study_module.clear_schedule_cache()
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase({
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'c1', 'created_by': 'author', 'public': True}],
+        'flashcards': [{'id': f'k{i}', 'deck_id': 'd1', 'question': f'Q{i}', 'answer': f'A{i}',
+                        'created_at': f'2025-01-01T00:00:{i:02d}+00:00'} for i in range(5)],
+    })
+
+
+def test_sm2_intervals_grow_and_lapses_reset():
+    ease, interval, reps, lapses, due = next_state(2.5, 0, 0, 0, 'good', NOW)
+    assert (interval, reps, due) == (1.0, 1, NOW + DAY)
+    ease, interval, reps, lapses, due = next_state(ease, interval, reps, lapses, 'good', due)
+    assert interval == 6.0
+    ease, interval, reps, lapses, due = next_state(ease, interval, reps, lapses, 'good', due)
+    assert interval == pytest.approx(6.0 * ease)
+    ease, interval, reps, lapses, due = next_state(ease, interval, reps, lapses, 'again', NOW)
+    assert (interval, reps, lapses, due) == (0.0, 0, 1, NOW + RELEARN_SECONDS)
+    assert ease < 2.5
+
+
+def test_queue_serves_new_cards_in_order_then_by_due_time():
+    s = Schedule(['a', 'b', 'c'])
+    assert s.due_cards(NOW, 10) == (['a', 'b', 'c'], None)
+    s.review('a', 'again', NOW)
+    s.review('b', 'good', NOW)
+    assert s.due_cards(NOW, 10) == (['c'], NOW + RELEARN_SECONDS)
+    assert s.due_cards(NOW + 2 * DAY, 10) == (['c', 'a', 'b'], None)
+    assert s.next_due() == ('c', 0)
+    # Superseded heap keys are dropped, and the heap is rebuilt once they pile up
+    for n in range(200):
+        s.review('c', 'good', NOW + n)
+    assert len(s._heap) <= 2 * len(s) + 64
+    assert s.due_cards(NOW + 2 * DAY, 10)[0] == ['a', 'b']
+
+
+def test_reviews_are_one_call_and_reload_from_snapshots(db):
+    svc = StudyService(admin=db)
+    first = svc.start('d1', 'u1')
+    assert [c['id'] for c in first['due']] == ['k0', 'k1', 'k2', 'k3', 'k4']
+    db.reset_calls()
+    out = svc.record_reviews('d1', 'u1', [
+        {'card_id': 'k1', 'result': 'good', 'elapsed_ms': 900},
+        {'card_id': 'k0', 'result': 'again', 'reviewed_at': to_iso(NOW)},
+    ])
+    assert db.calls.count(('rpc', 'record_study_reviews')) == 1
+    assert out['recorded'] == 2 and len(db.rows('study_events')) == 2
+    assert [c['id'] for c in out['due']] == ['k2', 'k3', 'k4', 'k0']
+    assert sorted(s['card_id'] for s in db.rows('card_state')) == ['k0', 'k1']
+
+    # A fresh process rebuilds the same state from card_state without reading the history
+    cached = svc.schedule_for('u1', 'd1')
+    study_module.clear_schedule_cache()
+    db.reset_calls()
+    rebuilt = svc.schedule_for('u1', 'd1')
+    assert rebuilt is not cached
+    assert ('study_events', 'select') not in db.calls
+    assert [rebuilt.state(n) for n in range(5)] == [cached.state(n) for n in range(5)]
+
+
+def test_workers_with_stale_caches_build_on_each_others_reviews(db, monkeypatch):
+    # Two gunicorn workers, each with its own cached schedule for the deck
+    workers = [TTLCache(maxsize=10, ttl=300), TTLCache(maxsize=10, ttl=300)]
+    svc = StudyService(admin=db)
+    for cache in workers:
+        monkeypatch.setattr(study_module, '_schedules', cache)
+        svc.start('d1', 'u1')
+    for n, cache in enumerate([0, 1, 0]):
+        monkeypatch.setattr(study_module, '_schedules', workers[cache])
+        svc.record_reviews('d1', 'u1', [{'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW + n * 10 * DAY)}])
+    assert [s['reps'] for s in db.rows('card_state')] == [3]
+    assert workers[0].get(('u1', 'd1'))[0].state(0)['reps'] == 3
+
+    # A write landing between the re-read and ours is a conflict; the retry builds on it
+    write = db.functions['record_study_reviews']
+
+    def interleaved(db_, p):
+        db.functions['record_study_reviews'] = write
+        monkeypatch.setattr(study_module, '_schedules', workers[1])
+        svc.record_reviews('d1', 'u1', [{'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW + 40 * DAY)}])
+        return write(db_, p)
+
+    db.functions['record_study_reviews'] = interleaved
+    svc.record_reviews('d1', 'u1', [{'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW + 50 * DAY)}])
+    assert [s['reps'] for s in db.rows('card_state')] == [5]
+    assert len(db.rows('study_events')) == 5
+
+
+def test_queues_never_serve_cards_answered_on_another_worker(db, monkeypatch):
+    workers = [TTLCache(maxsize=10, ttl=300), TTLCache(maxsize=10, ttl=300)]
+    svc = StudyService(admin=db)
+    for cache in workers:
+        monkeypatch.setattr(study_module, '_schedules', cache)
+        svc.start('d1', 'u1')
+    schedule = workers[1].get(('u1', 'd1'))[0]
+    monkeypatch.setattr(study_module, '_schedules', workers[0])
+    svc.record_reviews('d1', 'u1', [{'card_id': 'k0', 'result': 'good'}])
+    # This worker's own write keeps its cache valid
+    db.reset_calls()
+    assert svc.schedule_for('u1', 'd1') is workers[0].get(('u1', 'd1'))[0]
+    assert db.calls == [('rpc', 'study_state_mark')]
+
+    monkeypatch.setattr(study_module, '_schedules', workers[1])
+    assert 'k0' not in [c['id'] for c in svc.start('d1', 'u1')['due']]
+    assert workers[1].get(('u1', 'd1'))[0] is not schedule
+
+
+def test_reviews_are_validated_and_decks_guarded(db):
+    svc = StudyService(admin=db)
+    with pytest.raises(ValidationError):
+        svc.record_reviews('d1', 'u1', [{'card_id': 'k1', 'result': 'meh'}])
+    with pytest.raises(ValidationError):
+        svc.record_reviews('d1', 'u1', [{'card_id': 'other-deck-card', 'result': 'good'}])
+    with pytest.raises(UnauthorizedError):
+        svc.start('d1', 'stranger')
+    assert db.rows('study_events') == []
+
+
+def test_compaction_folds_old_history_and_prunes_covered_answers(db):
+    # History from before snapshots: raw answers and no card_state rows
+    answers = [('k0', 'good', NOW), ('k0', 'good', NOW + DAY), ('k1', 'again', NOW + DAY)]
+    db.tables['study_events'] = [
+        {'id': f'e{i}', 'user_id': 'u1', 'deck_id': 'd1', 'card_id': cid, 'result': result, 'created_at': to_iso(at)}
+        for i, (cid, result, at) in enumerate(answers)
+    ]
+    expected = Schedule([f'k{i}' for i in range(5)])
+    expected.review_many(answers)
+
+    assert compact(admin=db, retention_days=30, now=NOW + 10 * DAY) == {'pairs': 1, 'folded': 2, 'deleted': 0}
+    loaded = StudyService(admin=db).schedule_for('u1', 'd1')
+    assert [loaded.state(n) for n in range(5)] == [expected.state(n) for n in range(5)]
+
+    # Nothing left to fold; past the retention window the covered answers go
+    assert compact(admin=db, retention_days=30, now=NOW + 40 * DAY) == {'pairs': 0, 'folded': 0, 'deleted': 3}
+    study_module.clear_schedule_cache()
+    reloaded = StudyService(admin=db).schedule_for('u1', 'd1')
+    assert [reloaded.state(n) for n in range(5)] == [expected.state(n) for n in range(5)]
+
+
+def test_offline_sync_dedupes_and_is_safe_to_retry(db):
+    svc = StudyService(admin=db)
+    reviews = [
+        {'client_event_id': 'dev-2', 'card_id': 'k1', 'result': 'good', 'reviewed_at': to_iso(NOW + 60)},
+        {'client_event_id': 'dev-1', 'card_id': 'k0', 'result': 'again', 'reviewed_at': to_iso(NOW)},
+        {'client_event_id': 'dev-1', 'card_id': 'k0', 'result': 'again', 'reviewed_at': to_iso(NOW)},
+    ]
+    first = svc.sync('d1', 'u1', reviews)
+    assert (first['recorded'], first['duplicates'], first['synced']) == (2, 1, ['dev-1', 'dev-2'])
+    assert db.calls.count(('rpc', 'record_study_reviews')) == 1
+    state = svc.schedule_for('u1', 'd1').state(1)
+
+    # The response was lost and the device sends everything again
+    db.reset_calls()
+    again = svc.sync('d1', 'u1', reviews)
+    assert (again['recorded'], again['duplicates']) == (0, 3)
+    assert ('rpc', 'record_study_reviews') not in db.calls
+    assert [c['id'] for c in again['due']] == [c['id'] for c in first['due']]
+    assert len(db.rows('study_events')) == 2
+    assert svc.schedule_for('u1', 'd1').state(1) == state
+
+    with pytest.raises(ValidationError):
+        svc.sync('d1', 'u1', [{'card_id': 'k2', 'result': 'good', 'reviewed_at': to_iso(NOW)}])
+
+
+def test_overlapping_sync_retries_apply_each_answer_once(db):
+    svc = StudyService(admin=db)
+    reviews = [{'client_event_id': 'dev-1', 'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW)}]
+    write = db.functions['record_study_reviews']
+
+    def retried(db_, p):
+        # The device retried while this request was between its check and its write
+        db.functions['record_study_reviews'] = write
+        svc.sync('d1', 'u1', reviews)
+        return write(db_, p)
+
+    db.functions['record_study_reviews'] = retried
+    assert svc.sync('d1', 'u1', reviews)['recorded'] == 0
+    assert len(db.rows('study_events')) == 1
+    assert [s['reps'] for s in db.rows('card_state')] == [1]
+    assert svc.schedule_for('u1', 'd1').state(0)['reps'] == 1
+
+
+def test_late_offline_answers_build_on_the_stored_state(db):
+    svc = StudyService(admin=db)
+    svc.record_reviews('d1', 'u1', [{'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW + DAY)}])
+    # Answered offline before that review, synced afterwards
+    svc.sync('d1', 'u1', [{'client_event_id': 'dev-1', 'card_id': 'k0', 'result': 'good', 'reviewed_at': to_iso(NOW)}])
+    [stored] = db.rows('card_state')
+    assert stored['reps'] == 2 and stored['last_reviewed_at'] == to_iso(NOW + DAY)
+    assert svc.schedule_for('u1', 'd1').state(0)['reps'] == 2
+    study_module.clear_schedule_cache()
+    assert svc.schedule_for('u1', 'd1').state(0)['reps'] == 2
+    # Both answers are covered by the stored state, so compaction has nothing to fold
+    assert compact(admin=db, retention_days=30, now=NOW + 2 * DAY)['pairs'] == 0
@@ -0,0 +1,25 @@
+import pytest
+
+from app.services import summarizer
+from benchmarks.bench_summarizer import LegacySummarizer, make_transcript
+
+CASES = [
+    '',
+    'Short.',
+    'Students must bring materials. See https://example.com. Homework is optional.',
+    'Tie one alpha. Tie two alpha. Tie three alpha! Alpha beta gamma? ' * 3,
+    'Mitochondria produce ATP.\n\nRibosomes build proteins.   The nucleus stores DNA. ' + 'x' * 450 + '.',
+    make_transcript(300, seed=1),
+    make_transcript(2000, seed=2),
+]
+
+
+@pytest.mark.parametrize('text', CASES)
+def test_summary_is_byte_identical_to_previous_implementation(text):
+    assert summarizer.summarize(text) == LegacySummarizer()._summarize_text(text)
+
+
+@pytest.mark.parametrize('text', CASES)
+def test_top_sentences_match_previous_implementation(text):
+    expected = LegacySummarizer()._top_sentences(text, 5)
+    assert summarizer.top_sentences(text, 5, summarizer.BASIC_STOPWORDS, skip_noise=False) == expected
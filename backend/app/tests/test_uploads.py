@@ -0,0 +1,50 @@
+import os
+from io import BytesIO
+
+from flask import Flask, jsonify, request
+
+from app.core.config import Config
+from app.utils.errors import ValidationError
+from app.utils.uploads import SpooledUpload, SpoolingRequest, take_upload
+
+kept = []
+
+
+def make_app():
+    app = Flask(__name__)
+    app.request_class = SpoolingRequest
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        try:
+            file = request.files['file']
+            spool = file.stream
+            if request.form.get('keep'):
+                kept.append(take_upload(file))
+            return jsonify({'spooled': isinstance(spool, SpooledUpload), 'path': spool.path, 'size': spool.size})
+        except ValidationError as e:
+            return jsonify({'error': e.message}), e.status_code
+
+    return app
+
+
+def test_upload_is_spooled_once_and_removed_after_request():
+    res = make_app().test_client().post('/upload', data={'file': (BytesIO(b'x' * 4096), 'a.pdf')})
+    body = res.get_json()
+    assert body['spooled'] and body['size'] == 4096
+    assert not os.path.exists(body['path'])
+
+
+def test_taken_upload_outlives_request():
+    res = make_app().test_client().post('/upload', data={'file': (BytesIO(b'abc'), 'a.pdf'), 'keep': '1'})
+    upload = kept.pop()
+    assert res.get_json()['path'] == upload.path
+    assert upload.read() == b'abc' and upload.filename == 'a.pdf'
+    upload.close()
+    assert not os.path.exists(upload.path)
+
+
+def test_oversized_upload_is_rejected_while_streaming(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_UPLOAD_BYTES', 1024)
+    res = make_app().test_client().post('/upload', data={'file': (BytesIO(b'x' * 5000), 'a.pdf')})
+    assert res.status_code == 413
@@ -0,0 +1,71 @@
+import pytest
+
+from app.services.note_service import NoteService
+from app.services.vote_service import VoteService
+from app.tests.fakes import FakeAPIError, FakeSupabase
+from app.utils.errors import NotFoundError, ValidationError
+
+
+@pytest.fixture
+def db():
+    notes = [
+        {'id': f'n{i}', 'session_id': 's1', 'created_by': 'author', 'public': i != 0, 'vote_count': 0}
+        for i in range(50)
+    ]
+    notes.append({'id': 'other', 'session_id': 's2', 'created_by': 'author', 'public': True, 'vote_count': 0})
+    return FakeSupabase({
+        'sessions': [{'id': 's1', 'class_id': 'c1'}, {'id': 's2', 'class_id': 'c2'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'notes': notes,
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'c1', 'created_by': 'author', 'public': True, 'vote_count': 0}],
+    })
+
+
+def test_feed_vote_state_is_one_round_trip(db):
+    votes = VoteService(db)
+    votes.set_vote('n3', 'note', 'u1', True)
+    db.reset_calls()
+    summaries = votes.get_summaries([f'n{i}' for i in range(50)] + ['other'], 'note', 'u1')
+    assert db.calls == [('rpc', 'vote_summaries')]
+    # Private n0 and n-other (class u1 isn't in) are left out
+    assert len(summaries) == 49 and 'n0' not in summaries and 'other' not in summaries
+    assert summaries['n3'] == {'count': 1, 'user_has_voted': True}
+    assert summaries['n4'] == {'count': 0, 'user_has_voted': False}
+
+
+def test_votes_keep_the_counter_in_step(db):
+    notes = NoteService(admin=db)
+    assert notes.upsert_vote('n1', 'u1') == {'count': 1, 'user_has_voted': True}
+    # Voting again is a no-op rather than a double count
+    assert notes.upsert_vote('n1', 'u1') == {'count': 1, 'user_has_voted': True}
+    assert notes.get_note_votes_count('n1', 'u1') == {'count': 1, 'user_has_voted': True}
+    assert notes.remove_vote('n1', 'u1') == {'count': 0, 'user_has_voted': False}
+    assert db.tables['note_votes'] == []
+
+    votes = VoteService(db)
+    assert votes.toggle_upvote('d1', 'deck', 'u1') == {'count': 1, 'user_has_voted': True}
+    assert votes.toggle_upvote('d1', 'deck', 'u1') == {'count': 0, 'user_has_voted': False}
+
+
+def test_hidden_targets_and_bad_input(db):
+    votes = VoteService(db)
+    with pytest.raises(NotFoundError):
+        votes.set_vote('other', 'note', 'u1', True)
+    with pytest.raises(NotFoundError):
+        votes.get_upvotes('missing', 'deck', 'u1')
+    with pytest.raises(ValidationError):
+        votes.get_summaries(['n1'], 'comment', 'u1')
+    with pytest.raises(ValidationError):
+        votes.get_summaries([f'x{i}' for i in range(101)], 'note', 'u1')
+
+
+def test_malformed_ids_are_bad_input(db):
+    def reject(db_, p):
+        raise FakeAPIError('invalid input syntax for type uuid: "not-a-uuid"', code='22P02')
+
+    db.functions['vote_summaries'] = db.functions['set_vote'] = reject
+    votes = VoteService(db)
+    with pytest.raises(ValidationError):
+        votes.get_summaries(['not-a-uuid'], 'note', 'u1')
+    with pytest.raises(ValidationError):
+        votes.set_vote('not-a-uuid', 'note', 'u1', True)
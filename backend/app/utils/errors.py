@@ -20,3 +20,13 @@ class ValidationError(MountainMergeError):
     def __init__(self, message: str = "Validation error", status_code: int = 400):
         super().__init__(message, status_code)
 
+class ConflictError(MountainMergeError):
+    """The data changed underneath the request (e.g. a concurrent write); retry."""
+    def __init__(self, message: str = "Conflict", status_code: int = 409):
+        super().__init__(message, status_code)
+
+
+class PayloadTooLargeError(ValidationError):
+    """Upload exceeds the configured size limit."""
+    def __init__(self, message: str = "Upload too large", status_code: int = 413):
+        super().__init__(message, status_code)
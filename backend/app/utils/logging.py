@@ -1,12 +1,12 @@
 import logging
 import sys
+from app.core.config import Config
 
-def setup_logging():
+def setup_logging(level=None):
     logging.basicConfig(
-        level=logging.INFO,
+        level=level or Config.LOG_LEVEL,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
             logging.StreamHandler(sys.stdout)
         ]
     )
-
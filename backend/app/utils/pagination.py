@@ -1,4 +1,11 @@
+import base64
+import json
 from typing import List, Dict, Any
+from app.utils.errors import ValidationError
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
 
 def paginate(items: List[Any], page: int = 1, page_size: int = 20) -> Dict[str, Any]:
     """Paginate a list of items."""
@@ -14,3 +21,65 @@ def paginate(items: List[Any], page: int = 1, page_size: int = 20) -> Dict[str,
         'total_pages': (len(items) + page_size - 1) // page_size
     }
 
+
+# ---------- Keyset (cursor) pagination ----------
+# A cursor is the (sort value, id) of the last row on the previous page, so each page
+# is an indexed range scan no matter how deep the client pages.
+
+def encode_cursor(row: dict, column: str = 'created_at') -> str:
+    raw = json.dumps([row.get(column), row.get('id')], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValidationError("Invalid cursor")
+    if value is None or row_id is None:
+        raise ValidationError("Invalid cursor")
+    return value, row_id
+
+
+def page_args(args) -> tuple[int, tuple | None]:
+    """(limit, decoded cursor) from request query args."""
+    raw = args.get('limit')
+    try:
+        limit = int(raw) if raw not in (None, '') else DEFAULT_LIMIT
+    except ValueError:
+        raise ValidationError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValidationError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit, decode_cursor(args.get('cursor'))
+
+
+def _quote(value) -> str:
+    # Values inside a PostgREST logic tree must be quoted when they contain , . : ( )
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset(query, limit: int, cursor=None, column: str = 'created_at', desc: bool = True):
+    """Order by (column, id), start after `cursor` and fetch one row past the page."""
+    if cursor:
+        value, row_id = cursor
+        op = 'lt' if desc else 'gt'
+        v, i = _quote(value), _quote(row_id)
+        expr = f"{column}.{op}.{v},and({column}.eq.{v},id.{op}.{i})"
+        if hasattr(query, 'or_'):
+            query = query.or_(expr)
+        else:
+            # postgrest-py 0.13 has no or_(); add the raw `or` filter
+            query.params = query.params.add('or', f'({expr})')
+    # PostgREST reads a single comma-separated order list
+    return query.order(f"{column}{'.desc' if desc else ''},id", desc=desc).limit(limit + 1)
+
+
+def page_of(rows: list, limit: int, column: str = 'created_at') -> tuple[list, str | None]:
+    """Trim a keyset() result to the page and build the cursor for the next one."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1], column)
+    return rows, None
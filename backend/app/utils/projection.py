@@ -0,0 +1,58 @@
+from app.utils.errors import ValidationError
+
+# ---------- Column projection for list endpoints ----------
+# List routes select a named field set instead of '*', so feeds don't ship every note's
+# full content. `fields=` takes set names and/or single columns, comma-separated.
+
+# Every column a client may ask for by name
+COLUMNS = {
+    'notes': ('id', 'session_id', 'type', 'title', 'content', 'content_preview', 'public', 'pdf_url',
+              'vote_count', 'duplicate_of', 'duplicate_count', 'created_by', 'created_at', 'updated_at'),
+    'flashcard_decks': ('id', 'class_id', 'session_id', 'title', 'public', 'vote_count', 'created_by', 'created_at'),
+}
+
+# Computed columns (functions over the row type in setup_database.sql); '*' never includes them
+COMPUTED = {
+    'notes': ('content_preview',),
+    'flashcard_decks': (),
+}
+
+FIELD_SETS = {
+    'notes': {
+        'summary': ('id', 'title', 'type', 'session_id', 'public', 'pdf_url', 'vote_count', 'duplicate_of',
+                    'duplicate_count', 'created_by', 'created_at', 'content_preview'),
+        'full': ('*', 'content_preview'),
+    },
+    'flashcard_decks': {
+        'summary': ('id', 'title', 'class_id', 'public', 'vote_count', 'created_by', 'created_at'),
+        'full': ('*',),
+    },
+}
+
+# Always selected: the keyset cursor and the keys the services hydrate authors/classes from
+REQUIRED = {
+    'notes': ('id', 'created_at', 'created_by', 'session_id'),
+    'flashcard_decks': ('id', 'created_at', 'created_by', 'class_id'),
+}
+
+DEFAULT_FIELDS = 'summary'
+
+
+def select_columns(table: str, fields: str | None = None) -> str:
+    """PostgREST select list for a `fields` value (defaults to the summary set)."""
+    sets = FIELD_SETS[table]
+    columns = list(REQUIRED[table])
+    for name in (fields or DEFAULT_FIELDS).split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name in sets:
+            columns.extend(sets[name])
+        elif name in COLUMNS[table]:
+            columns.append(name)
+        else:
+            raise ValidationError(f"Unknown field '{name}'")
+    if '*' in columns:
+        # '*' already covers every stored column; keep only the computed extras
+        columns = ['*'] + [c for c in columns if c in COMPUTED[table]]
+    return ', '.join(dict.fromkeys(columns))
@@ -0,0 +1,164 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from flask import Request
+from app.core.config import Config
+from app.utils.errors import PayloadTooLargeError
+
+_CHUNK = 1 << 20
+
+
+class SpooledUpload:
+    """An uploaded file written once to a named temp file.
+
+    Reads like a file (read/seek/tell) for code written against FileStorage streams,
+    and exposes `path` so the bytes can be memory-mapped or streamed from disk. The
+    size limit is enforced and the SHA-256 computed while the bytes are written.
+    """
+
+    def __init__(self, max_bytes: int | None = None, filename: str | None = None, content_type: str | None = None):
+        self.max_bytes = Config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.detached = False
+        self._hash = hashlib.sha256()
+        fd, self.path = tempfile.mkstemp(prefix='upload-', dir=Config.UPLOAD_SPOOL_DIR or None)
+        self._fh = os.fdopen(fd, 'w+b')
+
+    @classmethod
+    def copy_from(cls, stream, **kwargs) -> 'SpooledUpload':
+        spool = cls(**kwargs)
+        try:
+            shutil.copyfileobj(stream, spool, _CHUNK)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+    # ---------- file protocol ----------
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.close()
+            raise PayloadTooLargeError(f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit")
+        self._hash.update(data)
+        return self._fh.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._fh.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._fh.readline(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._fh.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fh.tell()
+
+    def flush(self):
+        self._fh.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._fh.closed
+
+    # ---------- disk access ----------
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    def open_reader(self):
+        """A separate read handle on the spooled bytes, e.g. to stream to storage."""
+        self._fh.flush()
+        return open(self.path, 'rb')
+
+    @contextmanager
+    def mapped(self):
+        """Memory-map the spooled bytes read-only (0-byte files can't be mapped; they
+        yield an empty BytesIO)."""
+        self._fh.flush()
+        if self.size == 0:
+            yield BytesIO()
+            return
+        with open(self.path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SpoolingRequest(Request):
+    """Request that parses multipart file parts straight into SpooledUploads, so an
+    upload is buffered exactly once, on disk, and rejected as soon as it passes
+    MAX_UPLOAD_BYTES."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = SpooledUpload(filename=filename, content_type=content_type)
+        self.__dict__.setdefault('_spools', []).append(spool)
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for spool in self.__dict__.get('_spools', ()):
+                if not spool.detached:
+                    spool.close()
+
+
+def take_upload(file) -> SpooledUpload:
+    """Detach a request file so it outlives the request; the caller must close it."""
+    stream = file.stream
+    if isinstance(stream, SpooledUpload):
+        # Request.close() closes every file's stream; leave it an empty stand-in
+        stream.detached = True
+        file.stream = BytesIO()
+    else:
+        stream.seek(0)
+        stream = SpooledUpload.copy_from(stream)
+    stream.filename = file.filename
+    stream.content_type = file.content_type
+    stream.seek(0)
+    return stream
+
+
+@contextmanager
+def spooled(file):
+    """`file` as a SpooledUpload, spooling (and afterwards removing) a copy if needed."""
+    if isinstance(file, SpooledUpload):
+        yield file
+        return
+    file.seek(0)
+    spool = SpooledUpload.copy_from(file, max_bytes=0, filename=getattr(file, 'filename', None))
+    try:
+        yield spool
+    finally:
+        spool.close()
+        file.seek(0)
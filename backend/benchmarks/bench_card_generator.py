@@ -0,0 +1,151 @@
+"""Flashcard extraction over large multi-PDF corpora, before and after the
+single-scan card generator. The previous FlashcardService implementation is kept
+below as the baseline and reference output, with only its appositive quantifier fixed.
+
+Run from backend/:  python -m benchmarks.bench_card_generator
+"""
+import random
+import time
+
+from app.services import card_generator
+
+
+def legacy_generate_cards(text: str):
+    import re
+    cards: list[dict] = []
+
+    # Normalize whitespace
+    norm = re.sub(r"\s+", " ", text)
+
+    # 1) Capture explicit definition patterns (term : definition) or (term – definition)
+    def_lines = [l.strip() for l in text.splitlines() if l.strip()]
+    for ln in def_lines:
+        m = re.match(r"^([A-Za-z][A-Za-z0-9\- '()]+)\s*[:\-–]\s*(.+)$", ln)
+        if m:
+            term, definition = m.group(1).strip(), m.group(2).strip()
+            if 2 < len(term) <= 80 and 5 <= len(definition) <= 300:
+                cards.append({
+                    'question': f"Define: {term}"[:180],
+                    'answer'  : definition[:300]
+                })
+
+    # 2) Sentences with "X is/are Y" shaped definitions
+    sentences = re.split(r"(?<=[.!?])\s+", norm)
+    for s in sentences:
+        m = re.match(r"^([A-Z][A-Za-z0-9\- '()]{2,80})\s+(is|are|was|were)\s+(.{5,300})$", s.strip())
+        if m:
+            term = m.group(1).strip()
+            definition = m.group(3).strip()
+            # Skip if sentence is too long or clearly not a definition
+            if len(s) <= 240:
+                cards.append({
+                    'question': f"What is {term}?"[:180],
+                    'answer'  : definition.rstrip('. ')[:300]
+                })
+
+    # 3) Key vocabulary: take frequent capitalized nouns and try to find appositive/short explanation
+    tokens = re.findall(r"[A-Za-z][A-Za-z\-']+", text)
+    freq: dict[str,int] = {}
+    for t in tokens:
+        if t[0].isupper() and len(t) > 2:
+            freq[t] = freq.get(t, 0) + 1
+    common = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:30]
+    for term, _ in common:
+        # Find first short phrase containing the term followed by a comma or dash
+        # {{5,160}}: the shipped version wrote {5,160}, which the f-string turned into the
+        # literal "(5, 160)" so this step almost never matched
+        m = re.search(rf"\b{re.escape(term)}\b\s*(?:\-|\—|,|:)\s*([^.;]{{5,160}})", norm)
+        if m:
+            definition = m.group(1).strip()
+            cards.append({
+                'question': f"Define: {term}"[:180],
+                'answer': definition[:300]
+            })
+
+    # 4) Fallback: make a few cloze deletions for practice
+    if not cards:
+        for s in sentences[:20]:
+            words = s.split()
+            if len(words) > 6:
+                mid = max(1, len(words)//3)
+                answer = words[mid]
+                words[mid] = '____'
+                q = ' '.join(words) + '?'
+                cards.append({'question': q[:180], 'answer': answer[:180]})
+
+    # Dedupe by question
+    seen = set()
+    deduped = []
+    for c in cards:
+        q = c['question']
+        if q not in seen:
+            seen.add(q)
+            deduped.append(c)
+    return deduped[:60]
+
+
+_TERMS = [
+    "Mitochondria", "Ribosome", "Nucleus", "Golgi", "Chloroplast", "Cytoplasm", "Enzyme",
+    "Membrane", "Vesicle", "Lysosome", "Osmosis", "Diffusion", "Glycolysis", "Krebs",
+    "Photosynthesis", "Transcription", "Translation", "Mitosis", "Meiosis", "Allele",
+    "Genotype", "Phenotype", "Chromosome", "Gene", "Protein", "Lipid", "Carbohydrate",
+    "Nucleotide", "Polymerase", "Ligase", "Helicase", "Primase", "Operon", "Promoter",
+    "Cell", "Cellular", "Well", "Well-known",
+]
+_WORDS = "energy produces within the cell layer stores genetic material transports molecules across".split()
+
+
+def _phrase(rng, n):
+    return ' '.join(rng.choice(_WORDS) for _ in range(n))
+
+
+def make_corpus(pdfs: int, paragraphs_per_pdf: int = 60, seed: int = 0) -> str:
+    """Lecture-like text: mostly prose with capitalized terms, a few definition lines,
+    "X is Y" sentences and appositives."""
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(pdfs):
+        lines = []
+        for _ in range(paragraphs_per_pdf):
+            kind = rng.random()
+            term = rng.choice(_TERMS)
+            if kind < 0.03:
+                lines.append(f"{term}: {_phrase(rng, rng.randint(3, 12))}")
+            elif kind < 0.06:
+                lines.append(f"{term} is {_phrase(rng, rng.randint(3, 12))}.")
+            elif kind < 0.08:
+                lines.append(f"the {term.lower()} {_phrase(rng, 6)} and {term} - {_phrase(rng, 8)}.")
+            else:
+                sentences = []
+                for _ in range(rng.randint(2, 6)):
+                    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 20))]
+                    words.insert(rng.randrange(len(words)), rng.choice(_TERMS))
+                    sentences.append(' '.join(words) + '.')
+                lines.append(' '.join(sentences))
+        docs.append('\n'.join(lines))
+    return '\n'.join(docs)
+
+
+SIZES = [5, 20, 80]
+
+
+def _time(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    print(f"{'pdfs':>6} {'chars':>10} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for pdfs in SIZES:
+        text = make_corpus(pdfs)
+        repeat = max(1, 80 // pdfs)
+        before, expected = _time(legacy_generate_cards, text, repeat)
+        after, result = _time(card_generator.generate_cards, text, repeat)
+        assert result == expected, 'card output changed'
+        print(f"{pdfs:>6} {len(text):>10} {before * 1000:>10.1f} {after * 1000:>10.1f} {before / after:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
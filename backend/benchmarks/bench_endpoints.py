@@ -0,0 +1,292 @@
+"""Latency and Supabase round trips for every blueprint in create_app(), served from the
+in-memory Supabase fake (tables, RPCs, storage and auth).
+
+Run from backend/:  python -m benchmarks.bench_endpoints
+
+    BENCH_RUNS        timed requests per endpoint (default 50)
+    BENCH_LATENCY_MS  simulated round trip per Supabase call (default 0)
+
+Round trips are counted on a cold request (shared caches cleared) and checked against
+BUDGETS; the run exits non-zero if any endpoint needs more calls than its budget or
+answers with an unexpected status. Endpoints that destroy their own fixtures (deleting
+notes, decks or comments, leaving a class) and the background PDF uploads are left out.
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+from app.core import security
+from app.core.config import Config
+from app.core.supabase_client import register_client, reset_clients
+from app.services import hydration
+from app.services.membership_service import clear_membership_cache
+from app.services.study_service import clear_schedule_cache
+from app.tests.fakes import FakeSupabase
+from benchmarks.loadtest import JWT_SECRET, USER_ID, make_token
+
+CLASS_ID = 'c1'
+OTHER = 'classmate'
+NOTES = 60
+NOTE_IDS = [f'n{i:04d}' for i in range(NOTES)]
+
+# Settings the suite runs under; restored afterwards
+SETTINGS = {
+    'SUPABASE_JWT_SECRET': JWT_SECRET,
+    'SUPABASE_SERVICE_KEY': 'bench',
+    'AUTH_VERIFY_MODE': 'local',
+    'STREAM_MAX_SECONDS': 0,  # streams send their snapshot and close
+    'REQUEST_LOG': False,
+    'METRICS_TOKEN': 'bench-metrics',
+}
+
+
+def _png():
+    return {'data': {'file': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'\0' * 512), 'me.png', 'image/png')},
+            'content_type': 'multipart/form-data'}
+
+
+# (name, method, path, request kwargs or a callable returning them, expected status)
+SCENARIOS = [
+    ('auth.login', 'POST', '/api/auth/login', {'json': {'email': 'load@example.com', 'password': 'pw'}}, 200),
+    ('auth.me', 'GET', '/api/auth/me', {}, 200),
+    ('auth.profile', 'PATCH', '/api/auth/profile', {'json': {'major': 'Biology'}}, 200),
+    ('auth.picture', 'POST', '/api/auth/profile/picture', _png, 200),
+    ('auth.user', 'GET', f'/api/auth/user/{OTHER}', {}, 200),
+    ('classes.list', 'GET', '/api/classes', {}, 200),
+    ('classes.all', 'GET', '/api/classes/all', {}, 200),
+    ('classes.get', 'GET', f'/api/classes/{CLASS_ID}', {}, 200),
+    ('classes.join', 'POST', '/api/classes/join', {'json': {'class_id': CLASS_ID}}, 200),
+    ('classes.create', 'POST', '/api/classes', {'json': {'name': 'Bench 200'}}, 201),
+    ('notes.mine', 'GET', '/api/notes', {}, 200),
+    ('notes.class', 'GET', f'/api/notes/class/{CLASS_ID}', {}, 200),
+    ('notes.class_full', 'GET', f'/api/notes/class/{CLASS_ID}?fields=full', {}, 200),
+    ('notes.user', 'GET', f'/api/notes/user/{OTHER}', {}, 200),
+    ('notes.get', 'GET', f'/api/notes/{NOTE_IDS[1]}', {}, 200),
+    ('notes.votes', 'GET', f'/api/notes/{NOTE_IDS[1]}/votes', {}, 200),
+    ('notes.vote', 'POST', f'/api/notes/{NOTE_IDS[1]}/votes', {}, 200),
+    ('notes.unvote', 'DELETE', f'/api/notes/{NOTE_IDS[1]}/votes', {}, 200),
+    ('notes.comments', 'GET', f'/api/notes/{NOTE_IDS[1]}/comments', {}, 200),
+    ('notes.comment', 'POST', f'/api/notes/{NOTE_IDS[1]}/comments', {'json': {'content': 'Nice summary'}}, 201),
+    ('decks.mine', 'GET', '/api/decks', {}, 200),
+    ('decks.class', 'GET', f'/api/decks/class/{CLASS_ID}', {}, 200),
+    ('decks.user', 'GET', f'/api/decks/user/{OTHER}', {}, 200),
+    ('decks.get', 'GET', '/api/decks/d1', {}, 200),
+    ('decks.votes', 'GET', '/api/decks/d1/votes', {}, 200),
+    ('decks.vote', 'POST', '/api/decks/d1/votes', {}, 200),
+    ('decks.comments', 'GET', '/api/decks/d1/comments', {}, 200),
+    ('decks.comment', 'POST', '/api/decks/d1/comments', {'json': {'content': 'Great deck'}}, 201),
+    ('decks.add_cards', 'POST', '/api/decks/mine/cards',
+     {'json': {'cards': [{'question': f'Q{i}', 'answer': f'A{i}'} for i in range(10)]}}, 201),
+    ('decks.generate', 'POST', '/api/decks/mine/generate', {'json': {'note_id': NOTE_IDS[0], 'count': 5}}, 201),
+    ('decks.study_start', 'POST', '/api/decks/study/d1/start', {}, 200),
+    ('decks.study_reviews', 'POST', '/api/decks/study/d1/reviews',
+     {'json': {'reviews': [{'card_id': f'card{i}', 'result': 'good'} for i in range(10)]}}, 200),
+    ('upvotes.summaries', 'GET', '/api/upvotes?target_type=note&ids=' + ','.join(NOTE_IDS[:20]), {}, 200),
+    ('upvotes.toggle', 'POST', '/api/upvotes', {'json': {'target_id': NOTE_IDS[2], 'target_type': 'note'}}, 200),
+    ('upvotes.get', 'GET', f'/api/upvotes/note/{NOTE_IDS[2]}', {}, 200),
+    ('study.status', 'POST', '/api/study/groups/status', {'json': {'class_id': CLASS_ID, 'looking': True}}, 200),
+    ('study.groups', 'GET', '/api/study/groups', {}, 200),
+    ('study.get_status', 'GET', f'/api/study/groups/status?class_id={CLASS_ID}', {}, 200),
+    ('search.class', 'GET', f'/api/search?class_id={CLASS_ID}&q=oxidative+phosphorylation&limit=20', {}, 200),
+    ('study.sync', 'POST', '/api/study/sync',
+     {'json': {'deck_id': 'd1', 'reviews': [{'client_event_id': f'dev-{i}', 'card_id': f'card{i}', 'result': 'good',
+                                            'reviewed_at': '2025-01-01T00:00:00+00:00'} for i in range(10)]}}, 200),
+    ('stream.note', 'GET', f'/api/stream/notes/{NOTE_IDS[1]}', {}, 200),
+    ('jobs.missing', 'GET', '/api/jobs/no-such-job', {}, 404),
+    ('sessions.get', 'GET', '/api/sessions/s1', {}, 200),
+    ('comments.create', 'POST', '/api/sessions/s1', {'json': {'content': 'Hi'}}, 201),
+    ('cards.update', 'PATCH', '/api/cards/card1', {'json': {'question': 'Q'}}, 200),
+    ('metrics.scrape', 'GET', '/api/metrics', {'headers': {'Authorization': 'Bearer bench-metrics'}}, 200),
+]
+
+# Cold-request round-trip ceilings. Lower one when an endpoint gets cheaper; raising
+# one needs a reason in the commit that does it.
+BUDGETS = {
+    'auth.login': 2,
+    'auth.me': 1,
+    'auth.profile': 1,
+    'auth.picture': 3,
+    'auth.user': 1,
+    'classes.list': 1,
+    'classes.all': 1,
+    'classes.get': 2,
+    'classes.join': 2,
+    'classes.create': 2,
+    'notes.mine': 4,
+    'notes.class': 4,
+    'notes.class_full': 4,
+    'notes.user': 4,
+    'notes.get': 4,
+    'notes.votes': 1,
+    'notes.vote': 1,
+    'notes.unvote': 1,
+    'notes.comments': 5,
+    'notes.comment': 6,
+    'decks.mine': 2,
+    'decks.class': 3,
+    'decks.user': 3,
+    'decks.get': 5,
+    'decks.votes': 1,
+    'decks.vote': 1,
+    'decks.comments': 2,
+    'decks.comment': 2,
+    'decks.add_cards': 2,
+    'decks.generate': 4,
+    'decks.study_start': 5,
+    'decks.study_reviews': 7,
+    'upvotes.summaries': 1,
+    'upvotes.toggle': 1,
+    'upvotes.get': 1,
+    'study.status': 3,
+    'study.groups': 4,
+    'study.get_status': 2,
+    'study.sync': 8,
+    'search.class': 2,
+    'stream.note': 1,
+    'jobs.missing': 0,
+    'sessions.get': 0,
+    'comments.create': 0,
+    'cards.update': 0,
+    'metrics.scrape': 0,
+}
+
+
+def build_db(latency: float = 0.0) -> FakeSupabase:
+    notes = [
+        {'id': nid, 'session_id': 's1', 'created_by': OTHER if i % 2 else USER_ID, 'public': True,
+         'title': f'Lecture {i}', 'type': 'summary', 'vote_count': i % 5,
+         'content': 'Mitochondria produce ATP through oxidative phosphorylation. ' * 80,
+         'created_at': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}'}
+        for i, nid in enumerate(NOTE_IDS)
+    ]
+    db = FakeSupabase({
+        'users': [
+            {'id': USER_ID, 'email': 'load@example.com', 'first_name': 'Load', 'last_name': 'Test'},
+            {'id': OTHER, 'email': 'mate@example.com', 'first_name': 'Class', 'last_name': 'Mate'},
+        ],
+        'classes': [{'id': CLASS_ID, 'name': 'Cell Biology'}],
+        'class_members': [{'user_id': USER_ID, 'class_id': CLASS_ID, 'role': 'member'},
+                          {'user_id': OTHER, 'class_id': CLASS_ID, 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': CLASS_ID}],
+        'notes': notes,
+        'note_comments': [{'id': f'nc{i}', 'note_id': NOTE_IDS[1], 'user_id': OTHER, 'content': f'Comment {i}',
+                           'created_at': f'2025-01-02T00:00:{i:02d}'} for i in range(10)],
+        'comments': [{'id': f'dc{i}', 'anchor': 'deck:d1', 'user_id': OTHER, 'text': f'Comment {i}',
+                      'created_at': f'2025-01-02T00:00:{i:02d}'} for i in range(10)],
+        'flashcard_decks': [
+            {'id': 'd1', 'class_id': CLASS_ID, 'session_id': 's1', 'created_by': OTHER, 'public': True,
+             'title': 'Organelles', 'vote_count': 3, 'created_at': '2025-01-01T00:00:00'},
+            {'id': 'mine', 'class_id': CLASS_ID, 'session_id': 's1', 'created_by': USER_ID, 'public': True,
+             'title': 'My deck', 'vote_count': 0, 'created_at': '2025-01-01T00:00:01'},
+        ],
+        'flashcards': [{'id': f'card{i}', 'deck_id': 'd1', 'question': f'Q{i}', 'answer': f'A{i}',
+                        'created_at': f'2025-01-01T00:00:{i:02d}'} for i in range(20)],
+        'study_groups': [{'user_id': OTHER, 'class_id': CLASS_ID, 'looking': True}],
+    }, latency=latency)
+    db.auth.admin.create_user({'id': USER_ID, 'email': 'load@example.com', 'password': 'pw', 'email_confirm': True})
+    db.storage.create_bucket('profile-pictures', options={'public': True})
+    db.reset_calls()
+    return db
+
+
+def clear_caches():
+    """Cold start: forget memberships, hydrated rows, study schedules and verified tokens."""
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+    clear_schedule_cache()
+    security._token_cache.clear()
+
+
+@contextlib.contextmanager
+def bench_client(db: FakeSupabase):
+    """A create_app() test client whose Supabase clients are all `db`."""
+    saved = {name: getattr(Config, name) for name in SETTINGS}
+    for name, value in SETTINGS.items():
+        setattr(Config, name, value)
+    register_client('admin', db)
+    register_client('default', db)
+    try:
+        from app import create_app
+        yield create_app().test_client()
+    finally:
+        reset_clients()
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def _call(client, method, path, kwargs, headers):
+    kwargs = dict(kwargs() if callable(kwargs) else kwargs)
+    # A scenario's own headers (e.g. the metrics token) replace the user's
+    headers = {**headers, **kwargs.pop('headers', {})}
+    res = client.open(path, method=method, headers=headers, **kwargs)
+    res.get_data()  # drain streamed bodies so the request finishes
+    return res.status_code
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))] if sorted_values else 0.0
+
+
+def measure(client, db, scenario, runs: int, headers) -> dict:
+    name, method, path, kwargs, expected = scenario
+    clear_caches()
+    db.reset_calls()
+    status = _call(client, method, path, kwargs, headers)
+    cold = len(db.calls)
+    timings = []
+    warm = cold
+    for _ in range(runs):
+        db.reset_calls()
+        start = time.perf_counter()
+        _call(client, method, path, kwargs, headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        warm = len(db.calls)
+    timings.sort()
+    return {
+        'name': name, 'status': status, 'expected': expected, 'cold': cold, 'warm': warm,
+        'budget': BUDGETS.get(name), 'p50': _percentile(timings, 0.50),
+        'p95': _percentile(timings, 0.95), 'p99': _percentile(timings, 0.99),
+    }
+
+
+def run_suite(runs: int = 50, latency: float = 0.0) -> list:
+    db = build_db(latency)
+    headers = {'Authorization': f'Bearer {make_token()}'}
+    with bench_client(db) as client:
+        return [measure(client, db, scenario, runs, headers) for scenario in SCENARIOS]
+
+
+def failures(results) -> list:
+    out = []
+    for r in results:
+        if r['status'] != r['expected']:
+            out.append(f"{r['name']}: status {r['status']}, expected {r['expected']}")
+        if r['budget'] is None:
+            out.append(f"{r['name']}: no round-trip budget")
+        elif r['cold'] > r['budget']:
+            out.append(f"{r['name']}: {r['cold']} round trips, budget {r['budget']}")
+    return out
+
+
+def run():
+    runs = int(os.getenv('BENCH_RUNS', '50'))
+    latency = float(os.getenv('BENCH_LATENCY_MS', '0')) / 1000
+    results = run_suite(runs, latency)
+    print(f"runs={runs} latency={latency * 1000:.0f}ms")
+    print(f"{'endpoint':<20} {'status':>6} {'cold rt':>8} {'warm rt':>8} {'budget':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['name']:<20} {r['status']:>6} {r['cold']:>8} {r['warm']:>8} {str(r['budget']):>7} "
+              f"{r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f}")
+    problems = failures(results)
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    run()
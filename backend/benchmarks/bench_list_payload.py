@@ -0,0 +1,64 @@
+"""Response size and JSON encode time of the class notes feed, summary vs full fields.
+
+Run from backend/:  python -m benchmarks.bench_list_payload
+"""
+import time
+from flask import Flask
+
+from app.services import hydration
+from app.services.membership_service import clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+
+SIZES = [20, 100]
+CONTENT_BYTES = 40_000
+REPEATS = 20
+
+
+def build_db(n_notes: int) -> FakeSupabase:
+    body = '## Summary\n\n' + ('- **Term**: a sentence of summarized lecture content.\n' * (CONTENT_BYTES // 54))
+    notes = [
+        {'id': f'n{i:04d}', 'session_id': 's1', 'created_by': 'u1', 'public': True, 'title': f'Lecture {i}',
+         'type': 'summary', 'pdf_url': f'https://cdn.example/sha256/{i:064x}.pdf', 'content': body,
+         'created_at': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}'}
+        for i in range(n_notes)
+    ]
+    return FakeSupabase({
+        'users': [{'id': 'u1', 'first_name': 'Ada', 'last_name': 'Lovelace'}],
+        'classes': [{'id': 'c1', 'name': 'Biology'}],
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': 'c1'}],
+        'notes': notes,
+    })
+
+
+def measure(app, service, n: int, fields: str):
+    best, size = float('inf'), 0
+    for _ in range(REPEATS):
+        with app.test_request_context():
+            notes, next_cursor = service.list_public_notes_for_class('c1', 'u1', limit=n, fields=fields)
+            start = time.perf_counter()
+            body = app.json.dumps({'notes': notes, 'next_cursor': next_cursor})
+            best = min(best, time.perf_counter() - start)
+            size = len(body.encode())
+    return size, best * 1000
+
+
+def run():
+    app = Flask(__name__)
+    print(f"{'notes':>6} {'fields':>8} {'bytes':>12} {'encode ms':>10}")
+    for n in SIZES:
+        hydration._shared['users'].clear()
+        hydration._shared['classes'].clear()
+        clear_membership_cache()
+        service = NoteService(admin=build_db(n))
+        results = {fields: measure(app, service, n, fields) for fields in ('full', 'summary')}
+        for fields, (size, ms) in results.items():
+            print(f"{n:>6} {fields:>8} {size:>12,} {ms:>10.2f}")
+        full, summary = results['full'][0], results['summary'][0]
+        print(f"{'':>6} {'':>8} {full / summary:>11.0f}x smaller")
+        assert summary * 10 < full, "summary payload should be far smaller than the full one"
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,41 @@
+"""Serial vs process-pool PDF text extraction over synthetic lecture decks.
+
+Run from backend/:  python -m benchmarks.bench_pdf_extraction
+"""
+import os
+import time
+from io import BytesIO
+
+from app.core.config import Config
+from app.services import file_service
+from app.services.file_service import FileService
+from app.tests.fakes import make_pdf
+
+SIZES = [100, 200, 400]
+WORKERS = min(4, os.cpu_count() or 1)
+
+
+def run(raw: bytes, workers: int) -> tuple[float, str]:
+    Config.PDF_EXTRACT_WORKERS = workers
+    start = time.perf_counter()
+    text = FileService().extract_text_from_pdf(BytesIO(raw))
+    return time.perf_counter() - start, text
+
+
+def main():
+    Config.PDF_PARALLEL_MIN_PAGES = 1
+    # Warm the pool so process start-up isn't billed to the first size
+    run(make_pdf(WORKERS * Config.PDF_PAGES_PER_TASK), WORKERS)
+    print(f"workers={WORKERS} pages_per_task={Config.PDF_PAGES_PER_TASK} cpus={os.cpu_count()}")
+    print(f"{'pages':>6} {'serial s':>9} {'parallel s':>11} {'serial p/s':>11} {'parallel p/s':>13} {'speedup':>8}")
+    for pages in SIZES:
+        raw = make_pdf(pages)
+        serial, expected = run(raw, 0)
+        parallel, text = run(raw, WORKERS)
+        assert text == expected, 'parallel extraction changed the output'
+        print(f"{pages:>6} {serial:>9.2f} {parallel:>11.2f} {pages / serial:>11.0f} {pages / parallel:>13.0f} {serial / parallel:>7.2f}x")
+    file_service.shutdown_extract_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Query count for profile pages as the number of notes/decks grows.
+
+Run from backend/:  python -m benchmarks.bench_public_profile
+"""
+import time
+from flask import Flask
+
+from app.services import hydration
+from app.services.flashcard_service import FlashcardService
+from app.services.membership_service import clear_membership_cache
+from app.services.note_service import NoteService
+from app.tests.fakes import FakeSupabase
+
+SIZES = [10, 100, 1000]
+CLASSES = 25
+
+
+def build_db(n_items: int) -> FakeSupabase:
+    classes = [{'id': f'c{i}', 'name': f'Class {i}'} for i in range(CLASSES)]
+    sessions = [{'id': f's{i}', 'class_id': f'c{i % CLASSES}'} for i in range(n_items)]
+    notes = [
+        {'id': f'n{i}', 'session_id': f's{i}', 'created_by': 'author', 'public': i % 7 != 0,
+         'content': 'x', 'created_at': f'2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}'}
+        for i in range(n_items)
+    ]
+    decks = [
+        {'id': f'd{i}', 'class_id': f'c{i % CLASSES}', 'created_by': 'author', 'public': True,
+         'title': f'Deck {i}', 'created_at': f'2025-01-01T00:00:{i % 60:02d}'}
+        for i in range(n_items)
+    ]
+    # Viewer shares every other class with the author
+    members = [{'user_id': 'viewer', 'class_id': f'c{i}', 'role': 'member'} for i in range(0, CLASSES, 2)]
+    return FakeSupabase({
+        'users': [{'id': 'author', 'first_name': 'Ada', 'last_name': 'Lovelace'}],
+        'classes': classes,
+        'sessions': sessions,
+        'notes': notes,
+        'flashcard_decks': decks,
+        'class_members': members,
+    })
+
+
+def _clear_shared_caches():
+    for cache in hydration._shared.values():
+        cache.clear()
+    clear_membership_cache()
+
+
+def _membership_queries(db) -> int:
+    return sum(1 for table, _ in db.calls if table == 'class_members')
+
+
+def run():
+    app = Flask(__name__)
+    print(f"{'items':>6} {'notes q':>8} {'decks q':>8} {'member q':>9} {'visible':>8} {'ms':>8}")
+    membership_counts = []
+    for n in SIZES:
+        _clear_shared_caches()
+        db = build_db(n)
+        notes_svc = NoteService(admin=db)
+        decks_svc = FlashcardService(admin=db)
+        start = time.perf_counter()
+        with app.test_request_context():
+            visible, _ = notes_svc.list_public_notes_by_user('author', 'viewer')
+        note_queries = len(db.calls)
+        member_queries = _membership_queries(db)
+        db.reset_calls()
+        with app.test_request_context():
+            decks_svc.list_public_decks_by_user('author', 'viewer')
+        deck_queries = len(db.calls)
+        member_queries += _membership_queries(db)
+        elapsed = (time.perf_counter() - start) * 1000
+        membership_counts.append(member_queries)
+        print(f"{n:>6} {note_queries:>8} {deck_queries:>8} {member_queries:>9} {len(visible):>8} {elapsed:>8.1f}")
+    # Each list is one keyset page joined to its sessions; membership is one lookup per viewer
+    assert set(membership_counts) == {1}, f"membership queries grew with item count: {membership_counts}"
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,115 @@
+"""Spaced-repetition scheduler at 100k cards for one user: memory, next-card latency
+against a scan over per-card dicts, batched review cost, and round trips per request.
+
+Run from backend/:  python -m benchmarks.bench_study_scheduler
+"""
+import random
+import time
+import tracemalloc
+from flask import Flask
+
+from app.services import study_service as study_module
+from app.services.membership_service import clear_membership_cache
+from app.services.scheduler import RESULTS, Schedule, next_state
+from app.services.study_service import StudyService
+from app.tests.fakes import FakeSupabase
+
+CARDS = 100_000
+WARM_REVIEWS = 20_000
+LOOKUPS = 2_000
+BATCH = 500
+# The fake re-sorts the whole table for every page, so the service pass uses a smaller deck
+SERVICE_CARDS = 10_000
+NOW = 1_750_000_000
+
+
+def _measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def _dict_states(card_ids):
+    return [{'card_id': c, 'due': 0, 'ease': 2.5, 'interval': 0.0, 'reps': 0, 'lapses': 0} for c in card_ids]
+
+
+def run():
+    rng = random.Random(7)
+    card_ids = [f'card-{i:06d}' for i in range(CARDS)]
+    schedule, sched_bytes, sched_s = _measure(lambda: Schedule(card_ids))
+    dicts, dict_bytes, dict_s = _measure(lambda: _dict_states(card_ids))
+    print(f"{CARDS} cards")
+    print(f"  schedule: build {sched_s * 1000:7.1f} ms  state+heap {schedule.nbytes() / 1e6:5.1f} MB"
+          f"  (traced incl. ids index {sched_bytes / 1e6:5.1f} MB)")
+    print(f"  dicts:    build {dict_s * 1000:7.1f} ms  traced {dict_bytes / 1e6:5.1f} MB")
+
+    # Same review history in both representations
+    history = [(rng.randrange(CARDS), rng.choice(RESULTS), NOW + i) for i in range(WARM_REVIEWS)]
+    schedule.review_many((card_ids[s], r, at) for s, r, at in history)
+    for slot, result, at in history:
+        d = dicts[slot]
+        d['ease'], d['interval'], d['reps'], d['lapses'], d['due'] = next_state(
+            d['ease'], d['interval'], d['reps'], d['lapses'], result, at)
+
+    now = NOW + 3 * 86400
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        schedule.due_cards(now, 1)
+    heap_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+    start = time.perf_counter()
+    for _ in range(LOOKUPS // 20):
+        min(dicts, key=lambda d: (d['due'], d['card_id']))
+    scan_us = (time.perf_counter() - start) / (LOOKUPS // 20) * 1e6
+    print(f"  next card: heap {heap_us:8.1f} us   scan {scan_us:10.1f} us   ({scan_us / heap_us:,.0f}x)")
+
+    batch = [(card_ids[rng.randrange(CARDS)], rng.choice(RESULTS), now + i) for i in range(BATCH)]
+    start = time.perf_counter()
+    schedule.review_many(batch)
+    queue = schedule.due_cards(now + BATCH, 20)
+    review_us = (time.perf_counter() - start) / BATCH * 1e6
+    print(f"  batch of {BATCH}: {review_us:.2f} us per review incl. next queue of {len(queue[0])}")
+
+    # Round trips: a cold session start pages the deck and its saved states in once;
+    # answers and their new states are one call
+    card_ids = card_ids[:SERVICE_CARDS]
+    db = FakeSupabase({
+        'class_members': [{'user_id': 'u1', 'class_id': 'c1', 'role': 'member'}],
+        'flashcard_decks': [{'id': 'd1', 'class_id': 'c1', 'created_by': 'u1', 'public': True}],
+        'flashcards': [{'id': cid, 'deck_id': 'd1', 'question': 'Q', 'answer': 'A',
+                        'created_at': f'2025-01-01T00:00:00.{i:06d}+00:00'} for i, cid in enumerate(card_ids)],
+    })
+    study_module.clear_schedule_cache()
+    clear_membership_cache()
+    svc = StudyService(admin=db)
+    app = Flask(__name__)
+    with app.test_request_context():
+        start = time.perf_counter()
+        svc.start('d1', 'u1')
+        cold_ms, cold_calls = (time.perf_counter() - start) * 1000, len(db.calls)
+        db.reset_calls()
+        reviews = [{'card_id': card_ids[i], 'result': 'good'} for i in range(BATCH)]
+        start = time.perf_counter()
+        out = svc.record_reviews('d1', 'u1', reviews)
+        batch_ms, batch_calls = (time.perf_counter() - start) * 1000, list(db.calls)
+    print(f"{SERVICE_CARDS} cards through StudyService and the fake")
+    print(f"  service: cold start {cold_calls} round trips {cold_ms:.0f} ms; "
+          f"{BATCH} answers {len(batch_calls)} round trips {batch_ms:.0f} ms "
+          f"({batch_calls.count(('rpc', 'record_study_reviews'))} write), {len(out['due'])} cards queued")
+    assert batch_calls.count(('rpc', 'record_study_reviews')) == 1
+
+    # Reopening after the answers costs the same however many have been recorded
+    study_module.clear_schedule_cache()
+    db.reset_calls()
+    with app.test_request_context():
+        svc.start('d1', 'u1')
+    print(f"  reopen after {len(db.rows('study_events'))} answers: {len(db.calls)} round trips "
+          f"(cold start was {cold_calls}), {len(db.rows('card_state'))} card_state rows")
+    assert ('study_events', 'select') not in db.calls
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,175 @@
+"""Summarization throughput over large lecture transcripts, before and after the
+single-pass engine. The previous NoteService implementation is kept below verbatim
+as the baseline and reference output.
+
+Run from backend/:  python -m benchmarks.bench_summarizer
+"""
+import random
+import re
+import time
+
+from app.services import summarizer
+
+
+class LegacySummarizer:
+    def _sentence_split(self, text: str):
+        return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+    def _tokenize(self, text: str):
+        return re.findall(r"[A-Za-z0-9']+", text.lower())
+
+    def _frequency_scores(self, text: str):
+        stop = set([
+            "the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have","but","not","their","his","her","its","they","them","we","you"
+        ])
+        freqs = {}
+        for t in self._tokenize(text):
+            if t in stop or len(t) <= 2:
+                continue
+            freqs[t] = freqs.get(t, 0) + 1
+        return freqs
+
+    def _is_noise_sentence(self, s: str) -> bool:
+        # Filter instructional scaffolding, URLs, and admin/meta lines
+        noise_patterns = [
+            r"http[s]?://",
+            r"www\.",
+            r"@",
+            r"optional",
+            r"teacher",
+            r"students?",
+            r"materials",
+            r"procedure",
+            r"homework",
+            r"database",
+            r"power\s*point",
+            r"attached",
+            r"note:?\s*\d+",
+        ]
+        s_low = s.lower()
+        if any(re.search(p, s_low) for p in noise_patterns):
+            return True
+        # Discard overly long list-like lines
+        if len(s) > 400:
+            return True
+        return False
+
+    def _score_sentences(self, sentences, freqs):
+        scored = []
+        for s in sentences:
+            if self._is_noise_sentence(s):
+                continue
+            score = 0
+            for t in self._tokenize(s):
+                if t in freqs:
+                    score += freqs[t]
+            if s:
+                scored.append((score, s))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [s for _, s in scored]
+
+    def _summarize_text(self, text: str) -> str:
+        # Build scores
+        sentences = self._sentence_split(text)
+        freqs = self._frequency_scores(text)
+        ranked = self._score_sentences(sentences, freqs)
+
+        # Construct concise paragraphs (no timeline, no bullets)
+        # Overview: up to 2 sentences stitched
+        overview = " ".join(ranked[:2])
+        overview = re.sub(r"\s+", " ", overview).strip()
+
+        # Additional paragraphs: groups of 2 sentences each, up to 2 paragraphs
+        rest = ranked[2:8]  # up to 6 more
+        paras = []
+        for i in range(0, len(rest), 2):
+            chunk = " ".join(rest[i:i+2]).strip()
+            if chunk:
+                paras.append(re.sub(r"\s+", " ", chunk))
+            if len(paras) >= 2:
+                break
+
+        md = []
+        if overview:
+            md.append("### Overview")
+            md.append(overview)
+            # Add two blank lines for visual separation
+            md.append("")
+            md.append("")
+        if paras:
+            md.append("### Summary")
+            for p in paras:
+                md.append(p)
+                md.append("")
+        return "\n".join(md).strip()
+
+    def _top_sentences(self, text: str, k: int = 5):
+        sentences = re.split(r"(?<=[.!?])\s+", text)
+        tokens = re.findall(r"[A-Za-z0-9']+", text.lower())
+        stop = set(["the","a","an","and","or","to","of","in","on","for","with","is","are","as","that","this","it","by","be","from","at","was","were","which","has","had","have"])
+        freqs = {}
+        for t in tokens:
+            if t in stop or len(t) <= 2:
+                continue
+            freqs[t] = freqs.get(t, 0) + 1
+        scored = []
+        for s in sentences:
+            score = 0
+            for t in re.findall(r"[A-Za-z0-9']+", s.lower()):
+                if t in freqs:
+                    score += freqs[t]
+            if s.strip():
+                scored.append((score, s.strip()))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [s for _, s in scored[:k]]
+
+
+_WORDS = (
+    "cell membrane protein enzyme mitochondria nucleus ribosome transcription translation "
+    "glucose energy photosynthesis chlorophyll osmosis diffusion gradient receptor signal "
+    "pathway regulation feedback homeostasis organism species evolution selection mutation"
+).split()
+_NOISE = ["See https://example.edu/slides", "Students should bring materials", "Homework due Friday",
+          "Note: 3 attached", "Optional reading", "Open the PowerPoint"]
+
+
+def make_transcript(sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    for i in range(sentences):
+        if rng.random() < 0.08:
+            out.append(rng.choice(_NOISE) + '.')
+            continue
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(4, 28))]
+        words[0] = words[0].capitalize()
+        out.append(' '.join(words) + rng.choice('.!?'))
+        if rng.random() < 0.1:
+            out.append('\n')
+    return ' '.join(out)
+
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+def _time(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    legacy = LegacySummarizer()
+    print(f"{'sentences':>10} {'chars':>10} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for n in SIZES:
+        text = make_transcript(n)
+        repeat = max(1, 20_000 // n)
+        before, expected = _time(legacy._summarize_text, text, repeat)
+        after, result = _time(summarizer.summarize, text, repeat)
+        assert result == expected, 'summary output changed'
+        assert summarizer.top_sentences(text, 5, summarizer.BASIC_STOPWORDS, skip_noise=False) == legacy._top_sentences(text, 5)
+        print(f"{n:>10} {len(text):>10} {before * 1000:>10.1f} {after * 1000:>10.1f} {before / after:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Peak Python heap per PDF upload: buffered bytes vs the spooled/mmap path.
+
+Each run parses a multipart request body from disk, extracts the text and reads the
+storage upload body, which is what a note upload does. Run from backend/:
+    python -m benchmarks.bench_upload_memory
+"""
+import io
+import os
+import tempfile
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+from app.core.config import Config
+from app.services.file_service import FileService
+from app.tests.fakes import make_pdf
+from app.utils.uploads import SpoolingRequest, take_upload
+from flask import Request
+
+SIZES_MB = [5, 20, 50]
+PAGES = 50
+
+
+def build_environ(pdf: bytes, path: str) -> dict:
+    env = EnvironBuilder(method='POST', data={'file': (io.BytesIO(pdf), 'deck.pdf', 'application/pdf')}).get_environ()
+    with open(path, 'wb') as fh:
+        fh.write(env['wsgi.input'].read())
+    return env
+
+
+def buffered(env, path):
+    # The old path: read() into bytes, BytesIO for the parser, read() again for storage
+    with open(path, 'rb') as body:
+        req = Request(dict(env, **{'wsgi.input': body}))
+        file = req.files['file']
+        raw = file.read()
+        import PyPDF2
+        reader = PyPDF2.PdfReader(io.BytesIO(raw))
+        text = '\n'.join(p.extract_text() or '' for p in reader.pages)
+        file.seek(0)
+        data = file.read()
+        req.close()
+    return len(text) + len(data)
+
+
+def spooled(env, path):
+    with open(path, 'rb') as body:
+        req = SpoolingRequest(dict(env, **{'wsgi.input': body}))
+        upload = take_upload(req.files['file'])
+        req.close()
+    try:
+        text = FileService().extract_text_from_pdf(upload)
+        sent = 0
+        with upload.open_reader() as fh:
+            for chunk in iter(lambda: fh.read(64 * 1024), b''):
+                sent += len(chunk)
+    finally:
+        upload.close()
+    return len(text) + sent
+
+
+def peak(fn, *args) -> float:
+    tracemalloc.start()
+    fn(*args)
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / (1024 * 1024)
+
+
+def main():
+    Config.PDF_EXTRACT_WORKERS = 0
+    Config.MAX_UPLOAD_BYTES = 0
+    print(f"{'upload MB':>10} {'buffered peak MB':>17} {'spooled peak MB':>16}")
+    fd, path = tempfile.mkstemp(suffix='.multipart')
+    os.close(fd)
+    try:
+        for mb in SIZES_MB:
+            env = build_environ(make_pdf(PAGES, padding=mb * 1024 * 1024), path)
+            print(f"{mb:>10} {peak(buffered, env, path):>17.1f} {peak(spooled, env, path):>16.1f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Requests per second through gunicorn as the worker count grows, against the
+in-memory Supabase fake with a simulated round trip per query (benchmarks.loadtest_app).
+
+Run from backend/:  python -m benchmarks.loadtest
+
+    LOADTEST_WORKERS      worker counts to try (default 1,2,4)
+    LOADTEST_THREADS      threads per worker (default 2)
+    LOADTEST_CLIENTS      concurrent client connections (default 32)
+    LOADTEST_SECONDS      measured seconds per run (default 5)
+    LOADTEST_LATENCY_MS   simulated Supabase round trip (default 15)
+"""
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+JWT_SECRET = 'loadtest-secret'
+USER_ID = 'loaduser'
+CLASS_ID = 'c1'
+
+PATHS = [
+    f'/api/notes/class/{CLASS_ID}?limit=20',
+    '/api/upvotes?target_type=note&ids=' + ','.join(f'n{i:04d}' for i in range(20)),
+    '/api/notes/n0001/votes',
+]
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def make_token() -> str:
+    header = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = _b64(json.dumps({'sub': USER_ID, 'aud': 'authenticated', 'exp': int(time.time()) + 3600}).encode())
+    sig = hmac.new(JWT_SECRET.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+    return f'{header}.{payload}.{_b64(sig)}'
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, GUNICORN_ACCESS_LOG='', GUNICORN_LOG_LEVEL='warning')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+         '--threads', str(threads), '--bind', f'127.0.0.1:{port}', 'benchmarks.loadtest_app:app'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('gunicorn did not start')
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.send_signal(signal.SIGTERM)  # graceful: workers finish in-flight requests
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def drive(port: int, clients: int, seconds: float) -> tuple[int, int, list]:
+    headers = {'Authorization': f'Bearer {make_token()}'}
+    latencies, errors, lock = [], [0], threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(n: int):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed, i = [], 0, n
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', PATHS[i % len(PATHS)], headers=headers)
+                res = conn.getresponse()
+                res.read()
+                if res.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            mine.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return len(latencies), errors[0], sorted(latencies)
+
+
+def main():
+    workers_list = [int(w) for w in os.getenv('LOADTEST_WORKERS', '1,2,4').split(',')]
+    threads = int(os.getenv('LOADTEST_THREADS', '2'))
+    clients = int(os.getenv('LOADTEST_CLIENTS', '32'))
+    seconds = float(os.getenv('LOADTEST_SECONDS', '5'))
+    print(f"threads/worker={threads} clients={clients} seconds={seconds} cpus={os.cpu_count()} "
+          f"latency={os.getenv('LOADTEST_LATENCY_MS', '15')}ms")
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'scale':>6}")
+    base = None
+    for workers in workers_list:
+        port = _free_port()
+        proc = start_server(workers, threads, port)
+        try:
+            drive(port, clients, 1.0)  # warm-up
+            count, errors, lat = drive(port, clients, seconds)
+        finally:
+            stop_server(proc)
+        rps = count / seconds
+        base = base or rps
+        p50 = lat[len(lat) // 2] * 1000 if lat else 0
+        p95 = lat[int(len(lat) * 0.95)] * 1000 if lat else 0
+        print(f"{workers:>8} {count:>9} {errors:>7} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f} {rps / base:>5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
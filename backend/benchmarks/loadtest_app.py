@@ -0,0 +1,42 @@
+"""The real app wired to the in-memory Supabase fake, with a simulated network round
+trip on every query. Served by benchmarks.loadtest; not for any other use.
+"""
+import collections
+import os
+
+from benchmarks.loadtest import CLASS_ID, JWT_SECRET, USER_ID
+
+os.environ.setdefault('SUPABASE_URL', 'http://supabase.invalid')
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'loadtest')
+os.environ['SUPABASE_JWT_SECRET'] = JWT_SECRET
+os.environ['AUTH_VERIFY_MODE'] = 'local'
+
+from app.core.supabase_client import register_client  # noqa: E402
+from app.tests.fakes import FakeSupabase  # noqa: E402
+
+LATENCY = float(os.getenv('LOADTEST_LATENCY_MS', '15')) / 1000
+NOTES = 200
+
+
+def build_db() -> FakeSupabase:
+    db = FakeSupabase({
+        'users': [{'id': USER_ID, 'first_name': 'Load', 'last_name': 'Test'}],
+        'classes': [{'id': CLASS_ID, 'name': 'Load Testing 101'}],
+        'class_members': [{'user_id': USER_ID, 'class_id': CLASS_ID, 'role': 'member'}],
+        'sessions': [{'id': 's1', 'class_id': CLASS_ID}],
+        'notes': [
+            {'id': f'n{i:04d}', 'session_id': 's1', 'created_by': USER_ID, 'public': True, 'title': f'Lecture {i}',
+             'type': 'summary', 'content': 'Summary text. ' * 200, 'vote_count': i % 7,
+             'created_at': f'2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}'}
+            for i in range(NOTES)
+        ],
+    }, latency=LATENCY)
+    db.calls = collections.deque(maxlen=1000)  # a long run would otherwise grow the log without bound
+    return db
+
+
+# Registered clients survive the fork (only clients the registry created itself are
+# dropped), so with preload_app every worker starts from the same seeded data
+register_client('admin', build_db())
+
+from app.main import app  # noqa: E402,F401
@@ -0,0 +1,70 @@
+"""Production server settings. Run from backend/:  gunicorn -c gunicorn.conf.py
+
+Every setting can be overridden from the environment:
+
+    WEB_CONCURRENCY            worker processes (default: 2 x CPUs + 1)
+    GUNICORN_THREADS           threads per worker (default 8); each open SSE stream holds one,
+                               and STREAM_MAX_CLIENTS defaults to half of them
+    PORT / GUNICORN_BIND       listen address (default 0.0.0.0:5001)
+    GUNICORN_TIMEOUT           seconds a request may run before its worker is restarted
+    GUNICORN_GRACEFUL_TIMEOUT  seconds a worker gets to finish requests and jobs on shutdown
+    GUNICORN_MAX_REQUESTS      recycle a worker after this many requests (0 = never)
+    GUNICORN_PRELOAD           import the app once in the master before forking (default on)
+
+With more than one worker, JOB_STORE defaults to sqlite so any worker can answer a poll
+for a job another accepted. EVENT_BUS=memory only reaches stream viewers on the worker
+that handled the write; set EVENT_BUS=redis (and REDIS_URL) to share events.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'app.main:app'
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5001')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_class = 'gthread'
+
+# Read by app.core.config when the app is imported, which happens after this file runs
+if workers > 1:
+    os.environ.setdefault('JOB_STORE', 'sqlite')
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+# Preloading shares the imported code between workers. It is safe because nothing
+# opens a connection or starts a thread at import time: Supabase clients, the job
+# pool, the PDF process pool and the event bus are all created per process on first use.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') not in ('0', 'false', 'no')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+# The default format with the path in place of the request line: EventSource clients
+# send their token as ?access_token=, which must not reach the logs
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    if workers > 1 and os.getenv('EVENT_BUS', 'memory') == 'memory':
+        server.log.warning('EVENT_BUS=memory with %d workers: stream viewers only see changes '
+                           'made through their own worker; set EVENT_BUS=redis to share them', workers)
+    if workers > 1 and os.environ['JOB_STORE'] != 'sqlite':
+        server.log.warning('JOB_STORE=%s with %d workers: upload jobs can only be polled on the '
+                           'worker that accepted them', os.environ['JOB_STORE'], workers)
+
+
+def worker_exit(server, worker):
+    """Graceful shutdown: let queued ingestion jobs finish, then release pools."""
+    from app.core.supabase_client import reset_clients
+    from app.services.file_service import shutdown_extract_pool
+    from app.services.job_service import shutdown_job_service
+
+    try:
+        shutdown_job_service(wait=True)
+        shutdown_extract_pool()
+    finally:
+        reset_clients()
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-"""Run the Flask development server."""
+"""Run the Flask development server. For production use gunicorn (see gunicorn.conf.py)."""
+from app.core.config import Config
 from app.main import app
 
 if __name__ == '__main__':
     # Run on port 5001 to avoid conflict with macOS AirPlay Receiver on port 5000
-    app.run(host='0.0.0.0', port=5001, debug=True)
-
+    app.run(host='0.0.0.0', port=5001, debug=Config.FLASK_DEBUG in ('1', 'true', 'True'), threaded=True)
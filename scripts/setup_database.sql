@@ -300,6 +300,726 @@ CREATE TRIGGER on_auth_user_created
   AFTER INSERT ON auth.users
   FOR EACH ROW EXECUTE FUNCTION public.handle_new_user();
 
+-- ============================================
+-- 7. Transactional Create Flows (called via RPC by the API)
+-- ============================================
+
+-- Columns the API writes on notes
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS title text;
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS public boolean NOT NULL DEFAULT true;
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS pdf_url text;
+
+-- Validate membership, then create the session and note in one transaction
+CREATE OR REPLACE FUNCTION public.create_note_with_session(
+  p_class_id      uuid,
+  p_user_id       uuid,
+  p_session_title text,
+  p_content       text,
+  p_public        boolean DEFAULT true,
+  p_pdf_url       text DEFAULT NULL,
+  p_title         text DEFAULT NULL,
+  p_type          note_type DEFAULT 'slides'
+)
+RETURNS notes AS $$
+DECLARE
+  v_session_id uuid;
+  v_note notes;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM classes WHERE id = p_class_id) THEN
+    RAISE EXCEPTION 'Class not found' USING ERRCODE = 'P0002';
+  END IF;
+  IF NOT EXISTS (
+    SELECT 1 FROM class_members WHERE class_id = p_class_id AND user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'You must join the class before adding notes' USING ERRCODE = '42501';
+  END IF;
+
+  INSERT INTO sessions (class_id, title, created_by)
+  VALUES (p_class_id, left(coalesce(nullif(p_session_title, ''), 'PDF Upload'), 120), p_user_id)
+  RETURNING id INTO v_session_id;
+
+  INSERT INTO notes (session_id, type, content, created_by, public, pdf_url, title)
+  VALUES (v_session_id, p_type, p_content, p_user_id, p_public, p_pdf_url, left(p_title, 180))
+  RETURNING * INTO v_note;
+
+  RETURN v_note;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Validate membership, then create the session, deck and all cards in one transaction.
+-- p_cards is a JSON array of {question, answer, topic?}. Returns the deck row plus card_count.
+CREATE OR REPLACE FUNCTION public.create_deck_with_cards(
+  p_class_id uuid,
+  p_user_id  uuid,
+  p_title    text,
+  p_public   boolean DEFAULT true,
+  p_cards    jsonb DEFAULT '[]'::jsonb
+)
+RETURNS jsonb AS $$
+DECLARE
+  v_session_id uuid;
+  v_deck flashcard_decks;
+  v_count integer;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM classes WHERE id = p_class_id) THEN
+    RAISE EXCEPTION 'Class not found' USING ERRCODE = 'P0002';
+  END IF;
+  IF NOT EXISTS (
+    SELECT 1 FROM class_members WHERE class_id = p_class_id AND user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Join the class before creating a deck' USING ERRCODE = '42501';
+  END IF;
+
+  INSERT INTO sessions (class_id, title, created_by)
+  VALUES (p_class_id, left(p_title, 120), p_user_id)
+  RETURNING id INTO v_session_id;
+
+  INSERT INTO flashcard_decks (class_id, session_id, title, public, created_by)
+  VALUES (p_class_id, v_session_id, left(p_title, 180), p_public, p_user_id)
+  RETURNING * INTO v_deck;
+
+  INSERT INTO flashcards (deck_id, question, answer, topic, created_by)
+  SELECT v_deck.id, c->>'question', c->>'answer', c->>'topic', p_user_id
+  FROM jsonb_array_elements(p_cards) WITH ORDINALITY AS t(c, n)
+  ORDER BY n;
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+
+  RETURN to_jsonb(v_deck) || jsonb_build_object('card_count', v_count);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- These take the acting user as a parameter, so only the service role may call them
+REVOKE EXECUTE ON FUNCTION public.create_note_with_session(uuid, uuid, text, text, boolean, text, text, note_type) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.create_deck_with_cards(uuid, uuid, text, boolean, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_note_with_session(uuid, uuid, text, text, boolean, text, text, note_type) TO service_role;
+GRANT EXECUTE ON FUNCTION public.create_deck_with_cards(uuid, uuid, text, boolean, jsonb) TO service_role;
+
+-- ============================================
+-- 8. Keyset Pagination Indexes
+-- ============================================
+
+-- List endpoints page on (created_at, id) after their equality filters, so each page
+-- is a range scan on one of these instead of a sort over every matching row
+CREATE INDEX IF NOT EXISTS idx_notes_created_by_page ON notes(created_by, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_notes_session_page ON notes(session_id, created_at DESC, id DESC) WHERE public;
+CREATE INDEX IF NOT EXISTS idx_flashcard_decks_created_by_page ON flashcard_decks(created_by, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_flashcard_decks_class_page ON flashcard_decks(class_id, created_at DESC, id DESC) WHERE public;
+CREATE INDEX IF NOT EXISTS idx_comments_anchor_page ON comments(anchor, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_classes_name_page ON classes(name, id);
+
+-- ============================================
+-- 9. List Projections
+-- ============================================
+
+-- Computed column for note list views: select=id,title,content_preview returns a short
+-- plain-text teaser without shipping the full markdown content
+CREATE OR REPLACE FUNCTION public.content_preview(n notes)
+RETURNS text AS $$
+  SELECT left(btrim(regexp_replace(left(coalesce(n.content, ''), 600), '[#*_`>[:space:]]+', ' ', 'g')), 200);
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- 10. Vote Counters
+-- ============================================
+
+-- Note votes (one per user per note); deck votes live in upvotes
+CREATE TABLE IF NOT EXISTS note_votes (
+  note_id     uuid NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+  user_id     uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  created_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (note_id, user_id)
+);
+ALTER TABLE note_votes ENABLE ROW LEVEL SECURITY;
+
+-- Denormalized counters, kept in step with the vote rows by the triggers below
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS vote_count integer NOT NULL DEFAULT 0;
+ALTER TABLE flashcard_decks ADD COLUMN IF NOT EXISTS vote_count integer NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION public.bump_note_vote_count()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE notes SET vote_count = vote_count + 1 WHERE id = NEW.note_id;
+  ELSE
+    UPDATE notes SET vote_count = greatest(vote_count - 1, 0) WHERE id = OLD.note_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.bump_deck_vote_count()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' AND NEW.target_type = 'deck' THEN
+    UPDATE flashcard_decks SET vote_count = vote_count + 1 WHERE id = NEW.target_id;
+  ELSIF TG_OP = 'DELETE' AND OLD.target_type = 'deck' THEN
+    UPDATE flashcard_decks SET vote_count = greatest(vote_count - 1, 0) WHERE id = OLD.target_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS note_votes_count ON note_votes;
+CREATE TRIGGER note_votes_count
+  AFTER INSERT OR DELETE ON note_votes
+  FOR EACH ROW EXECUTE FUNCTION public.bump_note_vote_count();
+
+DROP TRIGGER IF EXISTS upvotes_deck_count ON upvotes;
+CREATE TRIGGER upvotes_deck_count
+  AFTER INSERT OR DELETE ON upvotes
+  FOR EACH ROW EXECUTE FUNCTION public.bump_deck_vote_count();
+
+-- Backfill counters for votes cast before the triggers existed
+UPDATE notes n SET vote_count = (SELECT count(*) FROM note_votes v WHERE v.note_id = n.id);
+UPDATE flashcard_decks d SET vote_count = (
+  SELECT count(*) FROM upvotes u WHERE u.target_id = d.id AND u.target_type = 'deck'
+);
+
+-- Counter and "did I vote" for every target in p_target_ids the user may see
+-- (their own, or public in a class they belong to). Missing/hidden ids are left out.
+CREATE OR REPLACE FUNCTION public.vote_summaries(
+  p_user_id     uuid,
+  p_target_type upvote_target_type,
+  p_target_ids  uuid[]
+)
+RETURNS TABLE (target_id uuid, vote_count integer, user_has_voted boolean) AS $$
+  SELECT n.id, n.vote_count,
+         EXISTS (SELECT 1 FROM note_votes v WHERE v.note_id = n.id AND v.user_id = p_user_id)
+  FROM notes n
+  JOIN sessions s ON s.id = n.session_id
+  WHERE p_target_type = 'note' AND n.id = ANY(p_target_ids)
+    AND (n.created_by = p_user_id OR (n.public AND EXISTS (
+      SELECT 1 FROM class_members m WHERE m.class_id = s.class_id AND m.user_id = p_user_id)))
+  UNION ALL
+  SELECT d.id, d.vote_count,
+         EXISTS (SELECT 1 FROM upvotes u WHERE u.target_id = d.id AND u.target_type = 'deck' AND u.user_id = p_user_id)
+  FROM flashcard_decks d
+  WHERE p_target_type = 'deck' AND d.id = ANY(p_target_ids)
+    AND (d.created_by = p_user_id OR (d.public AND EXISTS (
+      SELECT 1 FROM class_members m WHERE m.class_id = d.class_id AND m.user_id = p_user_id)));
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Cast (p_voted = true), retract (false) or toggle (NULL) the user's vote and return
+-- {count, user_has_voted} from the maintained counter, all in one round trip
+CREATE OR REPLACE FUNCTION public.set_vote(
+  p_user_id     uuid,
+  p_target_type upvote_target_type,
+  p_target_id   uuid,
+  p_voted       boolean DEFAULT NULL
+)
+RETURNS jsonb AS $$
+DECLARE
+  v_current record;
+  v_voted boolean;
+  v_count integer;
+BEGIN
+  SELECT * INTO v_current FROM vote_summaries(p_user_id, p_target_type, ARRAY[p_target_id]);
+  IF NOT FOUND THEN
+    RAISE EXCEPTION '% not found', initcap(p_target_type::text) USING ERRCODE = 'P0002';
+  END IF;
+  v_voted := coalesce(p_voted, NOT v_current.user_has_voted);
+
+  IF p_target_type = 'note' THEN
+    IF v_voted THEN
+      INSERT INTO note_votes (note_id, user_id) VALUES (p_target_id, p_user_id) ON CONFLICT DO NOTHING;
+    ELSE
+      DELETE FROM note_votes WHERE note_id = p_target_id AND user_id = p_user_id;
+    END IF;
+    SELECT vote_count INTO v_count FROM notes WHERE id = p_target_id;
+  ELSE
+    IF v_voted THEN
+      INSERT INTO upvotes (user_id, target_id, target_type) VALUES (p_user_id, p_target_id, 'deck') ON CONFLICT DO NOTHING;
+    ELSE
+      DELETE FROM upvotes WHERE user_id = p_user_id AND target_id = p_target_id AND target_type = 'deck';
+    END IF;
+    SELECT vote_count INTO v_count FROM flashcard_decks WHERE id = p_target_id;
+  END IF;
+
+  RETURN jsonb_build_object('count', v_count, 'user_has_voted', v_voted);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.vote_summaries(uuid, upvote_target_type, uuid[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.set_vote(uuid, upvote_target_type, uuid, boolean) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.vote_summaries(uuid, upvote_target_type, uuid[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.set_vote(uuid, upvote_target_type, uuid, boolean) TO service_role;
+
+-- ============================================
+-- 11. Study Scheduling
+-- ============================================
+
+-- The API builds a user's schedule for a deck from the deck's cards and that user's
+-- answers, each read in (created_at, id) pages
+CREATE INDEX IF NOT EXISTS idx_flashcards_deck_page ON flashcards(deck_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_events_user_deck_page ON study_events(user_id, deck_id, created_at, id);
+
+-- ============================================
+-- 12. Study State Snapshots
+-- ============================================
+
+-- Each user's current SM-2 state per card, written in the same transaction as the
+-- answers that produced it. Opening a deck reads these rows, one per card studied,
+-- rather than replaying study_events. Older events are folded in and pruned by the
+-- compaction job (python -m app.services.study_compaction).
+CREATE TABLE IF NOT EXISTS card_state (
+  user_id           uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  card_id           uuid NOT NULL REFERENCES flashcards(id) ON DELETE CASCADE,
+  deck_id           uuid NOT NULL REFERENCES flashcard_decks(id) ON DELETE CASCADE,
+  due_at            timestamptz NOT NULL,
+  ease              real NOT NULL DEFAULT 2.5,
+  interval_days     real NOT NULL DEFAULT 0,
+  reps              integer NOT NULL DEFAULT 0,
+  lapses            integer NOT NULL DEFAULT 0,
+  last_reviewed_at  timestamptz NOT NULL,
+  version           bigint NOT NULL DEFAULT 1,
+  PRIMARY KEY (user_id, card_id)
+);
+-- Bumped by every write; a writer names the version it computed from (see below)
+ALTER TABLE card_state ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 1;
+ALTER TABLE card_state ENABLE ROW LEVEL SECURITY;
+
+-- Everything due for a user, and one deck's states in due order
+CREATE INDEX IF NOT EXISTS idx_card_state_user_due ON card_state(user_id, due_at);
+CREATE INDEX IF NOT EXISTS idx_card_state_user_deck_due ON card_state(user_id, deck_id, due_at);
+-- Retention scans for the compaction job
+CREATE INDEX IF NOT EXISTS idx_study_events_created_at ON study_events(created_at);
+
+-- Store a batch of answers and the card states they produced, atomically. p_events is
+-- a JSON array of {card_id, result, elapsed_ms, created_at, client_event_id?}; p_states
+-- of {card_id, due_at, ease, interval_days, reps, lapses, last_reviewed_at,
+-- base_version}, where base_version is the version the state was computed from (0 for
+-- a card with no row yet). SM-2 runs in the API, so if any card has been written since
+-- (another worker, another device) nothing is stored and 40001 is raised; the caller
+-- re-reads the states and tries again. The same goes for an answer whose
+-- client_event_id is already stored (an overlapping retry of a sync, section 13): its
+-- effect may already be in the states, so the caller re-checks which ids are new.
+CREATE OR REPLACE FUNCTION public.record_study_reviews(
+  p_user_id uuid,
+  p_deck_id uuid,
+  p_events  jsonb,
+  p_states  jsonb
+)
+RETURNS integer AS $$
+DECLARE
+  v_count  integer;
+  v_states integer;
+BEGIN
+  INSERT INTO study_events (user_id, deck_id, card_id, result, elapsed_ms, created_at, client_event_id)
+  SELECT p_user_id, p_deck_id, e.card_id, e.result, e.elapsed_ms, coalesce(e.created_at, now()), e.client_event_id
+  FROM jsonb_to_recordset(p_events)
+    AS e(card_id uuid, result study_result, elapsed_ms integer, created_at timestamptz, client_event_id text)
+  ON CONFLICT (user_id, client_event_id) WHERE client_event_id IS NOT NULL DO NOTHING;
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  IF v_count < jsonb_array_length(p_events) THEN
+    RAISE EXCEPTION 'Some of these answers were already recorded' USING ERRCODE = '40001';
+  END IF;
+
+  -- A conflicting row is only updated when it is still at base_version, and a brand-new
+  -- card (base 0) loses to a concurrent insert, so fewer rows than states means a race
+  INSERT INTO card_state AS cs (user_id, card_id, deck_id, due_at, ease, interval_days, reps, lapses,
+                                last_reviewed_at, version)
+  SELECT p_user_id, s.card_id, p_deck_id, s.due_at, s.ease, s.interval_days, s.reps, s.lapses,
+         s.last_reviewed_at, s.base_version + 1
+  FROM jsonb_to_recordset(p_states)
+    AS s(card_id uuid, due_at timestamptz, ease real, interval_days real, reps integer, lapses integer,
+         last_reviewed_at timestamptz, base_version bigint)
+  ON CONFLICT (user_id, card_id) DO UPDATE
+    SET due_at = excluded.due_at, ease = excluded.ease, interval_days = excluded.interval_days,
+        reps = excluded.reps, lapses = excluded.lapses, last_reviewed_at = excluded.last_reviewed_at,
+        version = excluded.version
+    WHERE cs.version = excluded.version - 1;
+  GET DIAGNOSTICS v_states = ROW_COUNT;
+  IF v_states < jsonb_array_length(p_states) THEN
+    RAISE EXCEPTION 'Card state changed since it was read' USING ERRCODE = '40001';
+  END IF;
+
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- The stored states of some of a user's cards, read right before new answers are
+-- applied so a worker never builds on a stale cached schedule. A function so a whole
+-- batch of ids goes in the request body rather than an in.() filter in the URL.
+CREATE OR REPLACE FUNCTION public.current_card_states(p_user_id uuid, p_card_ids uuid[])
+RETURNS SETOF card_state AS $$
+  SELECT * FROM card_state WHERE user_id = p_user_id AND card_id = ANY(p_card_ids);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Sum of the versions of a user's states for one deck. Every write bumps a row's
+-- version by one, so a worker holding a cached schedule compares this with the sum it
+-- last saw to tell whether anyone else has written since (one index range scan).
+CREATE OR REPLACE FUNCTION public.study_state_mark(p_user_id uuid, p_deck_id uuid)
+RETURNS bigint AS $$
+  SELECT coalesce(sum(version), 0)::bigint FROM card_state WHERE user_id = p_user_id AND deck_id = p_deck_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- (user, deck) pairs with answers that no snapshot covers yet: history recorded
+-- before card_state existed. The compaction job replays these once.
+CREATE OR REPLACE FUNCTION public.unfolded_study_pairs()
+RETURNS TABLE (user_id uuid, deck_id uuid) AS $$
+  SELECT DISTINCT e.user_id, e.deck_id
+  FROM study_events e
+  WHERE NOT EXISTS (
+    SELECT 1 FROM card_state s
+    WHERE s.user_id = e.user_id AND s.card_id = e.card_id AND s.last_reviewed_at >= e.created_at);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Delete up to p_limit answers older than p_before whose effect is already in
+-- card_state. Returns how many went; the job calls it until that is 0.
+CREATE OR REPLACE FUNCTION public.prune_study_events(p_before timestamptz, p_limit integer DEFAULT 10000)
+RETURNS integer AS $$
+DECLARE
+  v_count integer;
+BEGIN
+  DELETE FROM study_events WHERE id IN (
+    SELECT e.id FROM study_events e
+    JOIN card_state s ON s.user_id = e.user_id AND s.card_id = e.card_id
+    WHERE e.created_at < p_before AND s.last_reviewed_at >= e.created_at
+    LIMIT p_limit);
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.record_study_reviews(uuid, uuid, jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.current_card_states(uuid, uuid[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.study_state_mark(uuid, uuid) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.unfolded_study_pairs() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.prune_study_events(timestamptz, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.record_study_reviews(uuid, uuid, jsonb, jsonb) TO service_role;
+GRANT EXECUTE ON FUNCTION public.current_card_states(uuid, uuid[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.study_state_mark(uuid, uuid) TO service_role;
+GRANT EXECUTE ON FUNCTION public.unfolded_study_pairs() TO service_role;
+GRANT EXECUTE ON FUNCTION public.prune_study_events(timestamptz, integer) TO service_role;
+
+-- ============================================
+-- 13. Offline Study Sync
+-- ============================================
+
+-- Answers synced from a device carry the id the device gave them, so a retried sync
+-- is recognised and not applied twice
+ALTER TABLE study_events ADD COLUMN IF NOT EXISTS client_event_id text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_study_events_user_client_event
+  ON study_events(user_id, client_event_id) WHERE client_event_id IS NOT NULL;
+
+-- Which of a device's event ids this user has already synced. A function rather than
+-- an in.() filter so a full batch of ids goes in the request body, not the URL.
+CREATE OR REPLACE FUNCTION public.synced_study_events(p_user_id uuid, p_client_event_ids text[])
+RETURNS TABLE (client_event_id text) AS $$
+  SELECT e.client_event_id FROM study_events e
+  WHERE e.user_id = p_user_id AND e.client_event_id = ANY(p_client_event_ids);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.synced_study_events(uuid, text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.synced_study_events(uuid, text[]) TO service_role;
+
+-- ============================================
+-- 14. Search
+-- ============================================
+
+-- One weighted tsvector per searchable row (notes, decks, flashcards), kept in a side
+-- table by triggers so `select *` on the source tables doesn't start returning it.
+-- Titles and questions weigh A, note bodies and answers B. btree_gin lets one GIN
+-- index serve "this class AND matches" together.
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+CREATE TABLE IF NOT EXISTS search_documents (
+  kind      text NOT NULL CHECK (kind IN ('note', 'deck', 'card')),
+  id        uuid NOT NULL,
+  class_id  uuid NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+  tsv       tsvector NOT NULL,
+  PRIMARY KEY (kind, id)
+);
+ALTER TABLE search_documents ENABLE ROW LEVEL SECURITY;
+CREATE INDEX IF NOT EXISTS idx_search_documents_class_tsv ON search_documents USING gin (class_id, tsv);
+
+-- Note bodies are capped so a very long PDF can't exceed tsvector's 1MB limit
+CREATE OR REPLACE FUNCTION public.note_search_tsv(p_title text, p_content text)
+RETURNS tsvector AS $$
+  SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A') ||
+         setweight(to_tsvector('english', left(coalesce(p_content, ''), 200000)), 'B');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.card_search_tsv(p_question text, p_answer text)
+RETURNS tsvector AS $$
+  SELECT setweight(to_tsvector('english', coalesce(p_question, '')), 'A') ||
+         setweight(to_tsvector('english', coalesce(p_answer, '')), 'B');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.index_note_search()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM search_documents WHERE kind = 'note' AND id = OLD.id;
+    RETURN OLD;
+  END IF;
+  INSERT INTO search_documents (kind, id, class_id, tsv)
+  SELECT 'note', NEW.id, s.class_id, note_search_tsv(NEW.title, NEW.content)
+  FROM sessions s WHERE s.id = NEW.session_id
+  ON CONFLICT (kind, id) DO UPDATE SET class_id = excluded.class_id, tsv = excluded.tsv;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.index_deck_search()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM search_documents WHERE kind = 'deck' AND id = OLD.id;
+    RETURN OLD;
+  END IF;
+  INSERT INTO search_documents (kind, id, class_id, tsv)
+  VALUES ('deck', NEW.id, NEW.class_id, setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A'))
+  ON CONFLICT (kind, id) DO UPDATE SET class_id = excluded.class_id, tsv = excluded.tsv;
+  IF TG_OP = 'UPDATE' AND NEW.class_id IS DISTINCT FROM OLD.class_id THEN
+    UPDATE search_documents d SET class_id = NEW.class_id
+    FROM flashcards f WHERE d.kind = 'card' AND d.id = f.id AND f.deck_id = NEW.id;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.index_card_search()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM search_documents WHERE kind = 'card' AND id = OLD.id;
+    RETURN OLD;
+  END IF;
+  INSERT INTO search_documents (kind, id, class_id, tsv)
+  SELECT 'card', NEW.id, d.class_id, card_search_tsv(NEW.question, NEW.answer)
+  FROM flashcard_decks d WHERE d.id = NEW.deck_id
+  ON CONFLICT (kind, id) DO UPDATE SET class_id = excluded.class_id, tsv = excluded.tsv;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only changes to the indexed columns reindex a row; vote_count bumps don't
+DROP TRIGGER IF EXISTS notes_search_index ON notes;
+CREATE TRIGGER notes_search_index
+  AFTER INSERT OR DELETE OR UPDATE OF title, content, session_id ON notes
+  FOR EACH ROW EXECUTE FUNCTION public.index_note_search();
+
+DROP TRIGGER IF EXISTS flashcard_decks_search_index ON flashcard_decks;
+CREATE TRIGGER flashcard_decks_search_index
+  AFTER INSERT OR DELETE OR UPDATE OF title, class_id ON flashcard_decks
+  FOR EACH ROW EXECUTE FUNCTION public.index_deck_search();
+
+DROP TRIGGER IF EXISTS flashcards_search_index ON flashcards;
+CREATE TRIGGER flashcards_search_index
+  AFTER INSERT OR DELETE OR UPDATE OF question, answer, deck_id ON flashcards
+  FOR EACH ROW EXECUTE FUNCTION public.index_card_search();
+
+-- Backfill rows created before the triggers existed
+INSERT INTO search_documents (kind, id, class_id, tsv)
+SELECT 'note', n.id, s.class_id, note_search_tsv(n.title, n.content)
+FROM notes n JOIN sessions s ON s.id = n.session_id
+ON CONFLICT (kind, id) DO NOTHING;
+INSERT INTO search_documents (kind, id, class_id, tsv)
+SELECT 'deck', d.id, d.class_id, setweight(to_tsvector('english', coalesce(d.title, '')), 'A')
+FROM flashcard_decks d
+ON CONFLICT (kind, id) DO NOTHING;
+INSERT INTO search_documents (kind, id, class_id, tsv)
+SELECT 'card', f.id, d.class_id, card_search_tsv(f.question, f.answer)
+FROM flashcards f JOIN flashcard_decks d ON d.id = f.deck_id
+ON CONFLICT (kind, id) DO NOTHING;
+
+-- Ranked matches for p_query (web-search syntax: words, "phrases", -exclusions, or)
+-- among what p_user_id can see in a class: public rows and their own. Pages are keyset
+-- on (rank, id) descending; pass the last row's rank and id to continue. Snippets are
+-- built only for the page's rows.
+CREATE OR REPLACE FUNCTION public.search_class(
+  p_user_id    uuid,
+  p_class_id   uuid,
+  p_query      text,
+  p_limit      integer DEFAULT 20,
+  p_after_rank real DEFAULT NULL,
+  p_after_id   uuid DEFAULT NULL
+)
+RETURNS TABLE (kind text, id uuid, deck_id uuid, title text, snippet text, rank real, created_at timestamptz) AS $$
+#variable_conflict use_column
+DECLARE
+  v_query tsquery := websearch_to_tsquery('english', p_query);
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM class_members m WHERE m.class_id = p_class_id AND m.user_id = p_user_id) THEN
+    RAISE EXCEPTION 'You are not a member of this class' USING ERRCODE = '42501';
+  END IF;
+
+  RETURN QUERY
+  WITH hits AS (
+    SELECT d.kind, d.id, ts_rank_cd(d.tsv, v_query)::real AS rank
+    FROM search_documents d
+    WHERE d.class_id = p_class_id AND d.tsv @@ v_query
+  ), page AS (
+    SELECT h.kind, h.id, x.deck_id, x.title, x.body, h.rank, x.created_at
+    FROM hits h
+    JOIN LATERAL (
+      SELECT NULL::uuid AS deck_id, coalesce(n.title, s.title) AS title, n.content AS body, n.created_at
+      FROM notes n JOIN sessions s ON s.id = n.session_id
+      WHERE h.kind = 'note' AND n.id = h.id AND (n.public OR n.created_by = p_user_id)
+      UNION ALL
+      SELECT fd.id, fd.title, NULL::text, fd.created_at
+      FROM flashcard_decks fd
+      WHERE h.kind = 'deck' AND fd.id = h.id AND (fd.public OR fd.created_by = p_user_id)
+      UNION ALL
+      SELECT f.deck_id, f.question, f.answer, f.created_at
+      FROM flashcards f JOIN flashcard_decks fd ON fd.id = f.deck_id
+      WHERE h.kind = 'card' AND f.id = h.id AND (fd.public OR fd.created_by = p_user_id)
+    ) x ON true
+    WHERE p_after_rank IS NULL OR (h.rank, h.id) < (p_after_rank, p_after_id)
+    ORDER BY h.rank DESC, h.id DESC
+    LIMIT p_limit
+  )
+  SELECT p.kind, p.id, p.deck_id, p.title,
+         ts_headline('english', left(coalesce(p.body, p.title), 5000), v_query,
+                     'MaxFragments=1, MaxWords=24, MinWords=8, StartSel=<mark>, StopSel=</mark>'),
+         p.rank, p.created_at
+  FROM page p
+  ORDER BY p.rank DESC, p.id DESC;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.search_class(uuid, uuid, text, integer, real, uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.search_class(uuid, uuid, text, integer, real, uuid) TO service_role;
+
+-- ============================================
+-- 15. Near-Duplicate Notes
+-- ============================================
+
+-- A note uploaded when a near-identical public note already exists in the class is
+-- linked to it (duplicate_of, always the first note of the group) and the class feed
+-- lists only the first, with duplicate_count public copies behind it.
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS duplicate_of uuid REFERENCES notes(id) ON DELETE SET NULL;
+ALTER TABLE notes ADD COLUMN IF NOT EXISTS duplicate_count integer NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_notes_duplicate_of ON notes(duplicate_of) WHERE duplicate_of IS NOT NULL;
+
+-- MinHash signature of each uploaded note's extracted text, and its LSH bucket per
+-- band (see backend/app/services/minhash.py). Looking up candidates is one index probe
+-- per band, however many notes the class has.
+CREATE TABLE IF NOT EXISTS note_fingerprints (
+  note_id    uuid PRIMARY KEY REFERENCES notes(id) ON DELETE CASCADE,
+  class_id   uuid NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+  signature  bigint[] NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS note_lsh_buckets (
+  class_id  uuid NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+  band      smallint NOT NULL,
+  bucket    bigint NOT NULL,
+  note_id   uuid NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+  PRIMARY KEY (class_id, band, bucket, note_id)
+);
+CREATE INDEX IF NOT EXISTS idx_note_lsh_buckets_note ON note_lsh_buckets(note_id);
+
+ALTER TABLE note_fingerprints ENABLE ROW LEVEL SECURITY;
+ALTER TABLE note_lsh_buckets ENABLE ROW LEVEL SECURITY;
+
+-- Store a note's fingerprint and link it to the most similar public note in its class
+-- that shares a bucket and whose signatures agree in at least p_threshold of their
+-- positions. p_buckets[n] is band n-1. Returns the note it was linked to, or NULL.
+CREATE OR REPLACE FUNCTION public.index_note_fingerprint(
+  p_note_id   uuid,
+  p_signature bigint[],
+  p_buckets   bigint[],
+  p_threshold real DEFAULT 0.8
+)
+RETURNS uuid AS $$
+DECLARE
+  v_class_id uuid;
+  v_public   boolean;
+  v_match    uuid;
+BEGIN
+  SELECT s.class_id, n.public INTO v_class_id, v_public
+  FROM notes n JOIN sessions s ON s.id = n.session_id
+  WHERE n.id = p_note_id;
+  IF v_class_id IS NULL THEN
+    RAISE EXCEPTION 'Note not found' USING ERRCODE = 'P0002';
+  END IF;
+
+  SELECT coalesce(n.duplicate_of, n.id) INTO v_match
+  FROM (
+    SELECT DISTINCT b.note_id
+    FROM unnest(p_buckets) WITH ORDINALITY AS k(bucket, band)
+    JOIN note_lsh_buckets b
+      ON b.class_id = v_class_id AND b.band = k.band - 1 AND b.bucket = k.bucket
+    WHERE b.note_id <> p_note_id
+  ) c
+  JOIN notes n ON n.id = c.note_id
+  JOIN note_fingerprints f ON f.note_id = c.note_id
+  CROSS JOIN LATERAL (
+    SELECT count(*) FILTER (WHERE x = y)::real / cardinality(p_signature) AS similarity
+    FROM unnest(f.signature, p_signature) AS t(x, y)
+  ) sim
+  WHERE n.public AND sim.similarity >= p_threshold
+  ORDER BY sim.similarity DESC, n.created_at
+  LIMIT 1;
+
+  INSERT INTO note_fingerprints (note_id, class_id, signature)
+  VALUES (p_note_id, v_class_id, p_signature)
+  ON CONFLICT (note_id) DO UPDATE SET class_id = excluded.class_id, signature = excluded.signature;
+  DELETE FROM note_lsh_buckets WHERE note_id = p_note_id;
+  INSERT INTO note_lsh_buckets (class_id, band, bucket, note_id)
+  SELECT v_class_id, (k.band - 1)::smallint, k.bucket, p_note_id
+  FROM unnest(p_buckets) WITH ORDINALITY AS k(bucket, band)
+  ON CONFLICT DO NOTHING;
+
+  IF v_match IS NOT NULL THEN
+    UPDATE notes SET duplicate_of = v_match WHERE id = p_note_id;
+    IF v_public THEN
+      UPDATE notes SET duplicate_count = duplicate_count + 1 WHERE id = v_match;
+    END IF;
+  END IF;
+  RETURN v_match;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Deleting a public duplicate takes it off its first note's count
+CREATE OR REPLACE FUNCTION public.release_note_duplicate()
+RETURNS trigger AS $$
+BEGIN
+  UPDATE notes SET duplicate_count = greatest(duplicate_count - 1, 0) WHERE id = OLD.duplicate_of;
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS notes_release_duplicate ON notes;
+CREATE TRIGGER notes_release_duplicate
+  AFTER DELETE ON notes
+  FOR EACH ROW WHEN (OLD.duplicate_of IS NOT NULL AND OLD.public)
+  EXECUTE FUNCTION public.release_note_duplicate();
+
+REVOKE EXECUTE ON FUNCTION public.index_note_fingerprint(uuid, bigint[], bigint[], real) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.index_note_fingerprint(uuid, bigint[], bigint[], real) TO service_role;
+
+-- ============================================
+-- 16. Orphaned Note PDFs
+-- ============================================
+
+-- Uploaded PDFs are keyed by content hash and shared by every note made from the same
+-- file, so deleting a note leaves its object in place. The sweep job
+-- (backend/app/services/note_pdf_sweep.py) removes objects no note references once
+-- they have gone unwritten for a grace period; every upload rewrites its object, so a
+-- note being created from it is never swept.
+CREATE INDEX IF NOT EXISTS idx_notes_pdf_url ON notes(pdf_url) WHERE pdf_url IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION public.orphaned_note_pdfs(
+  p_url_prefix text,
+  p_before     timestamptz,
+  p_limit      integer DEFAULT 1000
+)
+RETURNS TABLE (name text) AS $$
+  SELECT o.name
+  FROM storage.objects o
+  WHERE o.bucket_id = 'notes-pdfs'
+    AND coalesce(o.updated_at, o.created_at) < p_before
+    AND NOT EXISTS (SELECT 1 FROM notes n WHERE n.pdf_url = p_url_prefix || o.name)
+  ORDER BY o.name
+  LIMIT p_limit;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.orphaned_note_pdfs(text, timestamptz, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.orphaned_note_pdfs(text, timestamptz, integer) TO service_role;
+
 -- ============================================
 -- Setup Complete!
 -- ============================================